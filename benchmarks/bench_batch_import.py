@@ -0,0 +1,56 @@
+'''
+Times ConversionJobs.convertBatch importing several synthetic recordings with 1 up to os.cpu_count() workers,
+and checks every worker count returns the same arrays as converting the files one by one in this process.
+Each run uses a fresh conversion cache so nothing is served from a previous run.
+
+Usage: python benchmarks/bench_batch_import.py [fileCount] [minutesPerFile]
+'''
+import os
+import sys
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+
+from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+from nystagmus_app.utils.conversion_jobs import ConversionJobs
+
+
+def main():
+    fileCount = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    minutes = float(sys.argv[2]) if len(sys.argv) > 2 else 1
+    backendFactory = partial(SyntheticEDFbackend, trialCount=5, trialDuration=minutes * 12, samplingRate=1000)
+
+    with tempfile.TemporaryDirectory() as workDirectory:
+        #the cache is keyed by file contents, so every dummy file needs distinct bytes
+        EDFfilePaths = []
+        for fileNumber in range(fileCount):
+            EDFfilePath = Path(workDirectory) / f'recording{fileNumber}.edf'
+            EDFfilePath.write_bytes(f'synthetic recording {fileNumber}'.encode())
+            EDFfilePaths.append(EDFfilePath)
+
+        start = time.perf_counter()
+        importer = EDF2numpy(backend=backendFactory())
+        importer.consumeInputArgs('gaze_data_type:0')
+        expected = importer.readEDF(str(EDFfilePaths[0]))
+        serialTime = (time.perf_counter() - start) * fileCount
+        print(f'in-process conversion (estimated for {fileCount} files): {serialTime:.2f} s')
+
+        for workerCount in range(1, (os.cpu_count() or 1) + 1):
+            conversionJobs = ConversionJobs(Path(workDirectory) / f'cache-{workerCount}', maxWorkers=workerCount,
+                                            backendFactory=backendFactory)
+            try:
+                start = time.perf_counter()
+                results = conversionJobs.convertBatch(EDFfilePaths, 'gaze_data_type = 0')
+                batchTime = time.perf_counter() - start
+            finally:
+                conversionJobs.shutdown()
+
+            identical = all(a.tobytes() == b.tobytes() for EDFfileData in results
+                            for a, b in zip(expected[1:], EDFfileData[1:]) if a is not None)
+            print(f'{workerCount} worker(s): {batchTime:.2f} s, speedup {serialTime / batchTime:.2f}x, identical: {identical}')
+
+
+if __name__ == '__main__':
+    main()
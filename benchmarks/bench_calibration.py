@@ -0,0 +1,64 @@
+'''
+Calibrates a synthetic recording with the vectorised applyRecordingLinearRegression and with the previous
+per-element Series.apply implementation, and checks both give the same calibrated values.
+
+Usage: python benchmarks/bench_calibration.py [minutesOfData] [trialCount]
+'''
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+from nystagmus_app.utils.regression import applyRecordingLinearRegression
+from nystagmus_app.utils.trial_parsing import EDFTrialParser
+
+CALIBRATION_DATA = {'XLeft': {'plus10Degs': -6000, 'minus10Degs': -2000}, 'XRight': {'plus10Degs': -6000, 'minus10Degs': -2000},
+                    'YLeft': {'plus10Degs': -8000, 'minus10Degs': -4000}, 'YRight': {'plus10Degs': -8000, 'minus10Degs': -4000}}
+
+
+def previousRecordingLinearRegression(recording:list, calibrationData:dict) -> list:
+    calibratedTrialsSampleData = []
+    for trial in recording:
+        newTrialSampleData = pd.DataFrame()
+        for key in calibrationData.keys():
+            eyesDirectionString = 'pos' + key
+            extractedData = pd.DataFrame()
+            extractedData.loc[:, eyesDirectionString] = trial.sampleData.loc[:, eyesDirectionString]
+
+            plus10Degs = calibrationData[key]['plus10Degs']
+            minus10Degs = calibrationData[key]['minus10Degs']
+            slope = (-10-10)/(plus10Degs - minus10Degs)
+            intercept = -(slope * (plus10Degs + minus10Degs)/2)
+            newTrialSampleData.loc[:, eyesDirectionString] = extractedData.apply(lambda x: x*slope + intercept)
+        calibratedTrialsSampleData.append(newTrialSampleData)
+    return calibratedTrialsSampleData
+
+
+def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    trialCount = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    backend = SyntheticEDFbackend(trialCount=trialCount, trialDuration=minutes * 60 / trialCount, samplingRate=1000)
+    trials = EDFTrialParser(EDF2numpy(backend=backend).readEDF('synthetic.edf')).extractAllTrials()
+    for trial in trials:
+        trial.sampleData
+
+    start = time.perf_counter()
+    expected = previousRecordingLinearRegression(trials, CALIBRATION_DATA)
+    previousTime = time.perf_counter() - start
+
+    start = time.perf_counter()
+    calibrated = applyRecordingLinearRegression(trials, CALIBRATION_DATA)
+    vectorisedTime = time.perf_counter() - start
+
+    same = all(np.array_equal(a.to_numpy(), b.to_numpy(), equal_nan=True) and list(a.columns) == list(b.columns)
+               for a, b in zip(expected, calibrated))
+    print(f'previous:   {previousTime*1000:9.1f} ms')
+    print(f'vectorised: {vectorisedTime*1000:9.1f} ms')
+    print(f'identical:  {same}')
+
+
+if __name__ == '__main__':
+    main()
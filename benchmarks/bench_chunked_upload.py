@@ -0,0 +1,84 @@
+'''
+Peak server RSS while receiving an upload through the chunked upload endpoint, against the previous
+path that decoded the base64 data URL in the callback and wrote it to a temp file.
+Each path runs in its own process so the peaks do not mix.
+
+Usage: python benchmarks/bench_chunked_upload.py [fileMegabytes]
+'''
+import base64
+import gc
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def peakRSSMegabytes() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def runChunked(fileSize:int, directory:Path) -> None:
+    from flask import Flask
+    from nystagmus_app.utils.chunked_upload import registerUploadRoutes, uploadPath
+
+    server = Flask(__name__)
+    registerUploadRoutes(server, directory)
+    client = server.test_client()
+
+    #stand-in for the browser's file, written and sent in chunks (the test client holds one chunk in memory)
+    sourcePath = directory / 'source.edf'
+    with open(sourcePath, 'wb') as sourceFile:
+        for offset in range(0, fileSize, CHUNK_SIZE):
+            sourceFile.write(b'\x5a' * min(CHUNK_SIZE, fileSize - offset))
+    baseline = peakRSSMegabytes()
+
+    start = time.perf_counter()
+    with open(sourcePath, 'rb') as sourceFile:
+        for offset in range(0, fileSize, CHUNK_SIZE):
+            response = client.post(f'/upload/benchmark01?offset={offset}', data=sourceFile.read(CHUNK_SIZE),
+                                   content_type='application/octet-stream')
+            assert response.status_code == 200
+            #the test client leaves each request in a reference cycle, a real server does not
+            del response
+            gc.collect()
+    elapsed = time.perf_counter() - start
+
+    assert uploadPath(directory, 'benchmark01').stat().st_size == fileSize
+    print(f'chunked endpoint: {elapsed:6.2f} s   peak RSS +{peakRSSMegabytes() - baseline:7.1f} MB')
+
+
+def runBase64(fileSize:int, directory:Path) -> None:
+    contents = 'data:application/octet-stream;base64,' + base64.b64encode(b'\x5a' * fileSize).decode()
+    baseline = peakRSSMegabytes()
+
+    start = time.perf_counter()
+    contentType, contentString = contents.split(',')
+    decoded = base64.b64decode(contentString)
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as tempFile:
+        tempFile.write(decoded)
+    elapsed = time.perf_counter() - start
+    print(f'base64 callback:  {elapsed:6.2f} s   peak RSS +{peakRSSMegabytes() - baseline:7.1f} MB '
+          f'(plus {len(contents)/1e6:.0f} MB request payload already in memory)')
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--mode':
+        mode, fileSize, directory = sys.argv[2], int(sys.argv[3]), Path(sys.argv[4])
+        (runChunked if mode == 'chunked' else runBase64)(fileSize, directory)
+        return
+
+    fileSize = int(float(sys.argv[1]) * 1024 * 1024) if len(sys.argv) > 1 else 256 * 1024 * 1024
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ('base64', 'chunked'):
+            subprocess.run([sys.executable, __file__, '--mode', mode, str(fileSize), directory], check=True)
+            for file in Path(directory).iterdir():
+                os.unlink(file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+'''
+Memory of each EDF2numpy array with the standard schema against the compact_schema option, for a synthetic recording
+whose timestamps are past 2**24 ms (about 4.7 hours of tracker uptime), where float32 sample times lose milliseconds.
+Checks both schemas parse into the same trials.
+
+Usage: python benchmarks/bench_compact_schema.py [trialCount] [trialSeconds] [startTime]
+'''
+import contextlib
+import io
+import sys
+
+import numpy as np
+
+from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+from nystagmus_app.utils.trial_parsing import EDFTrialParser
+
+ARRAY_NAMES = ['RECORDING', 'MESSAGE', 'SAMPLE', 'EVENT', 'IOEVENT']
+
+
+def readRecording(backend:SyntheticEDFbackend, options:str) -> np.ndarray:
+    importer = EDF2numpy(backend=backend)
+    with contextlib.redirect_stdout(io.StringIO()):
+        importer.consumeInputArgs(options)
+        return importer.readEDF('synthetic.edf')
+
+
+def main():
+    trialCount = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    trialSeconds = float(sys.argv[2]) if len(sys.argv) > 2 else 60
+    startTime = int(sys.argv[3]) if len(sys.argv) > 3 else 20000001
+
+    backend = SyntheticEDFbackend(trialCount=trialCount, trialDuration=trialSeconds, startTime=startTime)
+    standard = readRecording(backend, 'gaze_data_type:0')
+    compact = readRecording(backend, 'gaze_data_type:0,compact_schema:1')
+
+    print(f'{"array":>10} {"standard":>14} {"compact":>14}')
+    for arrayNumber, arrayName in enumerate(ARRAY_NAMES, start=1):
+        print(f'{arrayName:>10} {standard[arrayNumber].dtype.itemsize:5d} B/row {standard[arrayNumber].nbytes / 1024**2:5.1f} MB '
+              f'{compact[arrayNumber].dtype.itemsize:5d} B/row {compact[arrayNumber].nbytes / 1024**2:5.1f} MB')
+    standardBytes = sum(array.nbytes for array in standard[1:])
+    compactBytes = sum(array.nbytes for array in compact[1:])
+    print(f'{"total":>10} {standardBytes / 1024**2:14.1f} MB {compactBytes / 1024**2:11.1f} MB')
+
+    standardTrials = EDFTrialParser(standard).extractAllTrials()
+    compactTrials = EDFTrialParser(compact).extractAllTrials()
+
+    # compact sample times are counted from each recording block's sampleTimeBase
+    exactTime = np.concatenate([trial.sampleTimes() for trial in compactTrials])
+    standardTime = np.concatenate([trial.sampleTimes() for trial in standardTrials])
+    timeError = np.abs(standardTime.astype(np.int64) - exactTime)
+    print(f'float32 sample time error: up to {timeError.max()} ms ({np.count_nonzero(timeError) / len(timeError):.0%} of samples), '
+          f'compact: {np.count_nonzero(np.diff(exactTime) <= 0)} non-increasing timestamps')
+    sameTrials = len(standardTrials) == len(compactTrials) and all(
+        standardTrial.eyeTracked == compactTrial.eyeTracked
+        and np.array_equal(standardTrial.trialData[2]['posXLeft'], compactTrial.trialData[2]['posXLeft'])
+        and list(standardTrial.eventData['eventType'].str[:8]) == list(compactTrial.eventData['eventType'].astype(str).str[:8])
+        for standardTrial, compactTrial in zip(standardTrials, compactTrials))
+    print(f'same trials, samples and events: {sameTrials}')
+
+
+if __name__ == '__main__':
+    main()
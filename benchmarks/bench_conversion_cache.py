@@ -0,0 +1,42 @@
+'''
+Compares a full EDF conversion against a ConversionCache hit for the same synthetic recording,
+and checks the cached arrays match the converted ones.
+
+Usage: python benchmarks/bench_conversion_cache.py [minutesOfData]
+'''
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+from nystagmus_app.utils.conversion_cache import ConversionCache
+
+
+def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    backend = SyntheticEDFbackend(trialCount=10, trialDuration=minutes * 6, samplingRate=1000)
+
+    with tempfile.TemporaryDirectory() as cacheDirectory:
+        cache = ConversionCache(Path(cacheDirectory))
+        key = cache.makeKey(f'synthetic-{minutes}'.encode(), 'gaze_data_type = 0')
+
+        start = time.perf_counter()
+        EDFfileData = EDF2numpy(backend=backend).readEDF('synthetic.edf')
+        convertTime = time.perf_counter() - start
+        cache.store(key, EDFfileData)
+
+        start = time.perf_counter()
+        cachedData = cache.load(key)
+        loadTime = time.perf_counter() - start
+
+        identical = all((a is None and b is None) or a.tobytes() == b.tobytes()
+                        for a, b in zip(EDFfileData[1:], cachedData[1:]))
+        print(f'conversion: {convertTime:.3f} s')
+        print(f'cache hit:  {loadTime*1000:.2f} ms')
+        print(f'cached arrays identical: {identical}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+'''
+Figure JSON size and build time for one trial trace before and after min/max decimation,
+and a check that every bucket's extremes (the fast-phase peaks) are kept.
+
+Usage: python benchmarks/bench_decimation.py [trialSeconds] [samplingRate]
+'''
+import sys
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+
+from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+from nystagmus_app.utils.decimation import DEFAULT_POINT_BUDGET, decimateTrace
+from nystagmus_app.utils.trial_parsing import EDFTrialParser
+
+
+def figureJSON(xData, yData) -> tuple[int, float]:
+    start = time.perf_counter()
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=xData, y=yData, mode='lines'))
+    size = len(fig.to_json())
+    return size, time.perf_counter() - start
+
+
+def main():
+    trialSeconds = float(sys.argv[1]) if len(sys.argv) > 1 else 300
+    samplingRate = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    backend = SyntheticEDFbackend(trialCount=1, trialDuration=trialSeconds, samplingRate=samplingRate)
+    trial = EDFTrialParser(EDF2numpy(backend=backend).readEDF('synthetic.edf')).extractAllTrials()[0]
+    timeData = trial.sampleData['time'] - trial.startTime
+    xLeftData = trial.sampleData['posXLeft']
+
+    fullSize, fullTime = figureJSON(timeData, xLeftData)
+    start = time.perf_counter()
+    plotX, plotY = decimateTrace(timeData, xLeftData)
+    decimateTime = time.perf_counter() - start
+    decimatedSize, decimatedTime = figureJSON(plotX, plotY)
+
+    bucketSize = -(-len(xLeftData) // (DEFAULT_POINT_BUDGET // 2))
+    peaksKept = all(np.nanmax(xLeftData.iloc[i:i+bucketSize]) in plotY and np.nanmin(xLeftData.iloc[i:i+bucketSize]) in plotY
+                    for i in range(0, len(xLeftData), bucketSize))
+    print(f'full:      {len(xLeftData):>9,} points {fullSize/1e6:7.2f} MB {fullTime:.3f} s')
+    print(f'decimated: {len(plotY):>9,} points {decimatedSize/1e6:7.2f} MB {decimatedTime + decimateTime:.3f} s '
+          f'(decimation {decimateTime*1000:.1f} ms)')
+    print(f'bucket extremes kept: {peaksKept}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+'''
+Measures the cold import time of each layer with `python -X importtime` and checks the importer and analysis layers
+load with NumPy only. Exits with status 1 if one of them pulls in Dash, Plotly or pandas, so it can be run as a check.
+
+Usage: python benchmarks/bench_import_time.py [repeats]
+'''
+import subprocess
+import sys
+import tempfile
+
+#modules that must import without any of HEAVY_MODULES
+NUMPY_ONLY_MODULES = [
+    'nystagmus_app.EDF_file_importer.EyeLinkDataImporter',
+    'nystagmus_app.EDF_file_importer.SyntheticEDFbackend',
+    'nystagmus_app.utils.trial_parsing',
+    'nystagmus_app.utils.regression',
+    'nystagmus_app.utils.decimation',
+    'nystagmus_app.utils.conversion_jobs',
+    'nystagmus_app.utils.batch_pipeline',
+]
+#measured for comparison only
+UI_MODULES = ['nystagmus_app.app', 'nystagmus_app.callback_functions.upload_tabs']
+HEAVY_MODULES = ['dash', 'plotly', 'pandas']
+
+
+def importTime(module: str) -> tuple[float, list[str]]:
+    #cumulative import time of module in ms, and the heavy modules it loaded, from a fresh interpreter
+    script = f'import sys, {module}; print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    with tempfile.TemporaryDirectory() as workDirectory:
+        #modules write std.log to the working directory on import
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c', script], cwd=workDirectory,
+                                 capture_output=True, text=True, check=True)
+
+    cumulative = 0
+    for line in process.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            cumulative = int(fields[1])
+    heavyModules = [name for name in process.stdout.strip().split(',') if name]
+    return cumulative / 1000, heavyModules
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    failed = False
+
+    for module in NUMPY_ONLY_MODULES + UI_MODULES:
+        results = [importTime(module) for _ in range(repeats)]
+        bestTime = min(time for time, _ in results)
+        heavyModules = results[0][1]
+        status = ''
+        if module in NUMPY_ONLY_MODULES and heavyModules:
+            status = '  FAIL: imports ' + ', '.join(heavyModules)
+            failed = True
+        print(f'{module:55s} {bestTime:8.1f} ms{status}')
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+'''
+Time until the first trial of a synthetic 300 trial recording can be viewed: converting the whole file and parsing it
+into trials (the old upload path) against opening it as a LazyRecording, which reads only the trial headers and
+decodes the trial asked for. Also times a jump to a trial in the middle of the file and a cached read.
+Checks the lazily decoded trials match the full conversion.
+
+Usage: python benchmarks/bench_lazy_recording.py [trialCount] [trialSeconds] [samplingRate]
+'''
+import contextlib
+import functools
+import io
+import sys
+import time
+
+import numpy as np
+
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+from nystagmus_app.utils.conversion_jobs import readEDFFile
+from nystagmus_app.utils.lazy_recording import LazyRecording
+from nystagmus_app.utils.trial_parsing import EDFTrialParser
+
+OPTIONS = 'gaze_data_type = 0, sample_fields = position, compact_schema = 1'
+
+
+def timed(function, *args) -> tuple:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    trialCount = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    trialSeconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    samplingRate = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    backendFactory = functools.partial(SyntheticEDFbackend, trialCount=trialCount, trialDuration=trialSeconds, samplingRate=samplingRate)
+
+    lazyRecording, openTime = timed(LazyRecording, 'synthetic.edf', OPTIONS, 8, backendFactory)
+    firstTrial, firstTime = timed(lazyRecording.__getitem__, 0)
+    middleTrial, middleTime = timed(lazyRecording.__getitem__, trialCount // 2)
+    _, cachedTime = timed(lazyRecording.__getitem__, 0)
+
+    EDFfileData, convertTime = timed(readEDFFile, 'synthetic.edf', OPTIONS, None, backendFactory)
+    trials, parseTime = timed(lambda: EDFTrialParser(EDFfileData).extractAllTrials())
+
+    print(f'{trialCount} trials of {trialSeconds:g} s at {samplingRate} Hz, {len(EDFfileData[3]):,} samples')
+    print(f'full conversion then first trial: {(convertTime + parseTime) * 1000:9.1f} ms')
+    print(f'lazy open (trial headers):        {openTime * 1000:9.1f} ms')
+    print(f'lazy first trial:                 {firstTime * 1000:9.1f} ms (open + trial {(openTime + firstTime) * 1000:.1f} ms)')
+    print(f'lazy jump to trial {trialCount // 2}:           {middleTime * 1000:9.1f} ms')
+    print(f'cached trial:                     {cachedTime * 1000:9.3f} ms')
+
+    sameTrials = all(len(lazyRecording) == len(trials) and
+                     all(np.array_equal(lazyTrial.trialData[2][field], trials[trialNumber].trialData[2][field])
+                         for field in ('time', 'posXLeft', 'posYRight')) and
+                     np.array_equal(lazyTrial.trialData[3]['time'], trials[trialNumber].trialData[3]['time'])
+                     for trialNumber, lazyTrial in ((0, firstTrial), (trialCount // 2, middleTrial)))
+    print(f'lazy trials match full conversion: {sameTrials}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+'''
+Cost of serving the nystagmus plot for a zoom window from the level of detail pyramid,
+against decimating the whole trace again for every relayout, over a range of window widths.
+
+Usage: python benchmarks/bench_level_of_detail.py [trialSeconds] [samplingRate]
+'''
+import sys
+import time
+
+import numpy as np
+
+from nystagmus_app.utils.decimation import LevelOfDetail, decimateTrace
+
+
+def main():
+    trialSeconds = float(sys.argv[1]) if len(sys.argv) > 1 else 600
+    samplingRate = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = np.random.default_rng(0)
+    timeData = np.arange(int(trialSeconds * samplingRate)) * (1000 / samplingRate)
+    positionData = rng.normal(size=timeData.size).cumsum().astype(np.float32)
+
+    levelOfDetail = LevelOfDetail()
+    loadTrace = lambda: (timeData, positionData)
+    start = time.perf_counter()
+    levelOfDetail.visibleTrace('trial', 'posXLeft', loadTrace)
+    print(f'{timeData.size:,} samples, pyramid built in {time.perf_counter() - start:.3f} s')
+
+    print(f'{"window (s)":>10} {"points":>7} {"pyramid (ms)":>13} {"full decimation (ms)":>21}')
+    for windowSeconds in (1, 10, 60, 300, trialSeconds):
+        xRange = (timeData[-1] / 2 - windowSeconds * 500, timeData[-1] / 2 + windowSeconds * 500)
+
+        start = time.perf_counter()
+        plotX, plotY = levelOfDetail.visibleTrace('trial', 'posXLeft', loadTrace, xRange)
+        pyramidTime = time.perf_counter() - start
+
+        start = time.perf_counter()
+        visible = (timeData >= xRange[0]) & (timeData <= xRange[1])
+        decimateTrace(timeData[visible], positionData[visible])
+        fullTime = time.perf_counter() - start
+        print(f'{windowSeconds:10g} {len(plotX):7d} {pyramidTime*1000:13.2f} {fullTime*1000:21.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+'''
+Memory and decode time of EDF message storage: the text pool EDF2numpy now uses, against the fixed-width Unicode
+message column it replaced (sized to the longest message, 4 bytes per character). Messages are DataViewer style,
+a TRIALID and a few !V TRIAL_VAR messages per trial plus one long !V DRAW_LIST command, fed through appendMessage.
+
+Usage: python benchmarks/bench_message_storage.py [trialCount] [longMessageLength]
+'''
+import contextlib
+import io
+import struct
+import sys
+import time
+
+import numpy as np
+
+from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+
+
+def dataViewerMessages(trialCount:int, longMessageLength:int) -> list[str]:
+    messages = []
+    for trial in range(trialCount):
+        messages += [f'TRIALID {trial + 1}', 'SYNCTIME', '!V TRIAL_VAR condition nystagmus',
+                     f'!V TRIAL_VAR target {trial % 8}', 'TRIAL_RESULT 0']
+    messages.insert(1, '!V DRAW_LIST ' + 'x' * longMessageLength)
+    return messages
+
+
+def main():
+    trialCount = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    longMessageLength = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    backend = SyntheticEDFbackend(trialCount=1, trialDuration=1)
+    texts = dataViewerMessages(trialCount, longMessageLength)
+    # each LSTRING holds a 64000 byte buffer, so elements are shared between messages with the same text
+    distinctEvents = {text: backend.makeMessage(1000, text) for text in set(texts)}
+    events = [distinctEvents[text] for text in texts]
+
+    importer = EDF2numpy(backend=backend)
+    with contextlib.redirect_stdout(io.StringIO()):
+        importer.consumeInputArgs('gaze_data_type:0')
+        importer.allocateFromElementCount(None)
+    start = time.perf_counter()
+    for number, event in enumerate(events):
+        importer.MESSAGEdata = importer.growArray(importer.MESSAGEdata, number)
+        importer.appendMessage(event.FEVENT, number)
+    messages = importer.messagePool.attach(importer.MESSAGEdata[:len(events)])
+    poolTime = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decodedTexts = [importer.readMessageText(event.FEVENT.message).decode('utf-8') for event in events]
+    decodeTime = time.perf_counter() - start
+
+    # the replaced path: a character at a time through struct.unpack, stored as repr text in a U<longest> column
+    start = time.perf_counter()
+    unpackedTexts = []
+    for event in events:
+        message = event.FEVENT.message.contents
+        unpackedTexts.append(''.join(character.decode('utf-8') for character in struct.unpack('<' + str(message.length - 1) + 'c', message.text)))
+    unpackTime = time.perf_counter() - start
+    fixedWidthBytes = len(texts) * (messages.dtype.itemsize - 4 + 4 * max(len(repr(text)) for text in texts))
+
+    poolBytes = messages.nbytes + messages.textBuffer.nbytes + messages.textOffsets.nbytes
+    print(f'{len(texts):,} messages, {sum(len(text) for text in texts) / 1024**2:.1f} MB of text, longest {max(map(len, texts)):,} characters')
+    print(f'fixed-width column: {fixedWidthBytes / 1024**2:9.1f} MB')
+    print(f'text pool:          {poolBytes / 1024**2:9.1f} MB ({len(importer.messagePool):,} distinct texts)')
+    print(f'appendMessage into the text pool: {poolTime:.3f} s')
+    print(f'decode per message: {decodeTime:.3f} s, a character at a time: {unpackTime:.3f} s')
+    print(f'texts round trip: {list(messages.texts()) == texts == decodedTexts == unpackedTexts}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+'''
+Time to segment every trial of a synthetic 2 kHz recording into nystagmus beats, and a check of the beats found
+against the fast phases the synthetic backend generated (count, frequency, amplitude and slow phase velocity).
+Then times analysing a 10 s zoomed window, as the calibrated graph's buttons do, the first time and from the cache.
+
+Usage: python benchmarks/bench_nystagmus_analysis.py [trialCount] [trialSeconds] [samplingRate]
+'''
+import contextlib
+import io
+import sys
+import time
+
+import numpy as np
+
+from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import FAST_PHASE_FRACTION, RAW_CENTRE_X, RAW_UNITS_PER_DEGREE, SyntheticEDFbackend
+from nystagmus_app.utils.decimation import xRangeRows
+from nystagmus_app.utils.nystagmus_analysis import SegmentationCache, segmentNystagmus
+from nystagmus_app.utils.regression import calibrateRecording
+from nystagmus_app.utils.trial_parsing import EDFTrialParser
+
+#maps the raw pupil position onto degrees, as dragging the calibration lines to +/-10 degrees would
+CALIBRATION = {'XLeft': {'plus10Degs': RAW_CENTRE_X + 10 * RAW_UNITS_PER_DEGREE, 'minus10Degs': RAW_CENTRE_X - 10 * RAW_UNITS_PER_DEGREE}}
+
+
+def main():
+    trialCount = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    trialSeconds = float(sys.argv[2]) if len(sys.argv) > 2 else 120
+    samplingRate = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+
+    backend = SyntheticEDFbackend(trialCount=trialCount, trialDuration=trialSeconds, samplingRate=samplingRate)
+    importer = EDF2numpy(backend=backend)
+    with contextlib.redirect_stdout(io.StringIO()):
+        importer.consumeInputArgs('gaze_data_type:0')
+        EDFfileData = importer.readEDF('synthetic.edf')
+    trials = EDFTrialParser(EDFfileData).extractAllTrials()
+    columns, positionData, trialOffsets = calibrateRecording(trials, CALIBRATION)
+
+    start = time.perf_counter()
+    trialBeats = [segmentNystagmus(positionData[trialOffsets[i]:trialOffsets[i+1], 0], samplingRate) for i in range(len(trials))]
+    segmentTime = time.perf_counter() - start
+
+    #the slow phase drifts one amplitude over the slow part of each beat
+    expectedBeats = backend.fastPhasesPerTrial
+    expectedSlowPhase = backend.nystagmusAmplitude * backend.nystagmusFrequency / (1 - FAST_PHASE_FRACTION)
+    summaries = [beats.summary() for beats in trialBeats]
+    print(f'{len(positionData):,} samples at {samplingRate} Hz segmented in {segmentTime:.3f} s '
+          f'({segmentTime / len(trials) * 1000:.1f} ms per {trialSeconds:.0f} s trial)')
+    print(f'beats per trial:      {[summary["beats"] for summary in summaries]} (generated {expectedBeats})')
+    print(f'frequency:            {np.mean([summary["frequency"] for summary in summaries]):.3f} Hz '
+          f'(generated {backend.nystagmusFrequency:.3f})')
+    print(f'fast phase amplitude: {np.mean([summary["fastPhaseAmplitude"] for summary in summaries]):.2f} deg '
+          f'(generated {backend.nystagmusAmplitude:.2f})')
+    print(f'slow phase velocity:  {np.mean([summary["slowPhaseVelocity"] for summary in summaries]):.2f} deg/s '
+          f'(generated {expectedSlowPhase:.2f})')
+
+    #a zoomed window of the last trial, the calibrated x axis is the row index
+    trialRows = range(trialOffsets[-1] - trialOffsets[-2])
+    xRange = (len(trialRows) / 2, len(trialRows) / 2 + 10 * samplingRate)
+    trialPosition = positionData[trialOffsets[-2]:trialOffsets[-1], 0]
+    segmentationCache = SegmentationCache()
+    for attempt in ('first click', 'repeat click'):
+        start = time.perf_counter()
+        startRow, stopRow = xRangeRows(trialRows, xRange)
+        beats = segmentationCache.beats(('trial', startRow, stopRow), lambda: trialPosition[startRow:stopRow], samplingRate)
+        print(f'10 s window, {attempt}: {(time.perf_counter() - start) * 1000:.2f} ms, {len(beats)} beats')
+
+
+if __name__ == '__main__':
+    main()
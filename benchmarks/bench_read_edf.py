@@ -0,0 +1,36 @@
+'''
+Throughput of the full import pipeline (EDF2numpy.readEDF followed by EDFTrialParser) on synthetic recordings.
+
+Usage: python benchmarks/bench_read_edf.py [minutesOfData] [samplingRate] [trialCount]
+'''
+import sys
+import time
+
+from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+from nystagmus_app.utils.trial_parsing import EDFTrialParser
+
+
+def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    samplingRate = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    trialCount = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    backend = SyntheticEDFbackend(trialCount=trialCount, trialDuration=minutes * 60 / trialCount, samplingRate=samplingRate)
+
+    start = time.perf_counter()
+    EDFfileData = EDF2numpy(backend=backend).readEDF('synthetic.edf')
+    readTime = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parser = EDFTrialParser(EDFfileData)
+    parser.extractAllTrials()
+    parseTime = time.perf_counter() - start
+
+    sampleCount = EDFfileData[3].size
+    print(f'{sampleCount:,} samples in {parser.trialCount} trials')
+    print(f'readEDF:        {readTime:.2f} s ({sampleCount/readTime:,.0f} samples/s)')
+    print(f'EDFTrialParser: {parseTime:.2f} s ({sampleCount/parseTime:,.0f} samples/s)')
+
+
+if __name__ == '__main__':
+    main()
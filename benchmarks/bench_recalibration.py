@@ -0,0 +1,57 @@
+'''
+Time to recalibrate a synthetic 2 kHz recording after moving one channel's +10 degree line, recomputing every channel
+(the old behaviour) against recomputing only the moved channel, and calibrating again with unchanged lines.
+Checks the incremental result matches a full calibration.
+
+Usage: python benchmarks/bench_recalibration.py [trialCount] [trialSeconds] [samplingRate]
+'''
+import contextlib
+import io
+import sys
+import time
+
+import numpy as np
+
+from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+from nystagmus_app.utils.regression import calibrateRecording, recalibrateRecording
+from nystagmus_app.utils.trial_parsing import EDFTrialParser
+
+CALIBRATION = {'XLeft': {'plus10Degs': -6000, 'minus10Degs': -2000}, 'XRight': {'plus10Degs': -6000, 'minus10Degs': -2000},
+               'YLeft': {'plus10Degs': -8000, 'minus10Degs': -4000}, 'YRight': {'plus10Degs': -8000, 'minus10Degs': -4000}}
+
+
+def timed(function, *args) -> tuple:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    trialCount = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    trialSeconds = float(sys.argv[2]) if len(sys.argv) > 2 else 120
+    samplingRate = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+
+    importer = EDF2numpy(backend=SyntheticEDFbackend(trialCount=trialCount, trialDuration=trialSeconds, samplingRate=samplingRate))
+    with contextlib.redirect_stdout(io.StringIO()):
+        importer.consumeInputArgs('gaze_data_type:0')
+        EDFfileData = importer.readEDF('synthetic.edf')
+    trials = EDFTrialParser(EDFfileData).extractAllTrials()
+
+    columns, positionData, trialOffsets = calibrateRecording(trials, CALIBRATION)
+    movedCalibration = dict(CALIBRATION, XLeft={'plus10Degs': -6100, 'minus10Degs': -2000})
+    previousCalibration = (columns, positionData, CALIBRATION)
+
+    fullResult, fullTime = timed(calibrateRecording, trials, movedCalibration)
+    incrementalResult, incrementalTime = timed(recalibrateRecording, trials, movedCalibration, previousCalibration)
+    unchangedResult, unchangedTime = timed(recalibrateRecording, trials, CALIBRATION, previousCalibration)
+
+    print(f'{len(positionData):,} samples, {len(columns)} channels, one line moved')
+    print(f'every channel:       {fullTime * 1000:8.1f} ms')
+    print(f'moved channel only:  {incrementalTime * 1000:8.1f} ms (recomputed {incrementalResult[3]})')
+    print(f'unchanged lines:     {unchangedTime * 1000:8.1f} ms (recomputed {unchangedResult[3]})')
+    print(f'matches full calibration: {np.array_equal(fullResult[1], incrementalResult[1], equal_nan=True)}')
+
+
+if __name__ == '__main__':
+    main()
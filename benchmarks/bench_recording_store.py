@@ -0,0 +1,68 @@
+'''
+Adds synthetic recordings and calibrations for several sessions to a RecordingStore with a small memory budget and
+views each one, then compares the memory the store keeps against keeping everything in lists (the old module-level
+globals). Then times reading an evicted recording back, and checks the rebuilt trials match the originals.
+
+Usage: python benchmarks/bench_recording_store.py [sessions] [recordingsPerSession] [budgetMB]
+'''
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+from nystagmus_app.utils.recording_store import RecordingStore, inMemoryBytes
+from nystagmus_app.utils.regression import calibrateRecording
+from nystagmus_app.utils.trial_parsing import EDFTrialParser
+
+CALIBRATION = {'XLeft': {'plus10Degs': 100, 'minus10Degs': -100}, 'XRight': {'plus10Degs': 90, 'minus10Degs': -110}}
+
+
+def main():
+    sessionCount = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    recordingsPerSession = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    budgetBytes = int(float(sys.argv[3]) * 1024**2) if len(sys.argv) > 3 else 64 * 1024**2
+
+    with tempfile.TemporaryDirectory() as storeDirectory:
+        store = RecordingStore(Path(storeDirectory), memoryBudgetBytes=budgetBytes)
+        unboundedBytes = 0
+        firstSamples = None
+
+        for sessionNumber in range(sessionCount):
+            sessionID = f'session-{sessionNumber:04d}'
+            for recordingNumber in range(recordingsPerSession):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    backend = SyntheticEDFbackend(trialCount=5, trialDuration=60, seed=recordingNumber)
+                    EDFfileData = EDF2numpy(backend=backend).readEDF('synthetic.edf')
+                trials = EDFTrialParser(EDFfileData).extractAllTrials()
+                columns, positionData, trialOffsets = calibrateRecording(trials, CALIBRATION)
+                recordingIndex = store.addRecording(sessionID, f'recording {recordingNumber}', EDFfileData)
+                store.addCalibratedRecording(sessionID, f'recording {recordingNumber} - Calibrated', columns,
+                                             positionData, trialOffsets, CALIBRATION)
+
+                #viewing a trial builds its sample DataFrame
+                storedTrials = store.recording(sessionID, recordingIndex)[1]
+                sampleBytes = int(storedTrials[0].sampleData.memory_usage(index=True).sum())
+                if firstSamples is None:
+                    firstSamples = trials[0].sampleData['posXLeft'].to_numpy().copy()
+                unboundedBytes += sum(inMemoryBytes(array) for array in EDFfileData[1:]) + sampleBytes + positionData.nbytes
+
+        print(f'{sessionCount} sessions x {recordingsPerSession} recordings, budget {budgetBytes / 1024**2:.0f} MB')
+        print(f'unbounded lists: {unboundedBytes / 1024**2:8.1f} MB')
+        print(f'recording store: {store.residentBytes() / 1024**2:8.1f} MB')
+
+        start = time.perf_counter()
+        recordingName, trials = store.recording('session-0000', 0)
+        reloadedSamples = trials[0].sampleData['posXLeft'].to_numpy()
+        reloadTime = time.perf_counter() - start
+        print(f'reload of evicted recording: {reloadTime * 1000:.1f} ms, '
+              f'identical: {np.array_equal(firstSamples, reloadedSamples, equal_nan=True)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+'''
+Compares the per-sample and bulk sample paths of EDF2numpy.readEDF.
+Runs against SyntheticEDFbackend so the EDF API does not need to be installed.
+
+Usage: python benchmarks/bench_sample_import.py [numberOfSamples]
+'''
+import sys
+import time
+
+import numpy as np
+
+from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+from nystagmus_app.EDF_file_importer.EDFACCESSwrapper import SAMPLE_TYPE, NO_PENDING_ITEMS
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+
+
+def readSamples(backend:SyntheticEDFbackend, bulk:int) -> np.ndarray:
+    importer = EDF2numpy(backend=backend)
+    importer.consumeInputArgs(f'gaze_data_type:0,bulk_sample_import:{bulk}')
+    return importer.readEDF('synthetic.edf')[3]
+
+
+def timeSamplePath(backend:SyntheticEDFbackend, bulk:int) -> tuple[int, float]:
+    # time only the sample decode, without the allocation and trimming done by readEDF
+    importer = EDF2numpy(backend=backend)
+    importer.consumeInputArgs(f'gaze_data_type:0,bulk_sample_import:{bulk}')
+    importer.SAMPLEdata = np.empty(backend.edf_get_element_count(None), dtype=importer.SAMPLEtype)
+    importer.initSampleBuffer()
+    backend.edf_open_file('synthetic.edf', 0, 0, 1)
+    count = 0
+    start = time.perf_counter()
+    while (dataType := backend.edf_get_next_data(None)) != NO_PENDING_ITEMS:
+        if dataType != SAMPLE_TYPE:
+            continue
+        sampleData = backend.edf_get_float_data(None).FSAMPLE
+        if bulk:
+            importer.bufferSample(sampleData, count + 1)
+        else:
+            importer.SAMPLEdata[count]['elementIndex'] = count + 1
+            importer.appendSample(sampleData, count)
+        count += 1
+    importer.flushSampleBuffer()
+    return count, time.perf_counter() - start
+
+
+def main():
+    sampleCount = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    backend = SyntheticEDFbackend(trialCount=1, trialDuration=sampleCount / 1000, samplingRate=1000)
+    count, perSampleTime = timeSamplePath(backend, 0)
+    count, bulkTime = timeSamplePath(backend, 1)
+
+    checkBackend = SyntheticEDFbackend(trialCount=2, trialDuration=5)
+    perSample = readSamples(checkBackend, 0)
+    bulk = readSamples(checkBackend, 1)
+
+    identical = perSample.dtype == bulk.dtype and perSample.tobytes() == bulk.tobytes()
+    print(f'per-sample: {count/perSampleTime:,.0f} samples/s ({perSampleTime:.2f} s)')
+    print(f'bulk:       {count/bulkTime:,.0f} samples/s ({bulkTime:.2f} s)')
+    print(f'readEDF outputs identical: {identical}')
+
+
+if __name__ == '__main__':
+    main()
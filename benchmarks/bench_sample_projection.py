@@ -0,0 +1,49 @@
+'''
+Compares importing every SAMPLEdata column against the 'position' projection the app uses (sample_fields option),
+for memory per sample and readEDF time on both sample paths. Checks the projected columns match the full import.
+
+Usage: python benchmarks/bench_sample_projection.py [numberOfSamples]
+'''
+import contextlib
+import io
+import sys
+import time
+
+import numpy as np
+
+from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+
+
+def readSamples(backend:SyntheticEDFbackend, sampleFields:str, bulk:int) -> tuple[np.ndarray, float]:
+    importer = EDF2numpy(backend=backend)
+    with contextlib.redirect_stdout(io.StringIO()):
+        importer.consumeInputArgs(f'gaze_data_type:0,bulk_sample_import:{bulk},sample_fields:{sampleFields}')
+        start = time.perf_counter()
+        samples = importer.readEDF('synthetic.edf')[3]
+    return samples, time.perf_counter() - start
+
+
+def main():
+    sampleCount = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    backend = SyntheticEDFbackend(trialCount=2, trialDuration=sampleCount / 2000, samplingRate=1000)
+
+    results = {}
+    for sampleFields in ('all', 'position'):
+        for bulk in (0, 1):
+            results[sampleFields, bulk] = readSamples(backend, sampleFields, bulk)
+
+    for sampleFields in ('all', 'position'):
+        samples = results[sampleFields, 1][0]
+        print(f'{sampleFields:>8}: {samples.dtype.itemsize:4d} bytes/sample, {samples.nbytes / 1024**2:6.1f} MB for {len(samples):,} samples, '
+              f'per-sample {results[sampleFields, 0][1]:.2f} s, bulk {results[sampleFields, 1][1]:.2f} s')
+
+    full = results['all', 1][0]
+    identical = all(np.array_equal(results['position', bulk][0][field], full[field])
+                    for bulk in (0, 1) for field in results['position', bulk][0].dtype.names)
+    print(f'memory reduction: {full.dtype.itemsize / results["position", 1][0].dtype.itemsize:.1f}x')
+    print(f'projected columns identical to full import: {identical}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+'''
+Scaling of EDFTrialParser with trial count at a fixed recording length: the searchsorted trial index
+against the previous per-row boundary loop and per-trial boolean masks. Also checks both give the same trials.
+
+Usage: python benchmarks/bench_trial_index_scaling.py [minutesOfData] [trialCounts...]
+'''
+import sys
+import time
+
+import numpy as np
+
+from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+from nystagmus_app.utils.trial_parsing import EDFTrialParser
+
+
+def previousParse(EDFfileData:np.ndarray) -> list:
+    trialIndices = []
+    tempTrialStart = 0
+    for i in range(len(EDFfileData[1])):
+        if EDFfileData[1][i]['trackerState'] == "START":
+            tempTrialStart = EDFfileData[1][i]['elementIndex']
+        if EDFfileData[1][i]['trackerState'] == "END":
+            trialIndices.append((tempTrialStart, EDFfileData[1][i]['elementIndex']))
+
+    trials = []
+    for startBufferIndex, endBufferIndex in trialIndices:
+        trialData = []
+        for EDFindex in range(1, 6):
+            elementIndex = EDFfileData[EDFindex]['elementIndex']
+            trialData.append(EDFfileData[EDFindex][(elementIndex >= startBufferIndex) & (elementIndex <= endBufferIndex)])
+        trials.append(trialData)
+    return trials
+
+
+def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    trialCounts = [int(count) for count in sys.argv[2:]] or [10, 50, 100, 250, 500]
+
+    print(f'{"trials":>7} {"previous (s)":>13} {"index (s)":>10} {"same":>5}')
+    for trialCount in trialCounts:
+        backend = SyntheticEDFbackend(trialCount=trialCount, trialDuration=minutes * 60 / trialCount, samplingRate=1000)
+        EDFfileData = EDF2numpy(backend=backend).readEDF('synthetic.edf')
+
+        start = time.perf_counter()
+        expected = previousParse(EDFfileData)
+        previousTime = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parser = EDFTrialParser(EDFfileData)
+        trials = parser.extractAllTrials()
+        indexTime = time.perf_counter() - start
+
+        same = len(expected) == len(trials) and all(a.tobytes() == b.tobytes()
+                                                    for oldTrial, trial in zip(expected, trials)
+                                                    for a, b in zip(oldTrial, trial.trialData))
+        print(f'{trialCount:7d} {previousTime:13.3f} {indexTime:10.4f} {str(same):>5}', flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+'''
+Peak RSS and time of EDFTrialParser.extractAllTrials with trial views, against the previous
+boolean-mask extraction that copied every trial into pandas DataFrames up front.
+Each mode runs in its own process so the peaks do not mix.
+
+Usage: python benchmarks/bench_trial_parsing_memory.py [minutesOfData] [trialCount]
+'''
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+from nystagmus_app.utils.trial_parsing import EDFTrialParser
+
+
+def peakRSSMegabytes() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def previousExtraction(parser:EDFTrialParser) -> list:
+    trials = []
+    for startBufferIndex, endBufferIndex in parser.trialIndices:
+        trialData = []
+        for EDFindex in range(1, 6):
+            elementIndex = parser.EDFfileData[EDFindex]['elementIndex']
+            trialData.append(parser.EDFfileData[EDFindex][(elementIndex >= startBufferIndex) & (elementIndex <= endBufferIndex)])
+        dataFrames = [pd.DataFrame(data) for data in trialData]
+        dataFrames[2].replace(-32768, np.nan, inplace=True)
+        trials.append(dataFrames)
+    return trials
+
+
+def runMode(mode:str, minutes:float, trialCount:int) -> None:
+    backend = SyntheticEDFbackend(trialCount=trialCount, trialDuration=minutes * 60 / trialCount, samplingRate=1000)
+    EDFfileData = EDF2numpy(backend=backend).readEDF('synthetic.edf')
+    baseline = peakRSSMegabytes()
+
+    start = time.perf_counter()
+    parser = EDFTrialParser(EDFfileData)
+    if mode == 'previous':
+        trials = previousExtraction(parser)
+    else:
+        trials = parser.extractAllTrials()
+        if mode == 'views+sampleData':
+            for trial in trials:
+                trial.sampleData
+    elapsed = time.perf_counter() - start
+
+    print(f'{mode:18} {elapsed:7.3f} s   peak RSS +{peakRSSMegabytes() - baseline:7.1f} MB', flush=True)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--mode':
+        runMode(sys.argv[2], float(sys.argv[3]), int(sys.argv[4]))
+        return
+
+    minutes = sys.argv[1] if len(sys.argv) > 1 else '10'
+    trialCount = sys.argv[2] if len(sys.argv) > 2 else '20'
+    for mode in ('previous', 'views', 'views+sampleData'):
+        subprocess.run([sys.executable, __file__, '--mode', mode, minutes, trialCount], check=True,
+                       stderr=subprocess.DEVNULL)
+
+
+if __name__ == '__main__':
+    main()
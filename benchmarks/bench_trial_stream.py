@@ -0,0 +1,76 @@
+'''
+Peak memory and time of calibrating and segmenting a synthetic recording: converting the whole file, parsing it into
+trials and calibrating every trial at once (the old batch path) against streaming it one trial at a time through
+streamTrials -> calibrateTrials -> analyseTrials. Peak memory is measured with tracemalloc, which NumPy reports to.
+Checks both paths give the same calibrated data and beats.
+
+Usage: python benchmarks/bench_trial_stream.py [trialCount] [trialSeconds] [samplingRate]
+'''
+import contextlib
+import functools
+import io
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+from nystagmus_app.utils.batch_pipeline import CONVERSION_OPTIONS
+from nystagmus_app.utils.conversion_jobs import readEDFFile
+from nystagmus_app.utils.nystagmus_analysis import analyseTrials, segmentNystagmus, trialSamplingRate
+from nystagmus_app.utils.regression import calibrateRecording, calibrateTrials
+from nystagmus_app.utils.trial_parsing import EDFTrialParser
+from nystagmus_app.utils.trial_stream import streamTrials
+
+CALIBRATION = {'XLeft': {'plus10Degs': 120, 'minus10Degs': -130}, 'XRight': {'plus10Degs': 100, 'minus10Degs': -90}}
+
+
+def fullRecording(backendFactory) -> list:
+    #every trial's calibrated data and beat count, from the whole recording in memory
+    recording = EDFTrialParser(readEDFFile('synthetic.edf', CONVERSION_OPTIONS, backendFactory=backendFactory)).extractAllTrials()
+    columns, positionData, trialOffsets = calibrateRecording(recording, CALIBRATION)
+    results = []
+    for trialNumber, trial in enumerate(recording):
+        trialPosition = positionData[trialOffsets[trialNumber]:trialOffsets[trialNumber+1]]
+        beats = [len(segmentNystagmus(trialPosition[:, columnIndex], trialSamplingRate(trial))) for columnIndex in range(len(columns))]
+        results.append((float(np.nansum(trialPosition)), beats))
+    return results
+
+
+def streamedRecording(backendFactory) -> list:
+    #the same results, one trial at a time
+    columns = ['pos' + key for key in CALIBRATION]
+    trials = calibrateTrials(streamTrials('synthetic.edf', CONVERSION_OPTIONS, backendFactory), CALIBRATION)
+    return [(float(np.nansum(positionData)), [len(beats[column]) for column in columns])
+            for _, positionData, beats in analyseTrials(trials, columns)]
+
+
+def measured(function, *args) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = function(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    trialCount = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    trialSeconds = float(sys.argv[2]) if len(sys.argv) > 2 else 30
+    samplingRate = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    backendFactory = functools.partial(SyntheticEDFbackend, trialCount=trialCount, trialDuration=trialSeconds, samplingRate=samplingRate)
+
+    fullResults, fullTime, fullPeak = measured(fullRecording, backendFactory)
+    streamedResults, streamedTime, streamedPeak = measured(streamedRecording, backendFactory)
+
+    print(f'{trialCount} trials of {trialSeconds:g} s at {samplingRate} Hz')
+    print(f'whole recording: {fullTime:7.2f} s, peak {fullPeak / 1024**2:8.1f} MB')
+    print(f'streamed:        {streamedTime:7.2f} s, peak {streamedPeak / 1024**2:8.1f} MB')
+    print(f'same calibrated data and beats: {fullResults == streamedResults}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+'''
+Compares EDF2numpy.trimArray against the previous row-by-row filter on synthetic, over-allocated arrays
+and checks the trimmed arrays are byte-identical.
+
+Usage: python benchmarks/bench_trim.py [numberOfSamples]
+'''
+import sys
+import time
+from unittest import mock
+
+import numpy as np
+
+import nystagmus_app.EDF_file_importer.EDF2numpy as EDF2numpyModule
+
+
+def fillArrays(importer, sampleCount:int) -> None:
+    rng = np.random.default_rng(0)
+    counts = {'RECORDINGdata': 20, 'MESSAGEdata': 200, 'EVENTdata': sampleCount // 100, 'SAMPLEdata': sampleCount, 'IOEVENTdata': 10}
+    countAttributes = {'RECORDINGdata': 'recCount', 'MESSAGEdata': 'msgCount', 'EVENTdata': 'eventCount',
+                       'SAMPLEdata': 'sampleCount', 'IOEVENTdata': 'IOCount'}
+    for name, count in counts.items():
+        dtype = getattr(importer, name).dtype
+        data = np.zeros(count + count // 10 + 1, dtype=dtype)
+        for field in dtype.names:
+            if data[field].dtype.kind == 'f':
+                data[field][:count] = rng.normal(size=count)
+        data['elementIndex'][:count] = np.arange(1, count + 1)
+        setattr(importer, name, data)
+        setattr(importer, countAttributes[name], count)
+
+
+def previousTrim(importer) -> list:
+    return [np.array([i for i in getattr(importer, name) if i['elementIndex']>0])
+            for name in ('RECORDINGdata', 'MESSAGEdata', 'EVENTdata', 'SAMPLEdata', 'IOEVENTdata')]
+
+
+def main():
+    sampleCount = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with mock.patch.object(EDF2numpyModule, 'EDFACCESSwrapper', lambda: None):
+        importer = EDF2numpyModule.EDF2numpy()
+    fillArrays(importer, sampleCount)
+
+    start = time.perf_counter()
+    expected = previousTrim(importer)
+    previousTime = time.perf_counter() - start
+
+    start = time.perf_counter()
+    importer.trimArray()
+    trimTime = time.perf_counter() - start
+
+    trimmed = [importer.RECORDINGdata, importer.MESSAGEdata, importer.EVENTdata, importer.SAMPLEdata, importer.IOEVENTdata]
+    identical = all(a.dtype == b.dtype and a.tobytes() == b.tobytes() for a, b in zip(expected, trimmed))
+    print(f'row filter: {previousTime:.3f} s')
+    print(f'trimArray:  {trimTime:.6f} s')
+    print(f'byte-identical: {identical}')
+
+
+if __name__ == '__main__':
+    main()
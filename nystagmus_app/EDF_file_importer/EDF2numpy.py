@@ -29,9 +29,11 @@ To utilize the code one must first install the EyeLink Developers Kit:https://ww
 '''
 
 import os, sys
-from nystagmus_app.EDF_file_importer.EDFACCESSwrapper import EDFACCESSwrapper
+from nystagmus_app.EDF_file_importer.EDFACCESSwrapper import EDFACCESSwrapper, FSAMPLE, LSTRING, TRIAL
+from nystagmus_app.EDF_file_importer.StringPool import StringPool, MISSING_INDEX
 #from EDFACCESSwrapper import EDFACCESSwrapper
-import struct
+import codecs
+from ctypes import addressof, memmove, pointer, string_at
 try:
     import numpy as np
 except ModuleNotFoundError as e:
@@ -48,6 +50,10 @@ except:
 MISSING_VALUE = -32768  # missing data type
 MISSING_TEXT = '.'      # missing data type
 
+# sample_fields option presets, None keeps every column. time and elementIndex are always kept
+SAMPLE_FIELD_PRESETS = {'all': None, 'position': ('time','posXLeft','posXRight','posYLeft','posYRight')}
+REQUIRED_SAMPLE_FIELDS = ('time','elementIndex')
+
 EyesTracked = ['Left','Right','Binocular']
 pupilData = ['Area','Diameter']
 recState = ['END','START']
@@ -55,6 +61,38 @@ dataTypes = ['Samples','Events','Samples & Events']
 filterType = ['Off','Standard','Extra']
 trackMode = ['Pupil Only','Pupil-CR']
 parseType = ['RAW','HREF','GAZE']
+eventTypes = ['STARTBLINK','ENDBLINK','STARTSACC','ENDSACC','STARTFIX','ENDFIX','FIXUPDATE']
+ioEventTypes = ['BUTTONEVENT','INPUTEVENT']
+
+# compact_schema option: text columns are stored as their index in these lookup tables, MISSING_CODE if not listed
+CATEGORY_LOOKUPS = {
+    'eventType': eventTypes,
+    'eyeTracked': EyesTracked,
+    'gazeType': parseType,
+    'pupilDataType': pupilData,
+    'trackerState': recState,
+    'recordType': dataTypes,
+    'parsedbyType': parseType,
+    'filterType': filterType,
+    'recordingMode': trackMode,
+    'ioEventType': ioEventTypes}
+MISSING_CODE = -1
+# compact_schema option: field types replacing the standard schema's, flags as integers
+COMPACT_FIELD_TYPES = dict({field: 'i1' for field in CATEGORY_LOOKUPS}, **{
+    'flags': 'i4',
+    'readFlags': 'i4',
+    'parsedby': 'i4',
+    'status': 'i4'})
+# compact_schema option: SAMPLE field types, time as int32 milliseconds counted from the sampleTimeBase of the recording
+# block (the time of its START, held in RECORDINGdata), the FSAMPLE flags in their own width
+COMPACT_SAMPLE_FIELD_TYPES = {
+    'time': 'i4',
+    'headTrackerType': 'i1',
+    'headTargetDataFlags': 'i2',
+    'inputPortData': 'u2',
+    'buttonData': 'u2',
+    'flags': 'u2',
+    'errors': 'u2'}
 
 ##-----------------------------------------------------
 ## EDFAPI data types - Do not alter
@@ -88,15 +126,41 @@ PARSEDBY_HREF = int(0x0080)
 PARSEDBY_RAW = int(0x0040)
 ##-----------------------------------------------------
 
+def missingValue(dtype):
+    '''
+    Value marking missing data in a column: MISSING_VALUE, or for compact_schema columns too narrow to hold it
+    the column type's minimum (signed) or maximum (unsigned)
+    '''
+    dtype = np.dtype(dtype)
+    if dtype.kind not in 'iu':
+        return MISSING_VALUE
+    limits = np.iinfo(dtype)
+    if limits.min <= MISSING_VALUE:
+        return MISSING_VALUE
+    return limits.min if dtype.kind == 'i' else limits.max
+def categoryLabels(values, field):
+    '''
+    Text labels of a column that may hold compact_schema codes. Columns already stored as text are returned unchanged.
+    '''
+    values = np.asarray(values)
+    if values.dtype.kind not in 'iu':
+        return values
+    # MISSING_CODE (-1) indexes the trailing MISSING_TEXT
+    return np.array(CATEGORY_LOOKUPS[field] + [MISSING_TEXT])[values]
+
 ##--------------------------------------------------------------------------------------------------------------------------------
 ## EDF2numpy functions
 ##--------------------------------------------------------------------------------------------------------------------------------
 class EDF2numpy:
     '''
     This class imports the EDF file into a pandas data structure
+    The EDF is read through a backend providing the EDFACCESSwrapper calls; by default the EDFAccess API itself,
+    or e.g. SyntheticEDFbackend to run without the EyeLink Developers Kit installed.
     '''
-    def __init__(self):
-        self.Edfwrapper = EDFACCESSwrapper()        # import EDFAccess wrapper DDL/class
+    def __init__(self, backend=None):
+        if backend is None:
+            backend = EDFACCESSwrapper()            # import EDFAccess wrapper DDL/class
+        self.Edfwrapper = backend                   # reader backend providing the EDF access calls
         self.EDFData = None                         # pointer for EDF file
         self.errmsg = None                          # holder for exceptions
         self.CurrentEyeTracked = 0                  # The eye currently being tracked based on the RecordINFO
@@ -135,6 +199,10 @@ class EDF2numpy:
             'output_samplevel_model_type': 0,       # 0 = Standard model                1 = Fast model
             'output_sample_start_enabled': 0,       # 0 = Start Sample data disabled;   1 = Start Sample Data Enabled
             'output_sample_end_enabled': 0,         # 0 = End Sample data disabled;     1 = End Sample Data Enabled
+            'bulk_sample_import': 1,                # 0 = per-sample field writes;      1 = chunked bulk sample import
+            'single_pass_import': 1,                # 0 = count elements before reading 1 = size arrays from the element count and grow while reading
+            'sample_fields': 'all',                 # SAMPLEdata columns to decode: 'all', 'position' (time and pos* only) or field names joined by '|'
+            'compact_schema': 0,                    # 0 = float time and text columns;  1 = integer time (samples from their block's sampleTimeBase) and flags, text columns as CATEGORY_LOOKUPS codes
         # set the messages that marks the onset/offset of a trial. See comments for edf_set_trial_identifier for heuristics
             'trial_parse_start': 'TRIALID',         # the string used to mark the start of the trial
             'trial_parse_end': 'TRIAL_RESULT'       # the string used to mark the end of the trial
@@ -146,12 +214,24 @@ class EDF2numpy:
         self.recCount = 0                           # number of start recordings events detected
         self.trialCount = 0                         # number of trials detected in the file
         self.debugfile = None                       # place holder for debug file handle
+        self.sampleBlockSize = 8192                 # number of samples buffered before a block is committed to SAMPLEdata
+        self.samplePlan = None                      # (SAMPLEdata field, FSAMPLE field) pairs resolved from self.options
+        self.sampleBuffer = None                    # raw FSAMPLE records waiting to be committed
+        self.sampleBufferAddress = None             # address of sampleBuffer, looked up once rather than per sample
+        self.sampleElementBuffer = None             # EDF buffer index of each buffered sample
+        self.sampleBufferCount = 0                  # number of samples currently buffered
+        self.sampleBlockStart = 0                   # SAMPLEdata row the buffered block will be written to
+        self.progressCallback = None                # optional callable(elementsDecoded, elementCount) reporting import progress
+        self.progressInterval = 65536               # number of elements decoded between progress reports
+        self.elementCount = 0                       # number of elements in the EDF, from edf_get_element_count
+        self.messagePool = None                     # StringPool of the message texts, attached to MESSAGEdata once the file is read
+        self.trialHeaders = None                    # (start time, end time) of each trial, read by openTrials
 
 ##--------------------------------------------------------------------------------------------------------------------------------
 ## Data array Schemas
 ##--------------------------------------------------------------------------------------------------------------------------------
-        # SAMPLE DATA STRUCTURE
-        self.SAMPLEtype = np.dtype([
+        # SAMPLE DATA STRUCTURE, SAMPLEtype is narrowed to the columns requested by the sample_fields option
+        self.SAMPLEfullType = np.dtype([
             ('time','f4'),                  # timestamp in milliseconds
             ('posXLeft','f4'),              # left_eye X gaze position [RAW, HREF, or GAZE]
             ('posXRight','f4'),             # right_eye X gaze position [RAW, HREF, or GAZE]
@@ -177,6 +257,9 @@ class EDF2numpy:
             ('elementIndex','i8'),          # index in EDF buffer
             ('sampleIndex','i8')            # index of sample data
             ])
+        self.SAMPLEtype = self.SAMPLEfullType
+        # raw FSAMPLE layout, used to copy whole samples out of the API buffer for bulk import
+        self.FSAMPLEtype = np.dtype(FSAMPLE)
         # IOEVENT Data Structure
         self.IOEVENTtype = np.dtype([
             ('ioEventType','U6'),           # Event type (Button or INPUT)
@@ -235,7 +318,7 @@ class EDF2numpy:
         # MESSAGE Data Structure
         self.MESSAGETtype = np.dtype([
             ('time','i8'),                                                      # Timestamp in milliseconds
-            ('message','U256'),                                                 # Message data from event
+            ('textIndex','i4'),                                                 # Index of the message text in the message text pool (MISSING_INDEX if masked)
             ('messageLength','i4'),                                             # Message length from msg event
             ('readFlags','i4'),                                                 # reading warnings
             ('flags','f4'),                                                     # event warnings
@@ -259,6 +342,8 @@ class EDF2numpy:
             ('elementIndex','i8'),                                                      # Index in EDF buffer
             ('recordingIndex','i8')                                                     # Index of Event data
             ])
+        # compact_schema sample times are counted from the START of their recording block, 0 until one is read
+        self.sampleTimeBase = 0
         # create empy data arrays so we have a place to store data
         self.HEADERdata = np.empty(1,dtype=self.HEADERtype)
         self.RECORDINGdata = np.empty(1,dtype=self.RECORDINGStype)
@@ -266,6 +351,8 @@ class EDF2numpy:
         self.EVENTdata = np.empty(1,dtype=self.EVENTtype)
         self.SAMPLEdata = np.empty(1,dtype=self.SAMPLEtype)
         self.IOEVENTdata = np.empty(1,dtype=self.IOEVENTtype)
+        # schemas selected by the compact_schema option start from these
+        self.standardTypes = (self.SAMPLEfullType, self.EVENTtype, self.RECORDINGStype, self.IOEVENTtype)
         # MASTERdata = np.array([self.HEADERdata,self.RECORDINGdata,self.MESSAGEdata, self.SAMPLEdata,self.EVENTdata,self.IOEVENTdata],dtype=self.MASTERtype)
 ##--------------------------------------------------------------------------------------------------------------------------------
 ## import functions
@@ -299,6 +386,8 @@ class EDF2numpy:
                                 print('\n!! Invalid input value assignment: "' + str(i) + '". This option will be ignored!')
                         elif attribute == 'trial_parse_start' or attribute == 'trial_parse_end' or attribute == 'text_data_type': 
                             updates[attribute]=str(value)
+                        elif attribute == 'sample_fields' and self.sampleFieldNames(value) != None:
+                            updates[attribute]=str(value)
                         else:
                             print('\n!! Invalid input value assignment: "' + str(i) + '". This option will be ignored!')
                     else:
@@ -308,6 +397,9 @@ class EDF2numpy:
                 self.options.update(updates)
                 # Encode consistency options into binary form
                 self.combineConsistencyArgs()
+                # Select the standard or compact schema, then narrow the sample structure to the requested columns
+                self.applySchemaOption()
+                self.projectSampleType()
                 return inputArgs
             else:
                 return 0
@@ -362,6 +454,55 @@ class EDF2numpy:
             if self.errmsg != None:
                 raise Exception(self.errmsg)
                 return self.errmsg
+    def applySchemaOption(self):
+        '''
+        Switch the SAMPLE, EVENT, RECORDING and IOEVENT structures between the standard schema and the compact one.
+        '''
+        types = self.standardTypes
+        if self.options['compact_schema'] == 1:
+            types = tuple(np.dtype([(field, COMPACT_FIELD_TYPES.get(field, dtype.fields[field][0])) for field in dtype.names]) for dtype in types)
+            sampleType, eventType, recordingType, ioEventType = types
+            sampleType = np.dtype([(field, COMPACT_SAMPLE_FIELD_TYPES.get(field, sampleType.fields[field][0])) for field in sampleType.names])
+            # time of the recording block's START, sample times of the block are counted from it
+            recordingType = np.dtype(recordingType.descr + [('sampleTimeBase','i8')])
+            types = (sampleType, eventType, recordingType, ioEventType)
+        self.SAMPLEfullType, self.EVENTtype, self.RECORDINGStype, self.IOEVENTtype = types
+        self.EVENTdata = np.empty(1,dtype=self.EVENTtype)
+        self.RECORDINGdata = np.empty(1,dtype=self.RECORDINGStype)
+        self.IOEVENTdata = np.empty(1,dtype=self.IOEVENTtype)
+        return types
+    def categoryValue(self, field, label):
+        '''
+        Value stored for a text column: the label itself, or its CATEGORY_LOOKUPS code with the compact schema
+        '''
+        if self.options['compact_schema'] != 1:
+            return label
+        if label in CATEGORY_LOOKUPS[field]:
+            return CATEGORY_LOOKUPS[field].index(label)
+        return MISSING_CODE
+    def sampleFieldNames(self, sampleFields):
+        '''
+        Resolve a sample_fields option into the SAMPLEdata columns to keep, in schema order. Returns None if it names an unknown column.
+        time and elementIndex are always kept, trials are split and timed with them.
+        '''
+        if sampleFields in SAMPLE_FIELD_PRESETS:
+            requested = SAMPLE_FIELD_PRESETS[sampleFields]
+        else:
+            requested = [field.strip() for field in sampleFields.split('|') if field.strip() != '']
+        if requested == None:
+            return list(self.SAMPLEfullType.names)
+        if any(field not in self.SAMPLEfullType.names for field in requested):
+            return None
+        return [field for field in self.SAMPLEfullType.names if field in requested or field in REQUIRED_SAMPLE_FIELDS]
+    def projectSampleType(self):
+        '''
+        Build SAMPLEtype from the sample_fields option. Excluded columns are neither allocated nor read from the API's samples.
+        '''
+        fieldNames = self.sampleFieldNames(self.options['sample_fields'])
+        self.SAMPLEtype = np.dtype([(field, self.SAMPLEfullType.fields[field][0]) for field in fieldNames])
+        self.SAMPLEdata = np.empty(1,dtype=self.SAMPLEtype)
+        self.samplePlan = None
+        return self.SAMPLEtype
     def combineConsistencyArgs(self):
         '''
         Combine different consistency flags into one binary flag from a more human readable format
@@ -396,7 +537,6 @@ class EDF2numpy:
             numberOfParseEvents = 0
             numberOfRecordings = 0
             numberOfMessages = 0
-            maxStrLength = 0
             #Get the trial count from the API
             self.trialCount = self.Edfwrapper.edf_get_trial_count(tempData) 
             if(self.trialCount%2):
@@ -410,10 +550,6 @@ class EDF2numpy:
                     numberOfEvents +=1
                 elif DataType == MESSAGEEVENT:
                     numberOfMessages +=1
-                    strlen = self.Edfwrapper.edf_get_float_data(tempData).FEVENT.message.contents.length
-                    if strlen>maxStrLength:
-                        maxStrLength = strlen
-                        strlen = None
                 elif DataType == BUTTONEVENT or DataType == INPUTEVENT:
                     numberOfIOEvents +=1
                 elif DataType == STARTEVENTS or DataType == ENDEVENTS:
@@ -435,7 +571,6 @@ class EDF2numpy:
                 else:
                     self.errmsg = 'Datatype unknown: cannot allocate data value'
             # resize arrays to appropriate size (may overprovision)
-            strSize = '<U'+str(maxStrLength)
             if self.options['recinfo_enabled']==1:
                 self.RECORDINGdata = np.resize(self.RECORDINGdata,numberOfRecordings)
                 sys.stdout.write('. ')
@@ -443,12 +578,9 @@ class EDF2numpy:
             else:
                 self.RECORDINGdata = None
             if self.options['messages_enabled']==1:
-                #update the size of the message container to max message size - This needs to be optimized
-                self.MESSAGETtype = np.dtype([('time','i8'),('message',strSize),('messageLength','i4'),('readFlags','i4'),('flags','f4'),('parsedby',np.str_),('status','i4'),('elementIndex','i8'),('msgIndex','i8')])
-                #reasign data type to proper size
-                self.MESSAGEdata = np.empty(1,dtype=self.MESSAGETtype)
-                #preallocate array for proper size
-                self.MESSAGEdata = np.resize(self.MESSAGEdata,numberOfMessages)
+                #message rows are fixed width, their text goes to the message text pool
+                self.MESSAGEdata = np.zeros(numberOfMessages,dtype=self.MESSAGETtype)
+                self.messagePool = StringPool()
                 sys.stdout.write('. ')
                 sys.stdout.flush()
             else:
@@ -498,27 +630,93 @@ class EDF2numpy:
             if self.errmsg != None:
                 raise Exception(self.errmsg)
                 return self.errmsg
+    def allocateFromElementCount(self, EDFData):
+        '''
+        Size the data arrays from edf_get_element_count so the file only has to be walked once.
+        Samples make up nearly every element, so SAMPLEdata starts at the element count; the other arrays start small and grow as needed.
+        Note: may overprovision so make sure to trim the arrays afterwards
+        '''
+        print('...Allocating data arrays from element count...')
+        try:
+            numberOfElements = self.Edfwrapper.edf_get_element_count(EDFData)
+            self.trialCount = self.Edfwrapper.edf_get_trial_count(EDFData)
+            if(self.trialCount%2):
+                print('There are trials not starting or ending properly.\n')
+            self.allocateArrays(numberOfElements, min(numberOfElements, 1024))
+            if self.options['output_data_debugflags'] ==1:
+                print('Detected Number of Elements: ' + str(numberOfElements))
+                print('Detected Number of Trials: ' + str(self.trialCount))
+            return numberOfElements
+        except:
+            if self.errmsg == None:
+                self.errmsg = 'Failed to allocate data arrays.'
+        finally:
+            if self.errmsg != None:
+                raise Exception(self.errmsg)
+                return self.errmsg
+    def allocateArrays(self, sampleSize, initialSize):
+        '''
+        Allocate empty data arrays for the enabled data types and reset the record counts.
+        Parameters:
+            sampleSize = rows of SAMPLEdata.
+            initialSize = rows of the other arrays, which grow as needed.
+        '''
+        self.eventCount = 0
+        self.sampleCount = 0
+        self.msgCount = 0
+        self.IOCount = 0
+        self.recCount = 0
+        # compact_schema sample times are counted from the START of their recording block, 0 until one is read
+        self.sampleTimeBase = 0
+        if self.options['recinfo_enabled']==1:
+            self.RECORDINGdata = np.zeros(initialSize, dtype=self.RECORDINGStype)
+        else:
+            self.RECORDINGdata = None
+        if self.options['messages_enabled']==1:
+            self.MESSAGEdata = np.zeros(initialSize, dtype=self.MESSAGETtype)
+            self.messagePool = StringPool()
+        else:
+            self.MESSAGEdata = None
+        if self.options['events_enabled'] ==1:
+            self.EVENTdata = np.zeros(initialSize, dtype=self.EVENTtype)
+        else:
+            self.EVENTdata = None
+        if self.options['samples_enabled']==1:
+            self.SAMPLEdata = np.zeros(sampleSize, dtype=self.SAMPLEtype)
+        else:
+            self.SAMPLEdata = None
+        if self.options['ioevents_enabled']==1:
+            self.IOEVENTdata = np.zeros(initialSize, dtype=self.IOEVENTtype)
+        else:
+            self.IOEVENTdata = None
+        return 0
+    def growArray(self, data, index):
+        '''
+        Return data with room for row index, doubling its size when it is full.
+        Arrays sized by prealocateArraySize are returned unchanged.
+        '''
+        if data.size > index:
+            return data
+        grown = np.zeros(max(2*data.size, index+1), dtype=data.dtype)
+        grown[:data.size] = data
+        return grown
+    def readMessageText(self, message):
+        '''
+        Bytes of an LSTRING message, read in one call rather than a character at a time
+        '''
+        return string_at(addressof(message.contents) + LSTRING.text.offset, max(message.contents.length - 1, 0)).split(b'\0', 1)[0]
     def trimArray(self):
         '''
-        Remove any empty rows from the data arrays to cut out the fat
+        Remove any empty rows from the data arrays to cut out the fat.
+        Rows are filled in order, so each array is cut back to its record count as a view of the allocated buffer.
         '''
         print('...Trimming empty cells from array...')
         try:
-            sys.stdout.write('. ')
-            sys.stdout.flush()
-            self.RECORDINGdata = np.array([i for i in self.RECORDINGdata if i['elementIndex']>0])
-            sys.stdout.write('. ')
-            sys.stdout.flush()
-            self.MESSAGEdata = np.array([i for i in self.MESSAGEdata if i['elementIndex']>0])
-            sys.stdout.write('. ')
-            sys.stdout.flush()
-            self.EVENTdata = np.array([i for i in self.EVENTdata if i['elementIndex']>0])
-            sys.stdout.write('. ')
-            sys.stdout.flush()
-            self.SAMPLEdata = np.array([i for i in self.SAMPLEdata if i['elementIndex']>0])
-            sys.stdout.write('. ')
-            sys.stdout.flush()
-            self.IOEVENTdata = np.array([i for i in self.IOEVENTdata if i['elementIndex']>0])
+            self.RECORDINGdata = self.trimToCount(self.RECORDINGdata, self.recCount)
+            self.MESSAGEdata = self.trimToCount(self.MESSAGEdata, self.msgCount)
+            self.EVENTdata = self.trimToCount(self.EVENTdata, self.eventCount)
+            self.SAMPLEdata = self.trimToCount(self.SAMPLEdata, self.sampleCount)
+            self.IOEVENTdata = self.trimToCount(self.IOEVENTdata, self.IOCount)
             sys.stdout.write('\n')
             sys.stdout.flush()
             return 0
@@ -529,6 +727,15 @@ class EDF2numpy:
             if self.errmsg != None:
                 raise Exception(self.errmsg)
                 return self.errmsg
+    def trimToCount(self, data, count):
+        '''
+        Slice off the rows past count, keeping the dtype. Disabled (None) arrays are passed through.
+        '''
+        sys.stdout.write('. ')
+        sys.stdout.flush()
+        if data is None:
+            return None
+        return data[:count]
     def openDebugFile(self,Outputfilename):
         '''
         Opens debug file
@@ -579,11 +786,10 @@ class EDF2numpy:
         msg = ''
         try:
             self.EVENTdata[index]['eventIndex'] = index
-            self.EVENTdata[index]['eyeTracked']=EyesTracked[Data.eye]
-            self.EVENTdata[index]['gazeType'] = ['RAW','HREF','GAZE'][self.options['gaze_data_type']]
+            self.EVENTdata[index]['eyeTracked']=self.categoryValue('eyeTracked', EyesTracked[Data.eye])
+            self.EVENTdata[index]['gazeType'] = self.categoryValue('gazeType', parseType[self.options['gaze_data_type']])
             if Data.message:
-                for i in struct.unpack('<'+str(Data.message.contents.length-1)+'c',Data.message.contents.text):
-                    msg = msg + i.decode(self.options['text_data_type'])
+                msg = self.readMessageText(Data.message).decode(self.options['text_data_type'])
                 self.EVENTdata[index]['message']=msg
             else:
                 self.EVENTdata[index]['message'] = MISSING_TEXT
@@ -726,7 +932,7 @@ class EDF2numpy:
                 else:
                     self.EVENTdata[index]['readFlags']= MISSING_VALUE
                     self.EVENTdata[index]['flags']= MISSING_VALUE
-                    self.EVENTdata[index]['parsedby']= MISSING_TEXT
+                    self.EVENTdata[index]['parsedby']= MISSING_VALUE if self.options['compact_schema'] == 1 else MISSING_TEXT
                     self.EVENTdata[index]['status']= MISSING_VALUE
             return 0
         except:
@@ -737,144 +943,197 @@ class EDF2numpy:
                 raise Exception(self.errmsg)
                 return self.errmsg
     def appendSample(self,Data,index):
+        '''
+        Write one sample into SAMPLEdata, only reading the FSAMPLE fields of the columns in SAMPLEtype
+        '''
         try:
-            self.SAMPLEdata[index]['sampleIndex'] = index
-            self.SAMPLEdata[index]['time']=Data.time
-            if self.options['gaze_data_type'] == 0:
-                self.SAMPLEdata[index]['posXLeft']= Data.px.left
-                self.SAMPLEdata[index]['posYLeft']= Data.py.left
-                self.SAMPLEdata[index]['posXRight']= Data.px.right
-                self.SAMPLEdata[index]['posYRight']= Data.py.right
-            elif self.options['gaze_data_type'] == 1:
-                self.SAMPLEdata[index]['posXLeft']= Data.hx.left
-                self.SAMPLEdata[index]['posYLeft']= Data.hy.left
-                self.SAMPLEdata[index]['posXRight']= Data.hx.right
-                self.SAMPLEdata[index]['posYRight']= Data.hy.right
-            elif self.options['gaze_data_type'] == 2:
-                self.SAMPLEdata[index]['posXLeft']= Data.gx.left
-                self.SAMPLEdata[index]['posYLeft']= Data.gy.left
-                self.SAMPLEdata[index]['posXRight']= Data.gx.right
-                self.SAMPLEdata[index]['posYRight']= Data.gy.right
-            else:
-                self.SAMPLEdata[index]['posXLeft']= MISSING_VALUE
-                self.SAMPLEdata[index]['posYLeft']= MISSING_VALUE
-                self.SAMPLEdata[index]['posXRight']= MISSING_VALUE
-                self.SAMPLEdata[index]['posYRight']= MISSING_VALUE
+            if self.samplePlan == None:
+                self.buildSamplePlan()
+            fieldNames = self.SAMPLEtype.names
+            row = self.SAMPLEdata[index]
+            if 'sampleIndex' in fieldNames:
+                row['sampleIndex'] = index
+            row['time']=Data.time - self.sampleTimeBase
+            for field, source in self.samplePlan:
+                if source == None:
+                    row[field] = missingValue(self.SAMPLEtype[field])
+                elif len(source) == 1:
+                    row[field] = getattr(Data, source[0])
+                else:
+                    row[field] = getattr(getattr(Data, source[0]), source[1])
+            if self.options['output_headtargetdata_enabled'] == 1 and 'headTrackerType' in fieldNames:
+                if Data.htype != MISSING:
+                    row['headTrackerType']= Data.htype
+                    row['headTargetDataX']= Data.hdata.targetX
+                    row['headTargetDataY']= Data.hdata.targetY
+                    row['headTargetDataZ']= Data.hdata.targetDist
+                    row['headTargetDataFlags']= Data.hdata.targetFlags
+                else:
+                    row['headTrackerType']= missingValue(self.SAMPLEtype['headTrackerType'])
+                    row['headTargetDataX']= MISSING_VALUE
+                    row['headTargetDataY']= MISSING_VALUE
+                    row['headTargetDataZ']= MISSING_VALUE
+                    row['headTargetDataFlags']= MISSING_VALUE
+            if self.options['output_data_debugflags'] == 1:
+                self.appendDebugFile(self.debugfile,row)
+            return 0
+        except:
+            if self.errmsg == None:
+                self.errmsg = 'Could not append gaze sample to Sample structure.'
+        finally:
+            if self.errmsg != None:
+                raise Exception(self.errmsg)
+                return self.errmsg
+    def buildSamplePlan(self):
+        '''
+        Resolve the sample options once into (SAMPLEdata field, FSAMPLE field path) pairs for the sample paths.
+        A field path of None means the column is filled with MISSING_VALUE. Columns not in SAMPLEtype are left out.
+        '''
+        try:
+            gazeType = self.options['gaze_data_type']
+            posSource = [('px','py'),('hx','hY'),('gx','gy')][gazeType]
+            plan = [
+                ('posXLeft', (posSource[0],'left')),
+                ('posYLeft', (posSource[1],'left')),
+                ('posXRight', (posSource[0],'right')),
+                ('posYRight', (posSource[1],'right'))]
             if self.options['output_data_pupilsize'] == 1:
-                self.SAMPLEdata[index]['pupilSizeLeft']= Data.pa.left
-                self.SAMPLEdata[index]['pupilSizeRight']= Data.pa.right
+                plan += [('pupilSizeLeft', ('pa','left')), ('pupilSizeRight', ('pa','right'))]
             else:
-                self.SAMPLEdata[index]['pupilSizeLeft']= MISSING_VALUE
-                self.SAMPLEdata[index]['pupilSizeRight']= MISSING_VALUE
+                plan += [('pupilSizeLeft', None), ('pupilSizeRight', None)]
             if self.options['output_data_ppd'] == 1:
-                self.SAMPLEdata[index]['PpdX']= Data.rx
-                self.SAMPLEdata[index]['PpdY']= Data.ry
+                plan += [('PpdX', ('rx',)), ('PpdY', ('ry',))]
             else:
-                self.SAMPLEdata[index]['PpdX']= (MISSING_VALUE)
-                self.SAMPLEdata[index]['PpdY']= (MISSING_VALUE)
-            if self.options['gaze_data_type'] == 0 and self.options['output_data_velocity'] == 1 and self.options['output_samplevel_model_type'] == 0:
-                self.SAMPLEdata[index]['velXLeft']= Data.rxvel.left
-                self.SAMPLEdata[index]['velYLeft']= Data.ryvel.left
-                self.SAMPLEdata[index]['velXRight']= Data.rxvel.right
-                self.SAMPLEdata[index]['velYRight']= Data.ryvel.right
-            elif self.options['gaze_data_type'] == 1 and self.options['output_data_velocity'] == 1 and self.options['output_samplevel_model_type'] == 0:
-                self.SAMPLEdata[index]['velXLeft']= Data.hxvel.left
-                self.SAMPLEdata[index]['velYLeft']= Data.hyvel.left
-                self.SAMPLEdata[index]['velXRight']= Data.hxvel.right
-                self.SAMPLEdata[index]['velYRight']= Data.hyvel.right
-            elif self.options['gaze_data_type'] == 2 and self.options['output_data_velocity'] == 1 and self.options['output_samplevel_model_type'] == 0:
-                self.SAMPLEdata[index]['velXLeft']= Data.gxvel.left
-                self.SAMPLEdata[index]['velYLeft']= Data.gyvel.left
-                self.SAMPLEdata[index]['velXRight']= Data.gxvel.right
-                self.SAMPLEdata[index]['velYRight']= Data.gyvel.right
-            elif self.options['gaze_data_type'] == 0 and self.options['output_data_velocity'] == 1 and self.options['output_samplevel_model_type'] == 1:
-                self.SAMPLEdata[index]['velXLeft']= Data.frxvel.left
-                self.SAMPLEdata[index]['velYLeft']= Data.fryvel.left
-                self.SAMPLEdata[index]['velXRight']= Data.frxvel.right
-                self.SAMPLEdata[index]['velYRight']= Data.fryvel.right
-            elif self.options['gaze_data_type'] == 1 and self.options['output_data_velocity'] == 1 and self.options['output_samplevel_model_type'] == 1:
-                self.SAMPLEdata[index]['velXLeft']= Data.fhxvel.left
-                self.SAMPLEdata[index]['velYLeft']= Data.fhyvel.left
-                self.SAMPLEdata[index]['velXRight']= Data.fhxvel.right
-                self.SAMPLEdata[index]['velYRight']= Data.fhyvel.right
-            elif self.options['gaze_data_type'] == 2 and self.options['output_data_velocity'] == 1 and self.options['output_samplevel_model_type'] == 1:
-                self.SAMPLEdata[index]['velXLeft']= Data.fgxvel.left
-                self.SAMPLEdata[index]['velYLeft']= Data.fgyvel.left
-                self.SAMPLEdata[index]['velXRight']= Data.fgxvel.right
-                self.SAMPLEdata[index]['velYRight']= Data.fgyvel.right
+                plan += [('PpdX', None), ('PpdY', None)]
+            if self.options['output_data_velocity'] == 1:
+                velPrefix = ['','f'][self.options['output_samplevel_model_type']] + ['r','h','g'][gazeType]
+                plan += [
+                    ('velXLeft', (velPrefix + 'xvel','left')),
+                    ('velYLeft', (velPrefix + 'yvel','left')),
+                    ('velXRight', (velPrefix + 'xvel','right')),
+                    ('velYRight', (velPrefix + 'yvel','right'))]
             else:
-                self.SAMPLEdata[index]['fastVelXLeft']= MISSING_VALUE
-                self.SAMPLEdata[index]['fastVelYLeft']= MISSING_VALUE
-                self.SAMPLEdata[index]['fastVelXRight']= MISSING_VALUE
-                self.SAMPLEdata[index]['fastVelYRight']= MISSING_VALUE
-            if self.options['output_headtargetdata_enabled'] == 1:
-                if Data.htype != MISSING:
-                    self.SAMPLEdata[index]['headTrackerType']= Data.htype
-                    self.SAMPLEdata[index]['headTargetDataX']= Data.hdata.targetX
-                    self.SAMPLEdata[index]['headTargetDataY']= Data.hdata.targetY
-                    self.SAMPLEdata[index]['headTargetDataZ']= Data.hdata.targetDist
-                    self.SAMPLEdata[index]['headTargetDataFlags']= Data.hdata.targetFlags
-                else:
-                    self.SAMPLEdata[index]['headTrackerType'] = MISSING_VALUE
-                    self.SAMPLEdata[index]['headTrackerType']= MISSING_VALUE
-                    self.SAMPLEdata[index]['headTargetDataX']= MISSING_VALUE
-                    self.SAMPLEdata[index]['headTargetDataY']= MISSING_VALUE
-                    self.SAMPLEdata[index]['headTargetDataZ']= MISSING_VALUE
-                    self.SAMPLEdata[index]['headTargetDataFlags']= MISSING_VALUE
+                plan += [('velXLeft', None), ('velYLeft', None), ('velXRight', None), ('velYRight', None)]
+            if self.options['output_headtargetdata_enabled'] != 1:
+                plan += [('headTrackerType', None), ('headTargetDataX', None), ('headTargetDataY', None),
+                         ('headTargetDataZ', None), ('headTargetDataFlags', None)]
             if self.options['ioevents_enabled'] == 1:
-                self.SAMPLEdata[index]['inputPortData']= Data.inputs
-                self.SAMPLEdata[index]['buttonData']= Data.buttons
+                plan += [('inputPortData', ('inputs',)), ('buttonData', ('buttons',))]
             else:
-                self.SAMPLEdata[index]['inputPortData']= MISSING_VALUE
-                self.SAMPLEdata[index]['buttonData']= MISSING_VALUE
+                plan += [('inputPortData', None), ('buttonData', None)]
             if self.options['output_data_debugflags'] == 1:
-                self.SAMPLEdata[index]['flags']= Data.flags
-                self.SAMPLEdata[index]['errors']=Data.errors
-                self.appendDebugFile(self.debugfile,self.SAMPLEdata[index])
+                plan += [('flags', ('flags',)), ('errors', ('errors',))]
             else:
-                self.SAMPLEdata[index]['flags']= MISSING_VALUE
-                self.SAMPLEdata[index]['errors']= MISSING_VALUE
+                plan += [('flags', None), ('errors', None)]
+            self.samplePlan = [(field, source) for field, source in plan if field in self.SAMPLEtype.names]
+            return self.samplePlan
+        except:
+            if self.errmsg == None:
+                self.errmsg = 'Could not build the sample field mapping.'
+        finally:
+            if self.errmsg != None:
+                raise Exception(self.errmsg)
+                return self.errmsg
+    def initSampleBuffer(self):
+        '''
+        Resolve the sample plan and allocate the raw sample buffer before reading the EDF
+        '''
+        self.buildSamplePlan()
+        self.sampleBuffer = np.empty(self.sampleBlockSize, dtype=self.FSAMPLEtype)
+        self.sampleBufferAddress = self.sampleBuffer.ctypes.data
+        self.sampleElementBuffer = np.empty(self.sampleBlockSize, dtype='i8')
+        self.sampleBufferCount = 0
+        self.sampleBlockStart = self.sampleCount
+        return 0
+    def bufferSample(self,Data,elementIndex):
+        '''
+        Copy one FSAMPLE record out of the API buffer. The block is committed to SAMPLEdata once it is full.
+        '''
+        try:
+            position = self.sampleBufferCount
+            itemSize = self.FSAMPLEtype.itemsize
+            memmove(self.sampleBufferAddress + position*itemSize, addressof(Data), itemSize)
+            self.sampleElementBuffer[position] = elementIndex
+            self.sampleBufferCount += 1
+            self.sampleCount += 1
+            if self.sampleBufferCount == self.sampleBlockSize:
+                self.flushSampleBuffer()
             return 0
         except:
             if self.errmsg == None:
-                self.errmsg = 'Could not append gaze sample to Sample structure.'
+                self.errmsg = 'Could not buffer gaze sample.'
+        finally:
+            if self.errmsg != None:
+                raise Exception(self.errmsg)
+                return self.errmsg
+    def flushSampleBuffer(self):
+        '''
+        Commit the buffered samples to SAMPLEdata as one block, one column at a time
+        '''
+        try:
+            count = self.sampleBufferCount
+            if count == 0:
+                return 0
+            start = self.sampleBlockStart
+            raw = self.sampleBuffer[:count]
+            self.SAMPLEdata = self.growArray(self.SAMPLEdata, start+count-1)
+            block = self.SAMPLEdata[start:start+count]
+            if 'sampleIndex' in self.SAMPLEtype.names:
+                block['sampleIndex'] = np.arange(start, start+count)
+            block['elementIndex'] = self.sampleElementBuffer[:count]
+            block['time'] = raw['time'].astype(np.int64) - self.sampleTimeBase
+            for field, source in self.samplePlan:
+                if source == None:
+                    block[field] = missingValue(self.SAMPLEtype[field])
+                elif len(source) == 1:
+                    block[field] = raw[source[0]]
+                else:
+                    block[field] = raw[source[0]][source[1]]
+            if self.options['output_headtargetdata_enabled'] == 1 and 'headTrackerType' in self.SAMPLEtype.names:
+                headTargetPresent = raw['htype'] != MISSING
+                block['headTrackerType'] = np.where(headTargetPresent, raw['htype'], missingValue(self.SAMPLEtype['headTrackerType']))
+                block['headTargetDataX'] = np.where(headTargetPresent, raw['hdata']['targetX'], MISSING_VALUE)
+                block['headTargetDataY'] = np.where(headTargetPresent, raw['hdata']['targetY'], MISSING_VALUE)
+                block['headTargetDataZ'] = np.where(headTargetPresent, raw['hdata']['targetDist'], MISSING_VALUE)
+                block['headTargetDataFlags'] = np.where(headTargetPresent, raw['hdata']['targetFlags'], MISSING_VALUE)
+            if self.options['output_data_debugflags'] == 1:
+                for row in block:
+                    self.appendDebugFile(self.debugfile,row)
+            self.sampleBlockStart += count
+            self.sampleBufferCount = 0
+            return 0
+        except:
+            if self.errmsg == None:
+                self.errmsg = 'Could not commit sample block to Sample structure.'
         finally:
             if self.errmsg != None:
                 raise Exception(self.errmsg)
                 return self.errmsg
     def appendMessage(self,Data,index):
-        decoded = ''
         offset = 0
         try:
             self.MESSAGEdata[index]['msgIndex'] = index
             self.MESSAGEdata[index]['time']=Data.sttime
-            msg = repr(str(Data.message.contents.text,self.options['text_data_type']))
-            self.MESSAGEdata[index]['message'] = np.bytes_(msg)
-            #for i in msg:
-                #decoded = decoded + i.decode(self.options['text_data_type'])
-            # try:
-                # for i in struct.unpack('<'+str(Data.message.contents.length-1)+'c',repr(str(Data.message.contents.text))):
-                    # print('b')
-                    # msg = msg + i.decode(self.options['text_data_type'])
-                    # print('c')
-            # except:
-                # print('d')
-                # msg = msg + repr(str(Data.message.contents.text,'utf-8'))
+            # decode the whole message at once, the pool holds it as UTF-8 and stores repeated texts once
+            text = self.readMessageText(Data.message)
+            decoded = text.decode(self.options['text_data_type'])
+            if codecs.lookup(self.options['text_data_type']).name != 'utf-8':
+                text = decoded.encode('utf-8')
+            self.MESSAGEdata[index]['textIndex'] = self.messagePool.add(text)
             if self.options['msg_offset_enabled'] == 1:
                 try:
                     offset = int(decoded.split(" ")[0])
                 except:
                     pass
                 if offset!=0 and self.options['msg_offset_enabled'] == 1:
-                    self.MESSAGEdata[index]['time']= Data.sttime - int(decoded.split(" ")[0])
+                    self.MESSAGEdata[index]['time']= Data.sttime - offset
                 else:
                     self.MESSAGEdata[index]['time']= Data.sttime
             else:
                 self.MESSAGEdata[index]['time']= Data.sttime
             if self.options['output_dataviewer_commands'] == 0 and decoded.find('!V')>= 0:
-                print('a')
                 self.MESSAGEdata[index]['time'] = MISSING_VALUE
-                self.MESSAGEdata[index]['message'] = MISSING_TEXT
+                self.MESSAGEdata[index]['textIndex'] = MISSING_INDEX
                 self.MESSAGEdata[index]['messageLength'] = MISSING_VALUE
             if self.options['output_data_debugflags'] == 1:
                 self.MESSAGEdata[index]['messageLength'] = Data.message.contents.length
@@ -909,26 +1168,33 @@ class EDF2numpy:
                 return self.errmsg
     def appendRecording(self,Data,index):
         try:
+            if self.options['compact_schema'] == 1:
+                if recState[int(Data.state)] == 'START':
+                    # samples buffered before the START are committed against the previous block's base
+                    if self.options['samples_enabled'] == 1 and self.options['bulk_sample_import'] == 1:
+                        self.flushSampleBuffer()
+                    self.sampleTimeBase = int(Data.time)
+                self.RECORDINGdata[index]['sampleTimeBase'] = self.sampleTimeBase
             self.RECORDINGdata[index]['recordingIndex'] = index
             self.RECORDINGdata[index]['samplingRate'] = Data.sample_rate
-            self.RECORDINGdata[index]['eyeTracked'] = EyesTracked[int(Data.eye-1)]
+            self.RECORDINGdata[index]['eyeTracked'] = self.categoryValue('eyeTracked', EyesTracked[int(Data.eye-1)])
             if int(Data.eye) ==3:
                 self.CurrentEyeTracked = slice(int(Data.eye-1))
             else:
                 self.CurrentEyeTracked = int(Data.eye-1)
-            self.RECORDINGdata[index]['pupilDataType'] = pupilData[int(Data.pupil_type)]
-            self.RECORDINGdata[index]['trackerState'] = recState[int(Data.state)]
-            self.RECORDINGdata[index]['recordType'] = dataTypes[int(Data.record_type)-1]
+            self.RECORDINGdata[index]['pupilDataType'] = self.categoryValue('pupilDataType', pupilData[int(Data.pupil_type)])
+            self.RECORDINGdata[index]['trackerState'] = self.categoryValue('trackerState', recState[int(Data.state)])
+            self.RECORDINGdata[index]['recordType'] = self.categoryValue('recordType', dataTypes[int(Data.record_type)-1])
             if abs(Data.posType) == PARSEDBY_GAZE:
-                self.RECORDINGdata[index]['parsedbyType'] = 'GAZE'
+                self.RECORDINGdata[index]['parsedbyType'] = self.categoryValue('parsedbyType', 'GAZE')
             elif abs(Data.posType) == PARSEDBY_HREF:
-                self.RECORDINGdata[index]['parsedbyType'] = 'HREF'
+                self.RECORDINGdata[index]['parsedbyType'] = self.categoryValue('parsedbyType', 'HREF')
             elif abs(Data.posType) == PARSEDBY_RAW:
-                self.RECORDINGdata[index]['parsedbyType'] = 'RAW'
+                self.RECORDINGdata[index]['parsedbyType'] = self.categoryValue('parsedbyType', 'RAW')
             else:
-                self.RECORDINGdata[index]['parsedbyType'] = 'Unknown.  Please Contact Support@sr-research.com'
-            self.RECORDINGdata[index]['filterType'] = filterType[Data.filter_type]
-            self.RECORDINGdata[index]['recordingMode'] = trackMode[int(Data.recording_mode)]
+                self.RECORDINGdata[index]['parsedbyType'] = self.categoryValue('parsedbyType', 'Unknown.  Please Contact Support@sr-research.com')
+            self.RECORDINGdata[index]['filterType'] = self.categoryValue('filterType', filterType[Data.filter_type])
+            self.RECORDINGdata[index]['recordingMode'] = self.categoryValue('recordingMode', trackMode[int(Data.recording_mode)])
             if self.options['output_data_debugflags'] == 1:
                 self.RECORDINGdata[index]['endflags'] = Data.eflags
                 self.RECORDINGdata[index]['startflags'] = Data.sflags
@@ -944,6 +1210,178 @@ class EDF2numpy:
             if self.errmsg != None:
                 raise Exception(self.errmsg)
                 return self.errmsg
+    def decodeElement(self, DataType, currentElement):
+        '''
+        Copy the current element of the EDF buffer into the data arrays according to its data type.
+        Returns False for the block markers, which are skipped without taking an element number.
+        '''
+        if DataType == SAMPLE_TYPE:
+            # Copy Sample data to SAMPLE Array, checked first as samples are most of the elements
+            if self.options['samples_enabled']== 1 and self.options['bulk_sample_import'] == 1:
+                sampleData = self.Edfwrapper.edf_get_float_data(self.EDFData).FSAMPLE
+                self.bufferSample(sampleData, currentElement)
+            elif self.options['samples_enabled']== 1:
+                self.SAMPLEdata = self.growArray(self.SAMPLEdata, self.sampleCount)
+                self.SAMPLEdata[self.sampleCount]['elementIndex'] = currentElement
+                sampleData = self.Edfwrapper.edf_get_float_data(self.EDFData).FSAMPLE
+                self.appendSample(sampleData, self.sampleCount)
+                self.sampleCount +=1
+        elif DataType == STARTPARSE:
+            return False
+            # print('this feature is not yet enabled')
+            # if self.options['output_eventdata_parse']== 1 and self.options['events_enabled']== 1:
+                # #sparseData = self.Edfwrapper.edf_get_float_data(self.EDFData)
+        elif DataType == ENDPARSE:
+            return False
+            # print('this feature is not yet enabled')
+            # if self.options['output_eventdata_parse']== 1 and self.options['events_enabled']== 1:
+                # #eparseData = self.Edfwrapper.edf_get_float_data(self.EDFData)
+        elif DataType == BREAKPARSE:
+            return False
+            # print('this feature is not yet enabled')
+            # if self.options['output_eventdata_parse']== 1 and self.options['events_enabled']== 1:
+                # #bparseData = self.Edfwrapper.edf_get_float_data(self.EDFData)
+        elif DataType == STARTBLINK:
+            # Copy Start Blink data to Event Array
+            if self.options['output_eventtype_blink']==1 and self.options['output_eventtype_start']==1 and self.options['events_enabled']==1:
+                self.EVENTdata = self.growArray(self.EVENTdata, self.eventCount)
+                self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
+                self.EVENTdata[self.eventCount]['eventType'] = self.categoryValue('eventType', "STARTBLINK")
+                sblinkData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
+                self.appendEvent(sblinkData,DataType,self.eventCount)
+                self.eventCount +=1
+        elif DataType == ENDBLINK:
+            # Copy End Blink data to Event Array
+            if self.options['output_eventtype_blink']== 1 and self.options['output_eventtype_end']==1 and self.options['events_enabled']== 1:
+                self.EVENTdata = self.growArray(self.EVENTdata, self.eventCount)
+                self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
+                self.EVENTdata[self.eventCount]['eventType'] = self.categoryValue('eventType', "ENDBLINK")
+                eblinkData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
+                self.appendEvent(eblinkData,DataType,self.eventCount)
+                self.eventCount +=1
+        elif DataType == STARTSACC:
+            # Copy Start Saccade data to Event Array
+            if self.options['output_eventtype_saccade']== 1 and self.options['output_eventtype_start']==1 and self.options['events_enabled']== 1:
+                self.EVENTdata = self.growArray(self.EVENTdata, self.eventCount)
+                self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
+                self.EVENTdata[self.eventCount]['eventType'] = self.categoryValue('eventType', "STARTSACC")
+                ssaccData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
+                self.appendEvent(ssaccData,DataType,self.eventCount)
+                self.eventCount +=1
+        elif DataType == ENDSACC:
+            # Copy End Saccade data to Event Array
+            if self.options['output_eventtype_saccade']== 1 and self.options['output_eventtype_end']==1 and self.options['events_enabled']== 1:
+                self.EVENTdata = self.growArray(self.EVENTdata, self.eventCount)
+                self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
+                self.EVENTdata[self.eventCount]['eventType'] = self.categoryValue('eventType', "ENDSACC")
+                esaccData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
+                self.appendEvent(esaccData,DataType,self.eventCount)
+                self.eventCount +=1
+        elif DataType == STARTFIX:
+            # Copy Start Fixation data to Event Array
+            if self.options['output_eventtype_fixation']==1 and self.options['output_eventtype_start']==1 and self.options['events_enabled']==1:
+                self.EVENTdata = self.growArray(self.EVENTdata, self.eventCount)
+                self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
+                self.EVENTdata[self.eventCount]['eventType'] = self.categoryValue('eventType', "STARTFIX")
+                sfixData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
+                self.appendEvent(sfixData,DataType,self.eventCount)
+                self.eventCount +=1
+        elif DataType == ENDFIX:
+            # Copy End Fixation data to Event Array
+            if self.options['output_eventtype_fixation']== 1 and self.options['output_eventtype_end']==1 and self.options['events_enabled']== 1:
+                self.EVENTdata = self.growArray(self.EVENTdata, self.eventCount)
+                self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
+                self.EVENTdata[self.eventCount]['eventType'] = self.categoryValue('eventType', "ENDFIX")
+                efixData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
+                self.appendEvent(efixData,DataType,self.eventCount)
+                self.eventCount +=1
+        elif DataType == FIXUPDATE:
+            # Copy Fixation Update data to Event Array
+            if self.options['output_eventtype_fixupdate']== 1 and self.options['events_enabled']== 1:
+                self.EVENTdata = self.growArray(self.EVENTdata, self.eventCount)
+                self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
+                self.EVENTdata[self.eventCount]['eventType'] = self.categoryValue('eventType', "FIXUPDATE")
+                fixupdateData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
+                self.appendEvent(fixupdateData,DataType,self.eventCount)
+                self.eventCount +=1
+        elif DataType == STARTSAMPLES:
+            # Copy Start Samples to Sample Array
+            return False
+            # print('this feature is not yet enabled')
+            #if self.options['output_sample_start_enabled']== 1 and self.options['samples_enabled']== 1:
+                # self.SAMPLEdata[self.sampleCount]['elementIndex'] = currentElement
+                # sSampleData = self.Edfwrapper.edf_get_float_data(self.EDFData).FSAMPLE
+                # self.appendSample(sSampleData, self.sampleCount)
+                # self.sampleCount +=1
+        elif DataType == ENDSAMPLES:
+            # Copy end Samples to Sample Array
+            return False
+            # print('this feature is not yet enabled')
+            #if self.options['output_sample_end_enabled']== 1 and self.options['samples_enabled']== 1:
+                # self.SAMPLEdata[self.sampleCount]['elementIndex'] = currentElement
+                # sSampleData = self.Edfwrapper.edf_get_float_data(self.EDFData).FSAMPLE
+                # self.appendSample(sSampleData, self.sampleCount)
+                # self.sampleCount +=1
+        elif DataType == STARTEVENTS:
+            # Copy Start Samples to Event Array
+            return False
+            # print('this feature is not yet enabled')
+            #if self.options['output_eventtype_start']== 1 and self.options['events_enabled']== 1:
+                # self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
+                # self.EVENTdata[self.eventCount]['eventType'] = "STARTEVENT"
+                # startEventData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
+                # self.appendEvent(startEventData,DataType,self.eventCount)
+                # self.eventCount +=1
+        elif DataType == ENDEVENTS:
+            # Copy End Samples to Event Array
+            return False
+            # print('this feature is not yet enabled')
+            #if self.options['output_eventtype_end']== 1 and self.options['events_enabled']== 1:
+                # self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
+                # self.EVENTdata[self.eventCount]['eventType'] = "ENDEVENTS"
+                # endEventData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
+                # self.appendEvent(endEventData,DataType,self.eventCount)
+                # self.eventCount +=1
+        elif DataType == MESSAGEEVENT:
+            # Copy Message data to Message Array
+            if self.options['messages_enabled']== 1 and self.options['events_enabled']== 1:
+                self.MESSAGEdata = self.growArray(self.MESSAGEdata, self.msgCount)
+                self.MESSAGEdata[self.msgCount]['elementIndex'] = currentElement
+                msgData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
+                self.appendMessage(msgData,self.msgCount)
+                self.msgCount +=1
+        elif DataType == BUTTONEVENT:
+            # Copy Button data to IOEVENT Array
+            if self.options['ioevents_enabled']== 1 and self.options['events_enabled']== 1:
+                self.IOEVENTdata = self.growArray(self.IOEVENTdata, self.IOCount)
+                self.IOEVENTdata[self.IOCount]['elementIndex'] = currentElement
+                self.IOEVENTdata[self.IOCount]['ioEventType'] = self.categoryValue('ioEventType', "BUTTONEVENT")
+                buttData = self.Edfwrapper.edf_get_float_data(self.EDFData)
+                self.appendIOEvent(buttData,self.IOCount)
+                self.IOCount +=1
+        elif DataType == INPUTEVENT:
+            # Copy Input data to IOEVENT Array
+            if self.options['ioevents_enabled']== 1 and self.options['events_enabled']== 1:
+                self.IOEVENTdata = self.growArray(self.IOEVENTdata, self.IOCount)
+                self.IOEVENTdata[self.IOCount]['elementIndex'] = currentElement
+                self.IOEVENTdata[self.IOCount]['ioEventType'] = self.categoryValue('ioEventType', "INPUTEVENT")
+                inpData = self.Edfwrapper.edf_get_float_data(self.EDFData)
+                self.appendIOEvent(inpData,self.IOCount)
+                self.IOCount +=1
+        elif DataType == RECORDING_INFO:
+            # Copy recording data to Recording Array
+            sys.stdout.write('. ')
+            sys.stdout.flush()
+            if self.options['recinfo_enabled'] == 1:
+                self.RECORDINGdata = self.growArray(self.RECORDINGdata, self.recCount)
+                self.RECORDINGdata[self.recCount]['elementIndex'] = currentElement
+                recData = self.Edfwrapper.edf_get_float_data(self.EDFData).RECORDINGS
+                self.appendRecording(recData,self.recCount)
+                self.recCount += 1
+        else:
+            self.errmsg = "Unknown data type #: " + str(DataType) + '@element#' + str(currentElement)
+            raise Exception(self.errmsg)
+        return True
     def readEDF(self,edfFilename):
         '''
         Read in and parse EDF file into data structures
@@ -951,8 +1389,14 @@ class EDF2numpy:
         '''
         print('...Attempting to read in data...')
         # Resize empty arrays to appropriate size
-        self.prealocateArraySize(edfFilename)
-        self.EDFData = self.openEDF(edfFilename)
+        if self.options['single_pass_import'] == 1:
+            self.EDFData = self.openEDF(edfFilename)
+            self.allocateFromElementCount(self.EDFData)
+        else:
+            self.prealocateArraySize(edfFilename)
+            self.EDFData = self.openEDF(edfFilename)
+        if self.options['samples_enabled'] == 1 and self.options['bulk_sample_import'] == 1:
+            self.initSampleBuffer()
         try:
             if (self.EDFData != None):
                 # Read in file preamble text
@@ -967,172 +1411,34 @@ class EDF2numpy:
                     print("No preamble text found")
                 print('...Attempting to read contents of EDF...')
                 sys.stdout.write('.')
+                if self.progressCallback is not None:
+                    self.elementCount = self.Edfwrapper.edf_get_element_count(self.EDFData)
+                    self.progressCallback(0, self.elementCount)
                 if self.trialCount > 0:
                     currentElement = 1
                     while(True):
                         # Get the dat type of the current element in the EDF File buffer
                         DataType = self.Edfwrapper.edf_get_next_data(self.EDFData)
-                        if DataType == STARTPARSE:
-                            continue
-                            # print('this feature is not yet enabled')
-                            # if self.options['output_eventdata_parse']== 1 and self.options['events_enabled']== 1:
-                                # #sparseData = self.Edfwrapper.edf_get_float_data(self.EDFData)
-                        elif DataType == ENDPARSE:
-                            continue
-                            # print('this feature is not yet enabled')
-                            # if self.options['output_eventdata_parse']== 1 and self.options['events_enabled']== 1:
-                                # #eparseData = self.Edfwrapper.edf_get_float_data(self.EDFData)
-                        elif DataType == BREAKPARSE:
-                            continue
-                            # print('this feature is not yet enabled')
-                            # if self.options['output_eventdata_parse']== 1 and self.options['events_enabled']== 1:
-                                # #bparseData = self.Edfwrapper.edf_get_float_data(self.EDFData)
-                        elif DataType == STARTBLINK:
-                            # Copy Start Blink data to Event Array
-                            if self.options['output_eventtype_blink']==1 and self.options['output_eventtype_start']==1 and self.options['events_enabled']==1:
-                                self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
-                                self.EVENTdata[self.eventCount]['eventType'] = "STARTBLINK"
-                                sblinkData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
-                                self.appendEvent(sblinkData,DataType,self.eventCount)
-                                self.eventCount +=1
-                        elif DataType == ENDBLINK:
-                            # Copy End Blink data to Event Array
-                            if self.options['output_eventtype_blink']== 1 and self.options['output_eventtype_end']==1 and self.options['events_enabled']== 1:
-                                self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
-                                self.EVENTdata[self.eventCount]['eventType'] = "ENDBLINK"
-                                eblinkData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
-                                self.appendEvent(eblinkData,DataType,self.eventCount)
-                                self.eventCount +=1
-                        elif DataType == STARTSACC:
-                            # Copy Start Saccade data to Event Array
-                            if self.options['output_eventtype_saccade']== 1 and self.options['output_eventtype_start']==1 and self.options['events_enabled']== 1:
-                                self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
-                                self.EVENTdata[self.eventCount]['eventType'] = "STARTSACC"
-                                ssaccData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
-                                self.appendEvent(ssaccData,DataType,self.eventCount)
-                                self.eventCount +=1
-                        elif DataType == ENDSACC:
-                            # Copy End Saccade data to Event Array
-                            if self.options['output_eventtype_saccade']== 1 and self.options['output_eventtype_end']==1 and self.options['events_enabled']== 1:
-                                self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
-                                self.EVENTdata[self.eventCount]['eventType'] = "ENDSACC"
-                                esaccData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
-                                self.appendEvent(esaccData,DataType,self.eventCount)
-                                self.eventCount +=1
-                        elif DataType == STARTFIX:
-                            # Copy Start Fixation data to Event Array
-                            if self.options['output_eventtype_fixation']==1 and self.options['output_eventtype_start']==1 and self.options['events_enabled']==1:
-                                self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
-                                self.EVENTdata[self.eventCount]['eventType'] = "STARTFIX"
-                                sfixData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
-                                self.appendEvent(sfixData,DataType,self.eventCount)
-                                self.eventCount +=1
-                        elif DataType == ENDFIX:
-                            # Copy End Fixation data to Event Array
-                            if self.options['output_eventtype_fixation']== 1 and self.options['output_eventtype_end']==1 and self.options['events_enabled']== 1:
-                                self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
-                                self.EVENTdata[self.eventCount]['eventType'] = "ENDFIX"
-                                efixData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
-                                self.appendEvent(efixData,DataType,self.eventCount)
-                                self.eventCount +=1
-                        elif DataType == FIXUPDATE:
-                            # Copy Fixation Update data to Event Array
-                            if self.options['output_eventtype_fixupdate']== 1 and self.options['events_enabled']== 1:
-                                self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
-                                self.EVENTdata[self.eventCount]['eventType'] = "FIXUPDATE"
-                                fixupdateData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
-                                self.appendEvent(fixupdateData,DataType,self.eventCount)
-                                self.eventCount +=1
-                        elif DataType == STARTSAMPLES:
-                            # Copy Start Samples to Sample Array
-                            continue
-                            # print('this feature is not yet enabled')
-                            #if self.options['output_sample_start_enabled']== 1 and self.options['samples_enabled']== 1:
-                                # self.SAMPLEdata[self.sampleCount]['elementIndex'] = currentElement
-                                # sSampleData = self.Edfwrapper.edf_get_float_data(self.EDFData).FSAMPLE
-                                # self.appendSample(sSampleData, self.sampleCount)
-                                # self.sampleCount +=1
-                        elif DataType == ENDSAMPLES:
-                            # Copy end Samples to Sample Array
-                            continue
-                            # print('this feature is not yet enabled')
-                            #if self.options['output_sample_end_enabled']== 1 and self.options['samples_enabled']== 1:
-                                # self.SAMPLEdata[self.sampleCount]['elementIndex'] = currentElement
-                                # sSampleData = self.Edfwrapper.edf_get_float_data(self.EDFData).FSAMPLE
-                                # self.appendSample(sSampleData, self.sampleCount)
-                                # self.sampleCount +=1
-                        elif DataType == STARTEVENTS:
-                            # Copy Start Samples to Event Array
-                            continue
-                            # print('this feature is not yet enabled')
-                            #if self.options['output_eventtype_start']== 1 and self.options['events_enabled']== 1:
-                                # self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
-                                # self.EVENTdata[self.eventCount]['eventType'] = "STARTEVENT"
-                                # startEventData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
-                                # self.appendEvent(startEventData,DataType,self.eventCount)
-                                # self.eventCount +=1
-                        elif DataType == ENDEVENTS:
-                            # Copy End Samples to Event Array
-                            continue
-                            # print('this feature is not yet enabled')
-                            #if self.options['output_eventtype_end']== 1 and self.options['events_enabled']== 1:
-                                # self.EVENTdata[self.eventCount]['elementIndex'] = currentElement
-                                # self.EVENTdata[self.eventCount]['eventType'] = "ENDEVENTS"
-                                # endEventData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
-                                # self.appendEvent(endEventData,DataType,self.eventCount)
-                                # self.eventCount +=1
-                        elif DataType == MESSAGEEVENT:
-                            # Copy Message data to Message Array
-                            if self.options['messages_enabled']== 1 and self.options['events_enabled']== 1:
-                                self.MESSAGEdata[self.msgCount]['elementIndex'] = currentElement
-                                msgData = self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT
-                                self.appendMessage(msgData,self.msgCount)
-                                self.msgCount +=1
-                        elif DataType == BUTTONEVENT:
-                            # Copy Button data to IOEVENT Array
-                            if self.options['ioevents_enabled']== 1 and self.options['events_enabled']== 1:
-                                self.IOEVENTdata[self.IOCount]['elementIndex'] = currentElement
-                                self.IOEVENTdata[self.IOCount]['ioEventType'] = "BUTTONEVENT"
-                                buttData = self.Edfwrapper.edf_get_float_data(self.EDFData)
-                                self.appendIOEvent(buttData,self.IOCount)
-                                self.IOCount +=1
-                        elif DataType == INPUTEVENT:
-                            # Copy Input data to IOEVENT Array
-                            if self.options['ioevents_enabled']== 1 and self.options['events_enabled']== 1:
-                                self.IOEVENTdata[self.IOCount]['elementIndex'] = currentElement
-                                self.IOEVENTdata[self.IOCount]['ioEventType'] = "INPUTEVENT"
-                                inpData = self.Edfwrapper.edf_get_float_data(self.EDFData)
-                                self.appendIOEvent(inpData,self.IOCount)
-                                self.IOCount +=1
-                        elif DataType == RECORDING_INFO:
-                            # Copy recording data to Recording Array
-                            sys.stdout.write('. ')
-                            sys.stdout.flush()
-                            if self.options['recinfo_enabled'] == 1:
-                                self.RECORDINGdata[self.recCount]['elementIndex'] = currentElement
-                                recData = self.Edfwrapper.edf_get_float_data(self.EDFData).RECORDINGS
-                                self.appendRecording(recData,self.recCount)
-                                self.recCount += 1
-                        elif DataType == SAMPLE_TYPE:
-                            # Copy Sample data to SAMPLE Array
-                            if self.options['samples_enabled']== 1:
-                                self.SAMPLEdata[self.sampleCount]['elementIndex'] = currentElement
-                                self.SAMPLEdata[self.sampleCount]['sampleIndex'] = self.sampleCount
-                                sampleData = self.Edfwrapper.edf_get_float_data(self.EDFData).FSAMPLE
-                                self.appendSample(sampleData, self.sampleCount)
-                                self.sampleCount +=1
-                        elif DataType == NO_PENDING_ITEMS:
+                        if DataType == NO_PENDING_ITEMS:
                             # Terminate because there is no data left in the buffer
+                            if self.options['samples_enabled'] == 1 and self.options['bulk_sample_import'] == 1:
+                                self.flushSampleBuffer()
                             sys.stdout.write('\n')
                             sys.stdout.flush()
+                            if self.progressCallback is not None:
+                                self.progressCallback(self.elementCount, self.elementCount)
                             print('Converted successfully: ' + str(int(self.trialCount/2)) + ' Trials; ' + str(self.sampleCount) + ' Samples; ' + str(self.eventCount) + ' Events; ' + str(self.msgCount) + ' Messages; ' + str(self.IOCount) + ' Input Events ')
                             self.trimArray()
+                            if self.MESSAGEdata is not None:
+                                self.MESSAGEdata = self.messagePool.attach(self.MESSAGEdata)
                             self.MASTERdata = np.array([self.HEADERdata,self.RECORDINGdata,self.MESSAGEdata, self.SAMPLEdata,self.EVENTdata,self.IOEVENTdata],dtype=object)
                             self.closeEDF(self.EDFData)
                             return self.MASTERdata
-                        else:
-                            self.errmsg = "Unknown data type #: " + str(DataType) + '@element#' + str(currentElement)
-                            break
+                        elif not self.decodeElement(DataType, currentElement):
+                            # block markers are skipped without taking an element number
+                            continue
+                        if self.progressCallback is not None and currentElement % self.progressInterval == 0:
+                            self.progressCallback(currentElement, self.elementCount)
                         currentElement +=1
                 else:
                     self.errmsg = 'No trials detected! Please make sure that you preallocate the data arrays prior to running the readEDF function.'
@@ -1146,3 +1452,116 @@ class EDF2numpy:
                 self.closeEDF(self.EDFData)
                 raise Exception(self.errmsg)
                 return self.errmsg
+    def allocateTrialArrays(self):
+        '''
+        Allocate small data arrays for reading one trial, they grow as the trial is read
+        '''
+        self.allocateArrays(1024, 64)
+        if self.options['samples_enabled'] == 1 and self.options['bulk_sample_import'] == 1:
+            self.initSampleBuffer()
+        return 0
+    def collectTrialArrays(self):
+        '''
+        Commit any buffered samples and return the data read since allocateTrialArrays in the same layout as readEDF
+        '''
+        if self.options['samples_enabled'] == 1 and self.options['bulk_sample_import'] == 1:
+            self.flushSampleBuffer()
+        self.trimArray()
+        if self.MESSAGEdata is not None:
+            self.MESSAGEdata = self.messagePool.attach(self.MESSAGEdata)
+        return np.array([self.HEADERdata,self.RECORDINGdata,self.MESSAGEdata, self.SAMPLEdata,self.EVENTdata,self.IOEVENTdata],dtype=object)
+    def openTrials(self,edfFilename):
+        '''
+        Open an EDF for reading a trial at a time, reading only the preamble and the header of each trial.
+        The file is kept open for readTrial until closeEDF is called.
+        Returns the (start time, end time) of each trial, from its start and end trial identifier messages.
+        '''
+        try:
+            self.EDFData = self.openEDF(edfFilename)
+            preambleTextLength = self.Edfwrapper.edf_get_preamble_text_length(self.EDFData)
+            if(preambleTextLength > 0):
+                self.HEADERdata['Header'] = self.Edfwrapper.edf_get_preamble_text(self.EDFData,preambleTextLength+1)
+            self.trialCount = self.Edfwrapper.edf_get_trial_count(self.EDFData)
+            # headers are read until edf_jump_to_trial fails, the trial count is only used as an upper bound (see readEDF)
+            trialHeader = TRIAL()
+            trialHeaders = []
+            for trialNumber in range(self.trialCount):
+                if self.Edfwrapper.edf_jump_to_trial(self.EDFData, trialNumber) != 0:
+                    break
+                self.Edfwrapper.edf_get_trial_header(self.EDFData, pointer(trialHeader))
+                trialHeaders.append((trialHeader.starttime, trialHeader.endtime))
+            self.trialHeaders = np.array(trialHeaders, dtype='i8').reshape(-1, 2)
+            if len(self.trialHeaders) == 0:
+                self.errmsg = 'No trials detected! Make sure the trial_parse_start and trial_parse_end messages are in the EDF.'
+            return self.trialHeaders
+        except:
+            if self.errmsg == None:
+                self.errmsg = 'Failed to read the trial headers of the EDF file.'
+        finally:
+            if self.errmsg != None:
+                self.closeEDF(self.EDFData)
+                raise Exception(self.errmsg)
+                return self.errmsg
+    def readTrial(self,trialNumber):
+        '''
+        Decode one trial of a file opened with openTrials into the same layout as readEDF, without reading the rest of the file.
+        Reading starts at the trial's start message and stops at the first message or recording event after its end message.
+        Parameters:
+            trialNumber = trial number. This should be a value between 0 and len(self.trialHeaders)-1.
+        '''
+        self.errmsg = None
+        try:
+            trialEnd = self.trialHeaders[trialNumber][1]
+            self.allocateTrialArrays()
+            if self.Edfwrapper.edf_jump_to_trial(self.EDFData, int(trialNumber)) != 0:
+                self.errmsg = 'Failed to jump to trial ' + str(trialNumber)
+                raise Exception(self.errmsg)
+            currentElement = 1
+            while(True):
+                DataType = self.Edfwrapper.edf_get_next_data(self.EDFData)
+                if DataType == NO_PENDING_ITEMS:
+                    break
+                elif DataType == MESSAGEEVENT and self.Edfwrapper.edf_get_float_data(self.EDFData).FEVENT.sttime > trialEnd:
+                    break
+                elif DataType == RECORDING_INFO and self.Edfwrapper.edf_get_float_data(self.EDFData).RECORDINGS.time > trialEnd:
+                    break
+                elif not self.decodeElement(DataType, currentElement):
+                    continue
+                currentElement +=1
+            return self.collectTrialArrays()
+        except:
+            if self.errmsg == None:
+                self.errmsg = 'Failed to read trial ' + str(trialNumber) + ' of the EDF file.'
+        finally:
+            if self.errmsg != None:
+                raise Exception(self.errmsg)
+                return self.errmsg
+    def iterTrials(self,edfFilename):
+        '''
+        Read the EDF in one forward pass, yielding the data of each recording block in the same layout as readEDF
+        as soon as its END recording event has been read. Fresh data arrays are allocated for every block, so memory
+        is bounded by the largest block rather than the whole file. Elements between an END and the next START
+        (e.g. the trial's TRIAL_RESULT and the next TRIALID messages) are part of the next block.
+        Element numbers run across the whole file, as in readEDF, while the row index fields (sampleIndex, eventIndex, ...)
+        count the rows of each block. The file is closed when the generator finishes or is closed.
+        '''
+        self.errmsg = None
+        self.EDFData = self.openEDF(edfFilename)
+        try:
+            preambleTextLength = self.Edfwrapper.edf_get_preamble_text_length(self.EDFData)
+            if(preambleTextLength > 0):
+                self.HEADERdata['Header'] = self.Edfwrapper.edf_get_preamble_text(self.EDFData,preambleTextLength+1)
+            self.allocateTrialArrays()
+            currentElement = 1
+            while(True):
+                DataType = self.Edfwrapper.edf_get_next_data(self.EDFData)
+                if DataType == NO_PENDING_ITEMS:
+                    break
+                elif not self.decodeElement(DataType, currentElement):
+                    continue
+                currentElement +=1
+                if DataType == RECORDING_INFO and recState[int(self.Edfwrapper.edf_get_float_data(self.EDFData).RECORDINGS.state)] == 'END':
+                    yield self.collectTrialArrays()
+                    self.allocateTrialArrays()
+        finally:
+            self.closeEDF(self.EDFData)
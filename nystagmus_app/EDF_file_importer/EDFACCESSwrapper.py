@@ -134,6 +134,17 @@ class RECORDINGS(Structure):
         ('posType', c_byte),
         ('eye', c_byte) ]
 
+class TRIAL(Structure):
+    '''
+    A structure for storing the EDFaccess API's TRIAL Structure
+    This data is filled by edf_get_trial_header for the trial last jumped to
+    '''
+    _fields_=[
+        ('rec', POINTER(RECORDINGS)),
+        ('duration', c_uint32),
+        ('starttime', c_uint32),
+        ('endtime', c_uint32)]
+
 class IMESSAGE(Structure):
     '''
     A structure for storing the EDFaccess API's IMESSAGE Structure
@@ -366,7 +377,7 @@ class EDFACCESSwrapper:
                     self.EDFlib.edf_jump_to_trial.argtypes=[c_void_p, c_int]
                     #edf_get_trial_header
                     self.EDFlib.edf_get_trial_header.restype=c_int
-                    self.EDFlib.edf_get_trial_header.argtypes=[c_void_p, c_int]
+                    self.EDFlib.edf_get_trial_header.argtypes=[c_void_p, POINTER(TRIAL)]
                     #edf_goto_previous_trial
                     self.EDFlib.edf_goto_previous_trial.restype=c_int
                     self.EDFlib.edf_goto_previous_trial.argtypes=[c_void_p]
@@ -700,7 +711,7 @@ class EDFACCESSwrapper:
             unless there are any errors it returns 0.
         '''
         try:
-            prevTrial = self.EDFlib.edf_get_trial_header(edfData)
+            prevTrial = self.EDFlib.edf_goto_previous_trial(edfData)
             return prevTrial
         except:
             self.errmsg = 'Failed to get previous trial'
@@ -799,7 +810,7 @@ class EDFACCESSwrapper:
             unless there are any errors it returns 0.
         '''
         try:
-            result = self.EDFlib.edf_free_bookmark(self,edfData, bookmark)
+            result = self.EDFlib.edf_free_bookmark(edfData, bookmark)
             return result
         except:
             self.errmsg = 'Failed to release bookmark'
@@ -35,11 +35,13 @@ import logging
 logging.basicConfig(filename='std.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filemode='w')
 logger = logging.getLogger(__name__)
 
-def readFileWithInputs(inputs):
+def readFileWithInputs(inputs, progressCallback=None):
     errmsg = None
     options = []
     try:
         EDFI = EDF2numpy()
+        # Optional callable(elementsDecoded, elementCount) called as the file is read
+        EDFI.progressCallback = progressCallback
         # Get EDF filename argument as first arg
         edfFilename = str(inputs[0]).strip()
         # check that it's actually an EDF file
@@ -78,7 +80,7 @@ def readFileWithInputs(inputs):
         
 
 
-def EDFToNumpy(EDFfilePath, gazeDataOptionString) -> np.ndarray:
+def EDFToNumpy(EDFfilePath, gazeDataOptionString, progressCallback=None) -> np.ndarray:
     logging.info("Passing EDF file path to be read.")
     options = []
     inputs = [EDFfilePath, gazeDataOptionString]
@@ -98,7 +100,7 @@ def EDFToNumpy(EDFfilePath, gazeDataOptionString) -> np.ndarray:
                 inputs = ','.join(options)
                 # Call main function
                 logging.info(f"Reading EDF file with path: {EDFfile} and options: {' '.join(inputs)}.")
-                EDFfileData = readFileWithInputs([EDFfile, inputs])
+                EDFfileData = readFileWithInputs([EDFfile, inputs], progressCallback)
                 return EDFfileData
             else:
                 # Call main function
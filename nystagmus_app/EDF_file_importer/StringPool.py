@@ -0,0 +1,85 @@
+'''
+Message text storage for EDF2numpy. Texts are interned into one contiguous UTF-8 byte buffer with an offsets array
+(text i is buffer[offsets[i]:offsets[i+1]]), and each MESSAGEdata row holds the index of its text, so message memory
+scales with the distinct text in the file rather than message count x longest message.
+
+Usage:
+    pool = StringPool()
+    MESSAGEdata['textIndex'][row] = pool.add(b'TRIALID 1')
+    MESSAGEdata = pool.attach(MESSAGEdata)
+    MESSAGEdata.texts()
+'''
+import numpy as np
+
+MISSING_TEXT = '.'      # text of rows without a message
+MISSING_INDEX = -1      # textIndex of rows without a message
+
+
+class StringPool:
+    '''
+    Interned UTF-8 texts built up while an EDF is read
+    '''
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offsets = [0]
+        self.indices = {}
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def add(self, text:bytes) -> int:
+        '''
+        Index of text in the pool, adding it if it has not been seen before
+
+        Parameters:
+            text = UTF-8 encoded text.
+        '''
+        index = self.indices.get(text)
+        if index is None:
+            index = len(self.offsets) - 1
+            self.buffer += text
+            self.offsets.append(len(self.buffer))
+            self.indices[text] = index
+        return index
+
+    def attach(self, messages:np.ndarray) -> 'MessageArray':
+        '''
+        The message rows as a MessageArray holding a copy of the pool
+        '''
+        return MessageArray(messages, np.frombuffer(bytes(self.buffer), dtype=np.uint8), np.array(self.offsets, dtype=np.int64))
+
+
+class MessageArray(np.ndarray):
+    '''
+    MESSAGEdata rows together with the text pool their textIndex column points into.
+    Slices and views keep the pool, so the rows of one trial can still be decoded.
+    '''
+    def __new__(cls, messages:np.ndarray, textBuffer:np.ndarray, textOffsets:np.ndarray):
+        messageArray = np.asarray(messages).view(cls)
+        messageArray.textBuffer = textBuffer
+        messageArray.textOffsets = textOffsets
+        return messageArray
+
+    def __array_finalize__(self, source):
+        self.textBuffer = getattr(source, 'textBuffer', None)
+        self.textOffsets = getattr(source, 'textOffsets', None)
+
+    def __reduce__(self):
+        return (MessageArray, (np.asarray(self), self.textBuffer, self.textOffsets))
+
+    def text(self, textIndex:int) -> str:
+        '''
+        Decoded text of one pool entry, MISSING_TEXT for MISSING_INDEX
+        '''
+        if textIndex == MISSING_INDEX:
+            return MISSING_TEXT
+        return self.textBuffer[self.textOffsets[textIndex]:self.textOffsets[textIndex + 1]].tobytes().decode('utf-8')
+
+    def texts(self) -> np.ndarray:
+        '''
+        Decoded text of every row, as an object array. Each distinct text is decoded once.
+        '''
+        textIndices = np.asarray(self['textIndex'])
+        distinctIndices, rowTexts = np.unique(textIndices, return_inverse=True)
+        decoded = np.array([self.text(int(textIndex)) for textIndex in distinctIndices], dtype=object)
+        return decoded[rowTexts]
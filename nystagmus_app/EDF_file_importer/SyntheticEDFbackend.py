@@ -0,0 +1,282 @@
+'''
+In-memory stand-in for EDFACCESSwrapper that generates an EyeLink element stream from NumPy arrays.
+It implements the EDF access calls used by EDF2numpy, so readEDF and EDFTrialParser can be run, benchmarked
+and checked without the EyeLink Developers Kit installed.
+
+Each trial is streamed as: TRIALID message, RECORDING_INFO (START), samples with a STARTSACC/ENDSACC pair per
+fast phase, RECORDING_INFO (END), TRIAL_RESULT message. Samples carry a jerk nystagmus waveform with a linear
+slow phase and a fast reset. Trials are generated one at a time, so hours of 2 kHz data do not have to fit in memory.
+
+Usage:
+    importer = EDF2numpy(backend=SyntheticEDFbackend(trialCount=20, trialDuration=60, samplingRate=2000))
+    EDFfileData = importer.readEDF('synthetic.edf')
+'''
+from ctypes import addressof, memmove, pointer, sizeof
+import numpy as np
+
+from nystagmus_app.EDF_file_importer.EDFACCESSwrapper import (ALLF_DATA, FSAMPLE, LSTRING, MISSING_VALUE, NO_PENDING_ITEMS,
+                                                              STARTSACC, ENDSACC, MESSAGEEVENT, RECORDING_INFO, SAMPLE_TYPE)
+
+RAW_UNITS_PER_DEGREE = -200     # raw pupil units per degree, so +10 degrees sits at RAW_CENTRE - 2000
+RAW_CENTRE_X = -4000            # raw X position looking straight ahead
+RAW_CENTRE_Y = -6000            # raw Y position looking straight ahead
+PIXELS_PER_DEGREE = 30          # gaze pixels per degree
+SCREEN_CENTRE = (960, 540)      # gaze position looking straight ahead
+FAST_PHASE_FRACTION = 0.1       # fraction of each nystagmus beat spent in the fast phase
+eyeCodes = {'Left': 1, 'Right': 2, 'Binocular': 3}
+
+
+class SyntheticEDFbackend:
+    '''
+    Generates FSAMPLE/FEVENT/RECORDINGS/IMESSAGE elements for a synthetic nystagmus recording
+    '''
+    def __init__(self, trialCount:int = 5, trialDuration:float = 10.0, samplingRate:int = 1000, eyeTracked:str = 'Binocular',
+                 nystagmusFrequency:float = 3.0, nystagmusAmplitude:float = 5.0, startTime:int = 1000000, seed:int = 0):
+        '''
+        Parameters:
+            trialCount = number of trials (recording blocks) in the stream.
+            trialDuration = length of each trial in seconds.
+            samplingRate = samples per second.
+            eyeTracked = 'Left', 'Right' or 'Binocular'. Samples of the eye not tracked are MISSING_VALUE.
+            nystagmusFrequency = nystagmus beats per second.
+            nystagmusAmplitude = peak to peak amplitude of each beat in degrees.
+            startTime = timestamp of the first sample in milliseconds.
+            seed = seed for the measurement noise.
+        '''
+        self.trialCount = trialCount
+        self.trialDuration = trialDuration
+        self.samplingRate = samplingRate
+        self.eyeTracked = eyeTracked
+        self.nystagmusFrequency = nystagmusFrequency
+        self.nystagmusAmplitude = nystagmusAmplitude
+        self.startTime = startTime
+        self.seed = seed
+        self.samplesPerTrial = int(round(trialDuration * samplingRate))
+        self.fastPhasesPerTrial = len(self.fastPhaseBounds()[0])
+        self.preamble = 'SYNTHETIC EDF ** generated by SyntheticEDFbackend'
+        self.loadEvents = 1
+        self.loadSamples = 1
+        self.current = ALLF_DATA()      # element returned by edf_get_float_data, like the API's internal buffer
+        self.headerRecording = None     # RECORDINGS element the last trial header points to
+        self.EDFData = None
+        self.rewind()
+
+    def rewind(self):
+        '''
+        Move the cursor back to the first element of the stream
+        '''
+        self.trial = 0
+        self.position = 0
+        self.trialElements = None
+
+    def fastPhaseBounds(self) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        Sample offsets (within a trial) of the start and end of each fast phase
+        '''
+        beatLength = self.samplingRate / self.nystagmusFrequency
+        beatStarts = np.arange(0, self.samplesPerTrial - beatLength + 1, beatLength)
+        fastStarts = np.round(beatStarts + beatLength * (1 - FAST_PHASE_FRACTION)).astype(np.int64)
+        fastEnds = np.minimum(np.round(beatStarts + beatLength).astype(np.int64), self.samplesPerTrial) - 1
+        return fastStarts, fastEnds
+
+    def trialStartTime(self, trial:int) -> int:
+        # one second gap between trials
+        return self.startTime + trial * (int(self.trialDuration * 1000) + 1000)
+
+    def trialEndTime(self, trial:int) -> int:
+        return self.trialStartTime(trial) + (self.samplesPerTrial * 1000) // self.samplingRate
+
+    def makeTrialSamples(self, trial:int) -> np.ndarray:
+        '''
+        Build the FSAMPLE records of one trial as a structured array
+        '''
+        rng = np.random.default_rng(self.seed + trial)
+        samples = np.zeros(self.samplesPerTrial, dtype=np.dtype(FSAMPLE))
+        offsets = np.arange(self.samplesPerTrial)
+        samples['time'] = self.trialStartTime(trial) + (offsets * 1000) // self.samplingRate
+
+        # jerk nystagmus: linear slow phase drift followed by a quick return
+        phase = (offsets * self.nystagmusFrequency / self.samplingRate) % 1.0
+        slowPhase = phase < 1 - FAST_PHASE_FRACTION
+        degreesX = np.where(slowPhase, phase / (1 - FAST_PHASE_FRACTION),
+                            1 - (phase - (1 - FAST_PHASE_FRACTION)) / FAST_PHASE_FRACTION)
+        degreesX = (degreesX - 0.5) * self.nystagmusAmplitude
+        degreesY = 0.1 * degreesX
+        velocityX = np.gradient(degreesX) * self.samplingRate
+        velocityY = np.gradient(degreesY) * self.samplingRate
+
+        for eye in ('left', 'right'):
+            if self.eyeTracked != 'Binocular' and self.eyeTracked.lower() != eye:
+                for field in ('px', 'py', 'hx', 'hY', 'gx', 'gy', 'pa', 'rxvel', 'ryvel', 'hxvel', 'hyvel', 'gxvel', 'gyvel',
+                              'frxvel', 'fryvel', 'fhxvel', 'fhyvel', 'fgxvel', 'fgyvel'):
+                    samples[field][eye] = MISSING_VALUE
+                continue
+            noiseX = rng.normal(scale=0.05, size=self.samplesPerTrial)
+            noiseY = rng.normal(scale=0.05, size=self.samplesPerTrial)
+            samples['px'][eye] = RAW_CENTRE_X + RAW_UNITS_PER_DEGREE * (degreesX + noiseX)
+            samples['py'][eye] = RAW_CENTRE_Y + RAW_UNITS_PER_DEGREE * (degreesY + noiseY)
+            samples['hx'][eye] = 15000 * np.tan(np.radians(degreesX + noiseX))
+            samples['hY'][eye] = 15000 * np.tan(np.radians(degreesY + noiseY))
+            samples['gx'][eye] = SCREEN_CENTRE[0] + PIXELS_PER_DEGREE * (degreesX + noiseX)
+            samples['gy'][eye] = SCREEN_CENTRE[1] + PIXELS_PER_DEGREE * (degreesY + noiseY)
+            samples['pa'][eye] = 1500 + rng.normal(scale=10, size=self.samplesPerTrial)
+            for prefix in ('', 'f'):
+                for source in ('r', 'h', 'g'):
+                    samples[prefix + source + 'xvel'][eye] = velocityX
+                    samples[prefix + source + 'yvel'][eye] = velocityY
+        samples['rx'] = PIXELS_PER_DEGREE
+        samples['ry'] = PIXELS_PER_DEGREE
+        samples['htype'] = MISSING_VALUE
+        return samples
+
+    def makeTrialElements(self, trial:int) -> dict:
+        '''
+        Lay out the element stream of one trial. Returns the element types in stream order, the sample records,
+        and the non-sample elements (ALLF_DATA objects) in the order they appear.
+        '''
+        loadSamples = self.loadSamples == 1
+        loadEvents = self.loadEvents == 1
+        samples = self.makeTrialSamples(trial) if loadSamples else np.zeros(0, dtype=np.dtype(FSAMPLE))
+        trialStart = self.trialStartTime(trial)
+        trialEnd = self.trialEndTime(trial)
+
+        elementTypes = np.full(len(samples), SAMPLE_TYPE, dtype=np.int16)
+        if loadEvents:
+            fastStarts, fastEnds = self.fastPhaseBounds()
+            eyes = [0, 1] if self.eyeTracked == 'Binocular' else [eyeCodes[self.eyeTracked] - 1]
+            sampleTimes = trialStart + (np.arange(self.samplesPerTrial) * 1000) // self.samplingRate
+            saccades = []
+            for fastStart, fastEnd in zip(fastStarts, fastEnds):
+                for eye in eyes:
+                    saccades.append((fastStart, STARTSACC, self.makeEvent(sampleTimes[fastStart], sampleTimes[fastStart], eye)))
+                for eye in eyes:
+                    saccades.append((fastEnd, ENDSACC, self.makeEvent(sampleTimes[fastStart], sampleTimes[fastEnd], eye)))
+            if loadSamples and saccades:
+                insertAt = np.array([offset + 1 for offset, _, _ in saccades])
+                elementTypes = np.insert(elementTypes, insertAt, [eventType for _, eventType, _ in saccades])
+            elif not loadSamples:
+                elementTypes = np.array([eventType for _, eventType, _ in saccades], dtype=np.int16)
+            others = [event for _, _, event in saccades]
+            head = [(MESSAGEEVENT, self.makeMessage(trialStart - 10, f'TRIALID {trial + 1}')),
+                    (RECORDING_INFO, self.makeRecording(trialStart, 1))]
+            tail = [(RECORDING_INFO, self.makeRecording(trialEnd, 0)),
+                    (MESSAGEEVENT, self.makeMessage(trialEnd + 10, 'TRIAL_RESULT 0'))]
+        else:
+            others = []
+            head = [(RECORDING_INFO, self.makeRecording(trialStart, 1))]
+            tail = [(RECORDING_INFO, self.makeRecording(trialEnd, 0))]
+
+        elementTypes = np.concatenate([[eventType for eventType, _ in head], elementTypes,
+                                       [eventType for eventType, _ in tail]]).astype(np.int16)
+        others = [element for _, element in head] + others + [element for _, element in tail]
+        return {'types': elementTypes, 'samples': samples, 'others': others, 'sampleIndex': 0, 'otherIndex': 0}
+
+    def makeEvent(self, startTime:int, endTime:int, eye:int) -> ALLF_DATA:
+        element = ALLF_DATA()
+        event = element.FEVENT
+        event.sttime, event.entime, event.eye = int(startTime), int(endTime), eye
+        event.gstx, event.gsty, event.genx, event.geny = SCREEN_CENTRE * 2
+        event.supd_x = event.eupd_x = event.supd_y = event.eupd_y = PIXELS_PER_DEGREE
+        return element
+
+    def makeMessage(self, time:int, text:str) -> ALLF_DATA:
+        element = ALLF_DATA()
+        encoded = text.encode('utf-8')
+        message = LSTRING()
+        message.length = len(encoded) + 1
+        message.text = encoded
+        element.FEVENT.sttime = int(time)
+        element.FEVENT.message = pointer(message)
+        element.text = message      # keep the LSTRING alive for as long as the element
+        return element
+
+    def makeRecording(self, time:int, state:int) -> ALLF_DATA:
+        element = ALLF_DATA()
+        recording = element.RECORDINGS
+        recording.time, recording.state = int(time), state
+        recording.sample_rate = self.samplingRate
+        recording.eye = eyeCodes[self.eyeTracked]
+        recording.record_type = 3                   # samples & events
+        recording.recording_mode = 1                # pupil-CR
+        recording.filter_type = 1
+        recording.posType = -0x40                   # parsed by RAW
+        return element
+
+##--------------------------------------------------------------------------------------------------------------------------------
+## EDF access calls used by EDF2numpy
+##--------------------------------------------------------------------------------------------------------------------------------
+    def edf_open_file(self, edfFilename, consistency, loadevents, loadsamples):
+        self.loadEvents = loadevents
+        self.loadSamples = loadsamples
+        self.rewind()
+        self.EDFData = self
+        return self.EDFData
+
+    def edf_close_file(self, edfData):
+        self.EDFData = None
+        self.trialElements = None
+        return 0
+
+    def edf_get_preamble_text_length(self, edfData):
+        return len(self.preamble)
+
+    def edf_get_preamble_text(self, edfData, length):
+        return self.preamble[:length]
+
+    def edf_set_trial_identifier(self, edfData, start_marker_string, end_marker_string):
+        return 0
+
+    def edf_get_trial_count(self, edfData):
+        # reported the same way as the EDF API, which EDF2numpy halves
+        return 2 * self.trialCount
+
+    def edf_get_element_count(self, edfData):
+        elementsPerTrial = 2
+        if self.loadSamples == 1:
+            elementsPerTrial += self.samplesPerTrial
+        if self.loadEvents == 1:
+            eyes = 2 if self.eyeTracked == 'Binocular' else 1
+            elementsPerTrial += 2 + 2 * eyes * self.fastPhasesPerTrial
+        return self.trialCount * elementsPerTrial
+
+    def edf_get_next_data(self, edfData):
+        if self.trialElements is None or self.position == len(self.trialElements['types']):
+            if self.trialElements is not None:
+                self.trial += 1
+            if self.trial >= self.trialCount:
+                self.trialElements = None
+                return NO_PENDING_ITEMS
+            self.trialElements = self.makeTrialElements(self.trial)
+            self.position = 0
+        elements = self.trialElements
+        dataType = int(elements['types'][self.position])
+        self.position += 1
+        if dataType == SAMPLE_TYPE:
+            memmove(addressof(self.current), elements['samples'].ctypes.data + elements['sampleIndex'] * sizeof(FSAMPLE), sizeof(FSAMPLE))
+            elements['sampleIndex'] += 1
+        else:
+            other = elements['others'][elements['otherIndex']]
+            memmove(addressof(self.current), addressof(other), sizeof(ALLF_DATA))
+            elements['otherIndex'] += 1
+        return dataType
+
+    def edf_get_float_data(self, edfData):
+        return self.current
+
+    def edf_jump_to_trial(self, edfData, trial):
+        if trial < 0 or trial >= self.trialCount:
+            return -1
+        self.trial = trial
+        self.position = 0
+        self.trialElements = None
+        return 0
+
+    def edf_get_trial_header(self, edfData, trial):
+        # the trial runs from its TRIALID message to its TRIAL_RESULT message
+        header = trial.contents
+        header.starttime = self.trialStartTime(self.trial) - 10
+        header.endtime = self.trialEndTime(self.trial) + 10
+        header.duration = header.endtime - header.starttime
+        self.headerRecording = self.makeRecording(self.trialStartTime(self.trial), 1)
+        header.rec = pointer(self.headerRecording.RECORDINGS)
+        return 0
@@ -1,17 +1,81 @@
-import webbrowser
-from nystagmus_app.app import app
-from nystagmus_app.callback_functions.upload_tabs import *
-from nystagmus_app.callback_functions.calibration_remapping import *
-from nystagmus_app.callback_functions.base_graph import *
-from nystagmus_app.callback_functions.calibrated_graph import *
+import argparse
+import sys
 
 #------- MAIN FUNCTION --------#
+'''Clears the uploads and recordings of a previous run, before any worker serves requests'''
+def cleanStartup():
+    from nystagmus_app.callback_functions import upload_tabs, globals
+
+    upload_tabs.tempDirCleanup()
+    globals.recordingStore.clear()
+
 '''Launches Dash app'''
-def main():
-    tempDirCleanup()
+def launchApp():
+    import webbrowser
+    from nystagmus_app.wsgi import app
+
+    cleanStartup()
     port = 8050
     webbrowser.open_new(f'http://127.0.0.1:{port}')
     app.run(debug=True, port=port, use_reloader=False)
 
+'''Runs `nystagmus serve ...`, the production server without the debugger'''
+def serveApp(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog='nystagmus serve', description='Serve the app for several users, without the debugger.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on, 0.0.0.0 for every interface')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='worker processes, more than 1 needs gunicorn installed (Linux / macOS only)')
+    parser.add_argument('--max-upload-mb', type=int, default=None, help='largest EDF file that can be uploaded, in MB (default 2048)')
+    parser.add_argument('--max-active-uploads', type=int, default=None, help='upload chunks written at once by each worker (default 8)')
+    args = parser.parse_args(argv)
+
+    def configureUploads(server):
+        if args.max_upload_mb is not None:
+            server.config['MAX_UPLOAD_BYTES'] = args.max_upload_mb * 1024**2
+        if args.max_active_uploads is not None:
+            server.config['MAX_ACTIVE_UPLOADS'] = args.max_active_uploads
+
+    if args.workers <= 1:
+        from nystagmus_app.wsgi import app
+
+        configureUploads(app.server)
+        cleanStartup()
+        app.run(debug=False, host=args.host, port=args.port, threaded=True)
+        return 0
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        parser.error("--workers above 1 needs gunicorn, install it with `pip install gunicorn`")
+
+    class NystagmusApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{args.host}:{args.port}')
+            self.cfg.set('workers', args.workers)
+            #recordings are shared through temp/sessions, so any worker can serve any session
+            self.cfg.set('preload_app', True)
+
+        def load(self):
+            from nystagmus_app.wsgi import server
+            configureUploads(server)
+            return server
+
+    cleanStartup()
+    NystagmusApplication().run()
+    return 0
+
+'''Runs `nystagmus batch ...` headless, `nystagmus serve ...` for production, otherwise launches the Dash app'''
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        #the batch pipeline never imports Dash or Plotly
+        from nystagmus_app.utils.batch_pipeline import batchMain
+        sys.exit(batchMain(sys.argv[2:]))
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        sys.exit(serveApp(sys.argv[2:]))
+
+    launchApp()
+
 if __name__ == '__main__':
     main()
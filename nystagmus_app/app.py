@@ -1,3 +1,4 @@
+import uuid
 from dash import Dash, dcc, html, callback, State
 import dash_bootstrap_components as dbc
 import nystagmus_app.layout.app_components as app_components
@@ -8,6 +9,8 @@ def serve_layout():
     [
         html.H1("Nystagmus Analyser"),
         html.Hr(),
+        #new ID on every page load, recordings are kept per session in globals.recordingStore
+        dcc.Store(id='session-id', data=str(uuid.uuid4())),
         dcc.Store(id='upload-trigger', data=0),
         dcc.Store(id='calibrate-trigger', data=0),
         html.Div(id='debug-output'),
@@ -1,13 +1,20 @@
-from dash import callback, Output, Input, State, MATCH, ALL, callback_context
+from dash import callback, Output, Input, State, MATCH, ALL, callback_context, Patch, no_update
 import logging
+import numpy as np
 import plotly.graph_objects as go
 from nystagmus_app.app import app
 import nystagmus_app.callback_functions.globals as globals
 from nystagmus_app.callback_functions.calibration_remapping import updateRemapLine
+from nystagmus_app.utils.decimation import levelOfDetail, relayoutXRange
+from nystagmus_app.utils.regression import MISSING_DATA
 
 logging.basicConfig(filename='std.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filemode='w')
 logger = logging.getLogger(__name__)
 
+#(eye, direction, trace name, colour) in the order traces are added to the nystagmus plot
+TRACE_STYLES = [('Left', 'X', 'X Left Eye', '#636EFA'), ('Left', 'Y', 'Y Left Eye', '#EF553B'),
+                ('Right', 'X', 'X Right Eye', '#00CC96'), ('Right', 'Y', 'Y Right Eye', '#AB63FA')]
+
 
 @app.callback(Output({'type': 'calibration-x-left', 'index': MATCH}, 'style'),
               Output({'type': 'calibration-x-right', 'index': MATCH}, 'style'),
@@ -46,23 +53,23 @@ def displayCalibrationDivs(eyeTracked, xyTracked) -> tuple[dict, dict, dict, dic
 
 @app.callback(Output({'type':'eye-tracked', 'index': MATCH}, 'value'),
           Input({'type':'trial-dropdown', 'index': MATCH}, 'value'),
-          State('tabs', 'active_tab'),)
-def updateEyeTracked(inputTrial:str, activeTab:str) -> list[str]:
+          State('session-id', 'data'),)
+def updateEyeTracked(inputTrial:str, sessionID:str) -> list[str]:
     '''
     Updates the eye being shown on the graph based on the trial selected in the dropdown.
 
     Parameters:
         inputTrial (str): trial selected in the dropdown
-        activeTab (str): active tab selected
+        sessionID (str): ID of the browser session the recording is stored under
 
     Returns:
         list[str]: list of eyes being tracked
     '''
 
-    recordingIndex = int(activeTab.split('-')[1]) - 1
+    recordingIndex: int = callback_context.outputs_list['id']['index']
     trialNumber:int = int(inputTrial.split(" ")[1]) - 1
 
-    relevantTrial = (globals.recordingList[recordingIndex][1])[trialNumber]
+    relevantTrial = globals.recordingStore.recording(sessionID, recordingIndex)[1][trialNumber]
 
     eyesTracked: list = [relevantTrial.eyeTracked]
     if eyesTracked[0] == 'Binocular': eyesTracked = ['Left', 'Right']
@@ -77,9 +84,10 @@ def updateEyeTracked(inputTrial:str, activeTab:str) -> list[str]:
         Input({'type': 'remapping-check', 'eye': ALL, 'direction': ALL, 'index': MATCH}, 'value'),
         State({'type': 'remapping-plus10degs-value', 'eye': ALL, 'direction': ALL,  'index': MATCH}, 'data'),
         State({'type': 'remapping-minus10degs-value', 'eye': ALL, 'direction': ALL,  'index': MATCH}, 'data'),  
+        State('session-id', 'data'),
         )
 def updateGraph(inputTrial:str, eyeTracked:list[str], xyTracked:list[str], remappingCheck:list[bool],
-                 plus10Value:list[float], minus10Value:list[float]) -> go.FigureWidget:
+                 plus10Value:list[float], minus10Value:list[float], sessionID:str) -> go.FigureWidget:
     '''
     Updates the graph based on the possible filters selected. 
     This includes controls for eye being tracked, direction being tracked, remapping checks - for calibration lines.
@@ -90,6 +98,7 @@ def updateGraph(inputTrial:str, eyeTracked:list[str], xyTracked:list[str], remap
         remappingCheck (list[bool]): list of remapping checks
         plus10Value (list[float]): list of plus 10 degrees values
         minus10Value (list[float]): list of minus 10 degrees values
+        sessionID (str): ID of the browser session the recording is stored under
 
     Returns:
         go.FigureWidget: updated graph plot depending on the filters selected
@@ -101,34 +110,21 @@ def updateGraph(inputTrial:str, eyeTracked:list[str], xyTracked:list[str], remap
     trialNumber: int = int(inputTrial.split(" ")[1]) - 1
     
     try:
-        relevantTrial = (globals.recordingList[recordingIndex][1])[trialNumber]
+        relevantTrial = globals.recordingStore.recording(sessionID, recordingIndex)[1][trialNumber]
 
     except Exception as e:
         logger.error(f"Trial Index not found in file: {str(e)}")
         raise IndexError("Trial index not found in file")
 
-    startTime = relevantTrial.startTime
-    relevantSampleData = relevantTrial.sampleData
-
-    xRightData = relevantSampleData['posXRight']
-    yRightData = relevantSampleData['posYRight']
-    xLeftData = relevantSampleData['posXLeft']
-    yLeftData = relevantSampleData['posYLeft']
-    timeData = relevantSampleData['time'] - startTime
-    endTime = timeData.iat[-1]
+    endTime = relevantTrial.endTime - relevantTrial.startTime
 
     logger.info('Plotting new data')
     try:
         fig = go.FigureWidget()
 
-        if 'Left' in eyeTracked and 'X' in xyTracked:
-            fig.add_trace(go.Scatter(x=timeData, y=xLeftData, mode='lines', name='X Left Eye', line = dict(color='#636EFA')))
-        if 'Left' in eyeTracked and 'Y' in xyTracked:
-            fig.add_trace(go.Scatter(x=timeData, y=yLeftData, mode='lines', name='Y Left Eye', line = dict(color='#EF553B')))
-        if 'Right' in eyeTracked and 'X' in xyTracked:
-            fig.add_trace(go.Scatter(x=timeData, y=xRightData, mode='lines', name='X Right Eye', line = dict(color='#00CC96')))
-        if 'Right' in eyeTracked and 'Y' in xyTracked:
-            fig.add_trace(go.Scatter(x=timeData, y=yRightData, mode='lines', name='Y Right Eye', line = dict(color='#AB63FA')))
+        for eye, direction, traceName, colour in shownTraces(eyeTracked, xyTracked):
+            plotX, plotY = visibleTrialTrace(relevantTrial, f'pos{direction}{eye}')
+            fig.add_trace(go.Scatter(x=plotX, y=plotY, mode='lines', name=traceName, line = dict(color=colour)))
         
         
         lines = []
@@ -146,10 +142,69 @@ def updateGraph(inputTrial:str, eyeTracked:list[str], xyTracked:list[str], remap
             
         fig.update_layout(shapes = lines)
         fig.update_layout(showlegend=True)
+        #keep the user's zoom when only the plotted points are patched, reset it when the trial or traces change
+        fig.update_layout(uirevision=f'{inputTrial}-{eyeTracked}-{xyTracked}')
         logger.debug(f"Graph Updated with {'/'.join(str(eye) for eye in eyeTracked)} eye and {'/'.join(str(direction) for direction in xyTracked)} direction.")
 
     except Exception as e:
         logger.info(f"Error plotting graph with updated filters {str(e)}")
         raise 
 
-    return fig
\ No newline at end of file
+    return fig
+
+
+def shownTraces(eyeTracked:list[str], xyTracked:list[str]) -> list[tuple]:
+    #traces shown on the nystagmus plot for the selected eyes and directions, in plotting order
+    return [style for style in TRACE_STYLES if style[0] in eyeTracked and style[1] in xyTracked]
+
+
+def visibleTrialTrace(trial, column:str, xRange:tuple | None = None) -> tuple:
+    #points of one trial trace in the visible time range, from the trace's level of detail pyramid
+    #read straight from the trial's view of the memory-mapped sample array, only the plotted column is copied
+    #(to mark missing samples as NaN) rather than building the trial's whole sampleData DataFrame
+    def loadTrace() -> tuple:
+        sampleData = trial.trialData[2]
+        yData = np.where(sampleData[column] == MISSING_DATA, np.nan, sampleData[column])
+        return trial.sampleTimes() - trial.startTime, yData
+    return levelOfDetail.visibleTrace(trial, column, loadTrace, xRange)
+
+
+'''Replaces the plotted points with the visible range at screen resolution when the plot is zoomed or panned'''
+@app.callback(Output({'type': 'nystagmus-plot', 'index': MATCH}, 'figure', allow_duplicate=True),
+        Input({'type': 'nystagmus-plot', 'index': MATCH}, 'relayoutData'),
+        State({'type':'trial-dropdown', 'index': MATCH}, 'value'),
+        State({'type':'eye-tracked', 'index': MATCH}, 'value'),
+        State({'type': 'xy-tracked', 'index': MATCH}, 'value'),
+        State('session-id', 'data'),
+        prevent_initial_call=True)
+def updateGraphDetail(relayoutData:dict, inputTrial:str, eyeTracked:list[str], xyTracked:list[str], sessionID:str) -> Patch:
+    '''
+    Updates the points of each trace to the visible x range when the plot is zoomed, panned or reset.
+    Only the trace data is sent back, the shapes and layout are left as they are.
+
+    Parameters:
+        relayoutData (dict): data from the relayout event
+        inputTrial (str): trial selected in the dropdown
+        eyeTracked (list[str]): list of eyes being tracked
+        xyTracked (list[str]): list of directions being tracked
+        sessionID (str): ID of the browser session the recording is stored under
+
+    Returns:
+        Patch: partial update of the figure's trace data
+    '''
+    xRange = relayoutXRange(relayoutData)
+    if xRange is False or not eyeTracked or not xyTracked:
+        return no_update
+
+    recordingIndex = callback_context.outputs_list['id']['index']
+    trialNumber: int = int(inputTrial.split(" ")[1]) - 1
+    relevantTrial = globals.recordingStore.recording(sessionID, recordingIndex)[1][trialNumber]
+
+    patchedFigure = Patch()
+    for traceNumber, (eye, direction, traceName, colour) in enumerate(shownTraces(eyeTracked, xyTracked)):
+        plotX, plotY = visibleTrialTrace(relevantTrial, f'pos{direction}{eye}', xRange)
+        patchedFigure['data'][traceNumber]['x'] = plotX
+        patchedFigure['data'][traceNumber]['y'] = plotY
+
+    logger.debug(f"Graph detail updated for x range {xRange}")
+    return patchedFigure
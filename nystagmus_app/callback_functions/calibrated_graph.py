@@ -1,19 +1,27 @@
-from dash import callback, Output, Input, State, MATCH, ALL, callback_context, no_update, dcc
+from dash import callback, Output, Input, State, MATCH, ALL, callback_context, no_update, dcc, Patch
 import logging
 from nystagmus_app.app import app
 import nystagmus_app.callback_functions.globals as globals
 import plotly.graph_objects as go
+from nystagmus_app.utils.decimation import levelOfDetail, relayoutXRange, xRangeRows
+from nystagmus_app.utils.nystagmus_analysis import DEFAULT_SAMPLING_RATE, segmentationCache
 
 logging.basicConfig(filename='std.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filemode='w')
 logger = logging.getLogger(__name__)
 
+#(calibration key, eye, direction, trace name, colour) in the order traces are added to the calibrated plot
+CALIBRATED_TRACE_STYLES = [('XLeft', 'Left', 'X', 'X Left Eye', '#636EFA'), ('XRight', 'Right', 'X', 'X Right Eye', '#00CC96'),
+                           ('YLeft', 'Left', 'Y', 'Y Left Eye', '#EF553B'), ('YRight', 'Right', 'Y', 'Y Right Eye', '#AB63FA')]
+
 @app.callback(Output({'type': 'calibrated-nystagmus-plot', 'index':MATCH}, 'figure'),
+          Output({'type': 'calibrated-x-range', 'index': MATCH}, 'data', allow_duplicate=True),
           Input({'type': 'calibrated-trial-dropdown', 'index':MATCH}, 'value'),
           Input({'type': 'calibrated-eye-tracked', 'index':MATCH}, 'value'),
           Input({'type': 'calibrated-xy-tracked', 'index':MATCH}, 'value'),
           State('tabs', 'active_tab'),
+          State('session-id', 'data'),
           prevent_initial_call=True)
-def updateCalibratedGraph(inputTrial: str, eyeTracked: list[str], xyTracked: list[str], activeTab:str) -> go.FigureWidget:
+def updateCalibratedGraph(inputTrial: str, eyeTracked: list[str], xyTracked: list[str], activeTab:str, sessionID:str) -> tuple:
     '''
     Updates the graph based on the possible filters selected.
     Parameters: 
@@ -21,9 +29,11 @@ def updateCalibratedGraph(inputTrial: str, eyeTracked: list[str], xyTracked: lis
         eyeTracked (list[str]): list of eyes being tracked
         xyTracked (list[str]): list of directions being tracked
         activeTab (str): active tab selected
+        sessionID (str): ID of the browser session the calibrated recording is stored under
 
     Returns:
         go.FigureWidget: updated figure to be displayed
+        tuple: (None, None) x range, the new figure shows the whole trial so the analysis covers all of it
    
     '''
 
@@ -31,41 +41,30 @@ def updateCalibratedGraph(inputTrial: str, eyeTracked: list[str], xyTracked: lis
     recordingIndex: int = recordingID['index']
     trialNumber: int = int(inputTrial.split(" ")[1]) - 1
 
-    relevantRecording = globals.calibratedRecordingList[recordingIndex]
+    relevantRecording = globals.recordingStore.calibratedRecording(sessionID, recordingIndex)
     relevantCalibrationData = relevantRecording[2]
     relevantTrial = relevantRecording[1][trialNumber]
 
     fig = go.FigureWidget()
     
     #plot lines on graph based on filters selected and calibration data available
-    if 'XLeft' in relevantCalibrationData.keys() and 'X' in xyTracked and 'Left' in eyeTracked:
-        xLeftData = relevantTrial['posXLeft']
-        fig.add_trace(go.Scatter(x=xLeftData.index,y=xLeftData,
-                                  mode='lines', name='X Left Eye', line = dict(color='#636EFA')))
-    if 'XRight' in relevantCalibrationData.keys() and 'X' in xyTracked and 'Right' in eyeTracked:
-        xRightData = relevantTrial['posXRight']
-        fig.add_trace(go.Scatter(x=xRightData.index,y=xRightData,
-                                  mode='lines', name='X Right Eye', line = dict(color='#00CC96')))
-
-    if 'YLeft' in relevantCalibrationData.keys() and 'Y' in xyTracked and 'Left' in eyeTracked:
-        yLeftData = relevantTrial['posYLeft']
-        fig.add_trace(go.Scatter(x=yLeftData.index,y=yLeftData,
-                                  mode='lines', name='Y Left Eye', line = dict(color='#EF553B')))
-
-    if 'YRight' in relevantCalibrationData.keys() and 'Y' in xyTracked and 'Right' in eyeTracked:    
-        yRightData = relevantTrial['posYRight']
-        fig.add_trace(go.Scatter(x=yRightData.index,y=yRightData,
-                                  mode='lines', name='Y Right Eye', line = dict(color='#AB63FA')))
-        
+    for calibrationKey, eye, direction, traceName, colour in shownCalibratedTraces(relevantCalibrationData, eyeTracked, xyTracked):
+        plotX, plotY = visibleCalibratedTrace(relevantTrial, f'pos{calibrationKey}')
+        fig.add_trace(go.Scatter(x=plotX, y=plotY,
+                                  mode='lines', name=traceName, line = dict(color=colour)))
 
-    return fig
+    #keep the user's zoom when only the plotted points are patched, reset it when the trial or traces change
+    fig.update_layout(uirevision=f'{inputTrial}-{eyeTracked}-{xyTracked}')
+
+    return fig, (None, None)
 
 
 @app.callback(Output({'type': 'calibrated-eye-tracked', 'index':MATCH}, 'value'),
           Output({'type': 'calibrated-xy-tracked', 'index':MATCH}, 'value'),
          Input({'type': 'calibrated-trial-dropdown', 'index':MATCH}, 'value'),
-         State('tabs', 'active_tab'))
-def updateCalibratedControls(inputTrial:str, activeTab:str) -> list:
+         State('tabs', 'active_tab'),
+         State('session-id', 'data'))
+def updateCalibratedControls(inputTrial:str, activeTab:str, sessionID:str) -> list:
 
     '''
     Updates the eye and xy tracked controls for the calibrated graph - based on the active tab selected.
@@ -73,6 +72,7 @@ def updateCalibratedControls(inputTrial:str, activeTab:str) -> list:
     Parameters:
         inputTrial (str): trial selected in the dropdown
         activeTab (str): active tab selected
+        sessionID (str): ID of the browser session the calibrated recording is stored under
 
     Returns:
         list: list of eyes being tracked, list of directions being tracked
@@ -85,7 +85,7 @@ def updateCalibratedControls(inputTrial:str, activeTab:str) -> list:
         logger.error(f"Error extracting recording index from active tab: {str(e)}")
         return ['Left', 'Right'], ['X', 'Y']
     
-    relevantRecording = globals.calibratedRecordingList[recordingIndex]
+    relevantRecording = globals.recordingStore.calibratedRecording(sessionID, recordingIndex)
     relevantCalibrationData = relevantRecording[2]
     eyesTracked = set()
     xyTracked = set()
@@ -115,7 +115,7 @@ def updateCalibratedControls(inputTrial:str, activeTab:str) -> list:
 
 # take data from relayout when axis is changed and update a dcc.Store with the new axis values
 #then the calculation buttons will trigger calculation on these new axis max / min 
-@app.callback(Output({'type': 'calibrated-x-range', 'index': MATCH}, 'children'),
+@app.callback(Output({'type': 'calibrated-x-range', 'index': MATCH}, 'data'),
               Input({'type': 'calibrated-nystagmus-plot', 'index': MATCH}, 'relayoutData'),
               prevent_initial_call=True)
 def updateCalibratedXRange(relayoutData: dict) -> tuple:
@@ -124,16 +124,176 @@ def updateCalibratedXRange(relayoutData: dict) -> tuple:
     Parameters:
         relayoutData (dict): data from the relayout event
     Returns:
-        tuple: x-axis max and min values
+        tuple: x-axis max and min values, (None, None) when the axis is reset
     '''
 
-    if 'xaxis.range[0]' in relayoutData or 'xaxis.range[1]' in relayoutData:
-        xaxis = (relayoutData['xaxis.range[0]'], relayoutData['xaxis.range[1]'])
-        
-        print(f"X axis range updated: {xaxis}")
-    
-        return xaxis
-    
-    return (None, None)
+    xaxis = relayoutXRange(relayoutData)
+    if xaxis is False:
+        return no_update
+
+    if xaxis is None:
+        return (None, None)
+
+    logger.debug(f"X axis range updated: {xaxis}")
+    return xaxis
+
+
+def shownCalibratedTraces(calibrationData: dict, eyeTracked: list[str], xyTracked: list[str]) -> list[tuple]:
+    #calibrated traces shown for the selected eyes and directions, in plotting order
+    return [style for style in CALIBRATED_TRACE_STYLES
+            if style[0] in calibrationData.keys() and style[1] in eyeTracked and style[2] in xyTracked]
+
+
+def visibleCalibratedTrace(calibratedTrial, column: str, xRange: tuple | None = None) -> tuple:
+    #points of one calibrated trace in the visible range, from the trace's level of detail pyramid
+    loadTrace = lambda: (calibratedTrial.index.to_numpy(), calibratedTrial[column].to_numpy())
+    return levelOfDetail.visibleTrace(calibratedTrial, column, loadTrace, xRange)
+
+
+#replace the plotted points with the visible range at screen resolution whenever the x range store changes
+@app.callback(Output({'type': 'calibrated-nystagmus-plot', 'index': MATCH}, 'figure', allow_duplicate=True),
+              Input({'type': 'calibrated-x-range', 'index': MATCH}, 'data'),
+              State({'type': 'calibrated-trial-dropdown', 'index': MATCH}, 'value'),
+              State({'type': 'calibrated-eye-tracked', 'index': MATCH}, 'value'),
+              State({'type': 'calibrated-xy-tracked', 'index': MATCH}, 'value'),
+              State('session-id', 'data'),
+              prevent_initial_call=True)
+def updateCalibratedGraphDetail(xRange: list, inputTrial: str, eyeTracked: list[str], xyTracked: list[str], sessionID: str) -> Patch:
+    '''
+    Updates the points of each calibrated trace to the visible x range, only sending the trace data.
+
+    Parameters:
+        xRange (list): x-axis min and max values, (None, None) for the whole trial
+        inputTrial (str): trial selected in the dropdown
+        eyeTracked (list[str]): list of eyes being tracked
+        xyTracked (list[str]): list of directions being tracked
+        sessionID (str): ID of the browser session the calibrated recording is stored under
+
+    Returns:
+        Patch: partial update of the figure's trace data
+    '''
+    if not inputTrial or not eyeTracked or not xyTracked:
+        return no_update
+
+    recordingIndex: int = callback_context.outputs_list['id']['index']
+    trialNumber: int = int(inputTrial.split(" ")[1]) - 1
+    relevantRecording = globals.recordingStore.calibratedRecording(sessionID, recordingIndex)
+    relevantTrial = relevantRecording[1][trialNumber]
+
+    patchedFigure = Patch()
+    shownTraces = shownCalibratedTraces(relevantRecording[2], eyeTracked, xyTracked)
+    for traceNumber, (calibrationKey, eye, direction, traceName, colour) in enumerate(shownTraces):
+        plotX, plotY = visibleCalibratedTrace(relevantTrial, f'pos{calibrationKey}', xRange)
+        patchedFigure['data'][traceNumber]['x'] = plotX
+        patchedFigure['data'][traceNumber]['y'] = plotY
+
+    return patchedFigure
+
+
+##----------------- NYSTAGMUS ANALYSIS --------------------##
+def shownTraceBeats(sessionID: str, calibratedIndex: int, inputTrial: str, eyeTracked: list[str], xyTracked: list[str],
+                    xRange: tuple | None = None) -> tuple[list[tuple], tuple | None]:
+    #(trace name, NystagmusBeats) of every calibrated trace shown, over the visible rows of the selected trial
+    #also returns the (start, end) seconds analysed, None when it is the whole trial
+    trialNumber: int = int(inputTrial.split(" ")[1]) - 1
+    relevantRecording = globals.recordingStore.calibratedRecording(sessionID, calibratedIndex)
+    relevantTrial = relevantRecording[1][trialNumber]
+    samplingRates = globals.recordingStore.calibratedSamplingRates(sessionID, calibratedIndex)
+    samplingRate = samplingRates[trialNumber] if samplingRates and samplingRates[trialNumber] > 0 else DEFAULT_SAMPLING_RATE
+
+    #the calibrated x axis is the trial's row index, so the visible rows are found by binary search on it
+    startRow, stopRow = xRangeRows(relevantTrial.index, xRange)
+    analysedWindow = None if (startRow, stopRow) == (0, len(relevantTrial)) else (startRow / samplingRate, stopRow / samplingRate)
+
+    traceBeats = []
+    for calibrationKey, eye, direction, traceName, colour in shownCalibratedTraces(relevantRecording[2], eyeTracked or [], xyTracked or []):
+        column = f'pos{calibrationKey}'
+        #a view of the visible rows of the column, the DataFrame itself is never sliced
+        loadPosition = lambda column=column: relevantTrial[column].to_numpy()[startRow:stopRow]
+        #keyed by the channel's calibration too, so a recalibrated channel is segmented again and the others are not
+        channelCalibration = (relevantRecording[2][calibrationKey]['plus10Degs'], relevantRecording[2][calibrationKey]['minus10Degs'])
+        beats = segmentationCache.beats((sessionID, calibratedIndex, trialNumber, column, channelCalibration, startRow, stopRow),
+                                        loadPosition, samplingRate)
+        traceBeats.append((traceName, beats))
+    return traceBeats, analysedWindow
+
+
+def analysisHeading(title: str, analysedWindow: tuple | None) -> str:
+    #heading of the analysis output, with the window analysed when the graph is zoomed in
+    if analysedWindow is None:
+        return f"{title}: "
+    return f"{title} ({analysedWindow[0]:.2f} - {analysedWindow[1]:.2f} s): "
+
+
+@app.callback(Output({'type': 'calibrated-amplitude', 'index': MATCH}, 'children'),
+              Input({'type': 'calculate-velocity-amplitude', 'index': MATCH}, 'n_clicks'),
+              State({'type': 'calibrated-trial-dropdown', 'index': MATCH}, 'value'),
+              State({'type': 'calibrated-eye-tracked', 'index': MATCH}, 'value'),
+              State({'type': 'calibrated-xy-tracked', 'index': MATCH}, 'value'),
+              State({'type': 'calibrated-x-range', 'index': MATCH}, 'data'),
+              State('session-id', 'data'),
+              prevent_initial_call=True)
+def calculateAmplitude(buttonClicks: int, inputTrial: str, eyeTracked: list[str], xyTracked: list[str], xRange: list,
+                       sessionID: str) -> str:
+    '''
+    Segments the visible window of each shown calibrated trace into nystagmus beats and displays the mean fast phase amplitude.
+
+    Parameters:
+        buttonClicks (int): number of times the button has been clicked
+        inputTrial (str): trial selected in the dropdown
+        eyeTracked (list[str]): list of eyes being tracked
+        xyTracked (list[str]): list of directions being tracked
+        xRange (list): x-axis min and max values, (None, None) for the whole trial
+        sessionID (str): ID of the browser session the calibrated recording is stored under
+
+    Returns:
+        str: fast phase amplitude of each trace
+    '''
+    calibratedIndex: int = callback_context.outputs_list['id']['index']
+    traceBeats, analysedWindow = shownTraceBeats(sessionID, calibratedIndex, inputTrial, eyeTracked, xyTracked, xRange)
+
+    lines = [analysisHeading("Fast Phase Amplitude", analysedWindow)]
+    for traceName, beats in traceBeats:
+        summary = beats.summary()
+        lines.append(f"{traceName}: {summary['fastPhaseAmplitude']:.2f}º ({summary['beats']} beats)")
+
+    logger.info(f"Calculated fast phase amplitude of calibrated recording {calibratedIndex}, {inputTrial}, window {analysedWindow}")
+    return "\n".join(lines)
+
+
+@app.callback(Output({'type': 'calibrated-frequency', 'index': MATCH}, 'children'),
+              Input({'type': 'calculate-velocity-button', 'index': MATCH}, 'n_clicks'),
+              State({'type': 'calibrated-trial-dropdown', 'index': MATCH}, 'value'),
+              State({'type': 'calibrated-eye-tracked', 'index': MATCH}, 'value'),
+              State({'type': 'calibrated-xy-tracked', 'index': MATCH}, 'value'),
+              State({'type': 'calibrated-x-range', 'index': MATCH}, 'data'),
+              State('session-id', 'data'),
+              prevent_initial_call=True)
+def calculateVelocity(buttonClicks: int, inputTrial: str, eyeTracked: list[str], xyTracked: list[str], xRange: list,
+                      sessionID: str) -> str:
+    '''
+    Segments the visible window of each shown calibrated trace into nystagmus beats and displays the mean fast phase
+    peak velocity, slow phase velocity and beat frequency.
+
+    Parameters:
+        buttonClicks (int): number of times the button has been clicked
+        inputTrial (str): trial selected in the dropdown
+        eyeTracked (list[str]): list of eyes being tracked
+        xyTracked (list[str]): list of directions being tracked
+        xRange (list): x-axis min and max values, (None, None) for the whole trial
+        sessionID (str): ID of the browser session the calibrated recording is stored under
+
+    Returns:
+        str: velocities and frequency of each trace
+    '''
+    calibratedIndex: int = callback_context.outputs_list['id']['index']
+    traceBeats, analysedWindow = shownTraceBeats(sessionID, calibratedIndex, inputTrial, eyeTracked, xyTracked, xRange)
+
+    lines = [analysisHeading("Fast Phase Velocity", analysedWindow)]
+    for traceName, beats in traceBeats:
+        summary = beats.summary()
+        lines.append(f"{traceName}: {summary['fastPhaseVelocity']:.1f}º/s")
+        lines.append(f"  slow phase {summary['slowPhaseVelocity']:.1f}º/s, {summary['frequency']:.2f} Hz")
 
-# [{'xaxis.range[0]': 4968.506137865911, 'xaxis.range[1]': 23123.414542020775, 'yaxis.range[0]': -4526.485985985986, 'yaxis.range[1]': -1495.7452452452453}]
\ No newline at end of file
+    logger.info(f"Calculated fast phase velocity of calibrated recording {calibratedIndex}, {inputTrial}, window {analysedWindow}")
+    return "\n".join(lines)
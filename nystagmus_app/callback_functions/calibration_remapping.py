@@ -1,7 +1,13 @@
 from dash import callback, Output, Input, State, MATCH, ALL, callback_context, no_update, dcc
+import logging
+import numpy as np
 from nystagmus_app.app import app
 import nystagmus_app.callback_functions.globals as globals
-from nystagmus_app.utils.regression import applyRecordingLinearRegression
+from nystagmus_app.utils.lazy_recording import LazyRecording
+from nystagmus_app.utils.regression import calibrateTrials, recalibrateRecording
+
+logging.basicConfig(filename='std.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filemode='w')
+logger = logging.getLogger(__name__)
 
 ##--------------------------REMAPPING LINE CALLBACKS---------------------------------##
 '''Enables/disables remapping input based on checkbox value'''
@@ -120,25 +126,44 @@ def updateRemapLine(plus10Value, minus10Value, direction, eyeTracked, endTime) -
         State({'type':'remapping-check', 'eye': ALL, 'direction': ALL, 'index': MATCH}, 'value'),
         State({'type': 'remapping-plus10degs-value', 'eye': ALL, 'direction': ALL, 'index': MATCH}, 'data'),
         State({'type': 'remapping-minus10degs-value', 'eye': ALL, 'direction': ALL, 'index': MATCH}, 'data'),
+        State('session-id', 'data'),
         prevent_initial_call=True)
-def calibrateData(buttonClicks, remappingChecks, plus10Values, minus10Values) -> int:
+def calibrateData(buttonClicks, remappingChecks, plus10Values, minus10Values, sessionID) -> int:
     statesList = callback_context.states_list[0]
     relevantRecordingIndex = statesList[0]['id']['index']
 
-    relevantRecording = globals.recordingList[relevantRecordingIndex]
-
-    relevantRecordingName = relevantRecording[0]
-    relevantRecordingTrials = relevantRecording[1]
+    relevantRecordingName, relevantRecordingTrials = globals.recordingStore.recording(sessionID, relevantRecordingIndex)
 
     tickedDirections = getTickedRemapDirections(statesList)
     calibrationData = makeCalibrationDict(tickedDirections, plus10Values, minus10Values)
 
-    calibratedRecording = applyRecordingLinearRegression(relevantRecordingTrials, calibrationData)
-
+    #a recording calibrated before is updated in place, recomputing only the channels whose lines moved
+    calibratedIndex = globals.recordingStore.calibratedIndexOf(sessionID, relevantRecordingIndex)
+    previousCalibration = None
+    if calibratedIndex is not None:
+        previousColumns, previousPositionData, previousTrialOffsets, previousCalibrationData = \
+            globals.recordingStore.calibratedArrays(sessionID, calibratedIndex)
+        previousCalibration = (previousColumns, previousPositionData, previousCalibrationData)
+
+    if isinstance(relevantRecordingTrials, LazyRecording):
+        #a recording still being converted decodes its trials on demand, so each trial is read once for everything
+        columns, positionData, trialOffsets, samplingRates, firstTrial = calibrateTrialsOnce(relevantRecordingTrials, calibrationData)
+        recalculatedColumns = columns
+    else:
+        columns, positionData, trialOffsets, recalculatedColumns = recalibrateRecording(relevantRecordingTrials, calibrationData, previousCalibration)
+        samplingRates = [trial.trialData[0]['samplingRate'][0] for trial in relevantRecordingTrials]
+        firstTrial = relevantRecordingTrials[0]
     calibratedRecordingName = f'{relevantRecordingName} - Calibrated'
-    globals.calibratedRecordingList.append([calibratedRecordingName, calibratedRecording, calibrationData])
+
+    if calibratedIndex is None:
+        globals.recordingStore.addCalibratedRecording(sessionID, calibratedRecordingName, columns, positionData, trialOffsets, calibrationData,
+                                                      samplingRates, relevantRecordingIndex)
+    elif recalculatedColumns or columns != list(previousColumns):
+        globals.recordingStore.replaceCalibratedRecording(sessionID, calibratedIndex, calibratedRecordingName, columns, positionData,
+                                                          trialOffsets, calibrationData, samplingRates, relevantRecordingIndex)
+    logger.info(f"Calibrated recording {relevantRecordingIndex}, recomputed {recalculatedColumns}")
     
-    xRange = (0, relevantRecordingTrials[0].endTime - relevantRecordingTrials[0].startTime)
+    xRange = (0, firstTrial.endTime - firstTrial.startTime)
     dcc.Store(id={'type':'calibrated', 'index':relevantRecordingIndex}, data=xRange)
 
     return buttonClicks
@@ -154,6 +179,28 @@ def calibrationTriggered(calibrateTriggerIndexed, calibrateTrigger) -> int:
     return no_update
 
 
+def calibrateTrialsOnce(trials, calibrationData: dict) -> tuple:
+    '''
+    Calibrates every channel of a recording in a single pass over its trials, for trials decoded on demand.
+
+    Parameters:
+        trials (LazyRecording): trials of the recording
+        calibrationData (dict): calibration data in the makeCalibrationDict format
+
+    Returns:
+        tuple: columns, positionData and trialOffsets as calibrateRecording, each trial's sampling rate, and the first trial
+    '''
+    columns = ['pos' + key for key in calibrationData.keys()]
+    trialBuffers, samplingRates, firstTrial = [], [], None
+    for trial, trialPositionData in calibrateTrials(trials, calibrationData):
+        trialBuffers.append(trialPositionData)
+        samplingRates.append(trial.trialData[0]['samplingRate'][0])
+        firstTrial = firstTrial or trial
+
+    trialOffsets = np.concatenate(([0], np.cumsum([len(trialBuffer) for trialBuffer in trialBuffers]))).astype(np.int64)
+    positionData = np.concatenate(trialBuffers) if trialBuffers else np.empty((0, len(columns)), dtype=np.float32)
+    return columns, positionData, trialOffsets, samplingRates, firstTrial
+
 def getTickedRemapDirections(statesList) -> list:
     tickedDirections = []
     for i in range(4):
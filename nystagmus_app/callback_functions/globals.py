@@ -1,3 +1,8 @@
-recordingList = []
-calibratedRecordingList = []
+from pathlib import Path
+from nystagmus_app.utils.decimation import levelOfDetail
+from nystagmus_app.utils.recording_store import RecordingStore
 
+#recordings and calibrated recordings of every browser session, read with the session-id store's data
+#temp/sessions is shared by every server process, dropped trials release their plot pyramids, which count in the memory budget
+recordingStore = RecordingStore(Path.cwd() / 'temp' / 'sessions', onEvict=levelOfDetail.discard,
+                                cachedBytes=levelOfDetail.residentBytes)
@@ -1,9 +1,7 @@
 from dash import callback, Output, Input, State, MATCH, ALL, no_update, dcc
 import logging
-import base64
 import os
 import numpy as np
-import tempfile
 import copy
 import gc
 from pathlib import Path
@@ -11,14 +9,20 @@ import dash_bootstrap_components as dbc
 
 
 from nystagmus_app.app import app
-from nystagmus_app.EDF_file_importer.EyeLinkDataImporter import EDFToNumpy
 from nystagmus_app.utils.trial_parsing import EDFTrialParser
+from nystagmus_app.utils.conversion_jobs import ConversionJobs
+from nystagmus_app.utils.chunked_upload import registerUploadRoutes, uploadPath
+from nystagmus_app.utils.regression import calibrateRecording
 import nystagmus_app.callback_functions.globals as globals
 from nystagmus_app.layout.layout_functions import createGraphControls, makeNewCalibratedTab
 
 logging.basicConfig(filename='std.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filemode='w')
 logger = logging.getLogger(__name__)
 
+CONVERSION_OPTIONS = 'gaze_data_type = 0, sample_fields = position, compact_schema = 1'
+conversionJobs = ConversionJobs(Path.cwd() / 'cache')
+registerUploadRoutes(app.server, Path.cwd() / 'temp', app.config.routes_pathname_prefix)
+
 #------- Uploading EDF File and Parsing --------#
 @app.callback(Output('upload-edf', 'children'),
         Input('upload-edf', 'loading_state'),
@@ -44,34 +48,6 @@ def updateSpinner(loading_state:dict) -> dbc.Button:
         originalButton: dbc.Button = dbc.Button("Upload EDF", id="upload-edf-button", color="primary", className="mr-2")
         return originalButton
 
-#maybe make copy of temp file and open that
-def createTempFile(decodedContents:bytes, fileExtension:str) -> Path:
-    '''
-    Creates a temp file to store the uploaded EDF file contents.
-
-    Parameters:
-        decodedContents (bytes): EDF file contents decoded from base64
-        fileExtension (str): file extension of the EDF file
-
-    Returns: Path: path of the temp file created
-    '''
-    tempFolderPath: Path = Path.cwd() / 'temp'
-    try:
-        tempFile: tempfile.NamedTemporaryFile = tempfile.NamedTemporaryFile(delete=False, suffix=fileExtension, dir=tempFolderPath)
-        tempFilePath: Path = tempFolderPath / tempFile.name
-        tempFile.write(decodedContents)
-        tempFile.flush()
-        tempFile.close()
-
-
-        logging.info(f"Temp EDF file created at {str(tempFilePath)}")
-        return tempFilePath
-
-    except Exception as e:
-        logging.error(f"Error creating temp file: {str(e)}")
-        raise IOError(f"Error creating temp file: {str(e)}")
-    
-
 def tempDirCleanup() -> None:
     '''
     Initialise the temp directory and clean up temp files.
@@ -95,37 +71,6 @@ def tempDirCleanup() -> None:
 
 
 
-def applyNumpyConversion(decodedContents:bytes, fileExtension:str) -> tuple[np.ndarray, Path]:
-    '''
-    Applies EDF file to numpy struct conversion using the EDF file importer module.
-    Temp file is made to store the edf file uploaded since the EDF file importer requires a file path.
-
-    Parameters:
-        decodedContents (bytes): EDF file contents decoded from base64
-        fileExtension (str): file extension of the EDF file
-
-    Returns:
-        tuple[np.ndarray, Path]: numpy array of the EDF file, and the path of the temp file created
-    
-    '''
-
-    tempFilePath: Path = createTempFile(decodedContents, fileExtension)
-
-    try:
-        EDFfileData: np.ndarray = EDFToNumpy(tempFilePath, 'gaze_data_type = 0')
-        logging.info("EDF file converted to numpy")
-
-
-    except Exception as e:
-        logging.error(f"Error converting EDF file to numpy: {str(e)}")
-        raise ValueError(f"Error converting EDF file to numpy: {str(e)}")
-
-    return EDFfileData, tempFilePath
-
-    
-    
-    
-
 def parseRecordingData(EDFfileData: object) -> EDFTrialParser:
     '''
     Using EDF file data, parse the recording into trials using the EDFTrialParser class.
@@ -152,11 +97,75 @@ def parseRecordingData(EDFfileData: object) -> EDFTrialParser:
         raise ValueError(f"Error parsing EDF file: {str(e)}")
     
 
+'''Streams the selected files to the chunked upload endpoint in the browser, instead of posting them to a callback'''
+app.clientside_callback(
+    """
+    async function(contents, filenames) {
+        if (!contents) {
+            return window.dash_clientside.no_update;
+        }
+        const CHUNK_SIZE = 8 * 1024 * 1024;
+        const MAX_RETRIES = 5;
+        // the endpoint sits under the app's requests_pathname_prefix, e.g. when served behind a proxy path
+        const prefix = JSON.parse(document.getElementById('_dash-config').textContent).requests_pathname_prefix;
+        const uploadHandles = [];
+
+        for (let fileNumber = 0; fileNumber < contents.length; fileNumber++) {
+            const filename = filenames[fileNumber];
+            const file = await (await fetch(contents[fileNumber])).blob();
+            const uploadID = `${Date.now()}-${Math.random().toString(36).slice(2, 12)}`;
+            let received = 0;
+            let retries = 0;
+
+            while (received < file.size) {
+                const response = await fetch(`${prefix}upload/${uploadID}?offset=${received}`, {
+                    method: 'POST',
+                    headers: {'Content-Type': 'application/octet-stream'},
+                    body: file.slice(received, received + CHUNK_SIZE),
+                }).catch(() => null);
+
+                if (response && response.status === 413) {
+                    throw new Error(`${filename} is larger than the server's upload limit`);
+                }
+                // 429 means the server is writing as many uploads as it allows, send the chunk again later
+                if (response && response.status === 429) {
+                    const retryAfter = Number(response.headers.get('Retry-After')) || 1;
+                    await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+                    continue;
+                }
+                // 409 means the server holds a different number of bytes, resume from there
+                if (response && (response.ok || response.status === 409)) {
+                    received = (await response.json()).received;
+                    retries = 0;
+                    continue;
+                }
+                if (++retries > MAX_RETRIES) {
+                    throw new Error(`Upload of ${filename} failed after ${received} bytes`);
+                }
+                const status = await fetch(`${prefix}upload/${uploadID}`).catch(() => null);
+                if (status && status.ok) {
+                    received = (await status.json()).received;
+                }
+            }
+            uploadHandles.push({uploadID: uploadID, filename: filename, size: file.size});
+        }
+        return uploadHandles;
+    }
+    """,
+    Output('upload-handle', 'data'),
+    Input('upload-edf', 'contents'),
+    State('upload-edf', 'filename'),
+    prevent_initial_call=True,
+)
+
+
 @app.callback(Output('upload-output', 'children'),
-          Output('upload-trigger', 'data'),
-        [Input('upload-edf', 'contents'),
-        Input('upload-edf', 'filename')],
+          Output('conversion-job', 'data'),
+          Output('upload-trigger', 'data', allow_duplicate=True),
+        Input('upload-handle', 'data'),
+        State('conversion-job', 'data'),
         State('upload-trigger', 'data'),
+        State('session-id', 'data'),
         prevent_initial_call=True,
         running=[
             Output('upload-edf', 'loading_state'),
@@ -164,54 +173,216 @@ def parseRecordingData(EDFfileData: object) -> EDFTrialParser:
             {'is_loading': False},
         ]
     )
-def uploadFile(contents, filename:str, uploadTrigger:int) -> str:
+def uploadFile(uploadHandles:list[dict], conversionJobList:list[dict], uploadTrigger:int, sessionID:str) -> tuple:
     '''
-    Uploads EDF file, converts to numpy array, parses into trials, and stores parsed edf file into recording list.
-    Triggered on file uploaded.
-    Returns a message to confirm file upload and returns incremented upload trigger to update tabs.
+    Submits uploaded EDF files for conversion in the background conversion pool, one job per file.
+    Triggered once the browser has finished streaming the files to the upload endpoint.
+    Each file is also added to the session as a recording read a trial at a time from the EDF file, so its tab
+    can be opened and its trials viewed while the conversion runs.
+    Returns a message, the submitted conversion jobs with the new ones appended, and triggers tab creation.
+    conversion-job is only written here, pollConversion is triggered by it and follows every job it has not collected yet,
+    so a poll running at the same time cannot drop a new job.
 
     Parameters:
-        contents: file contents from upload button.
-        filename (str) : name of the file uploaded.
+        uploadHandles (list[dict]): upload ID, filename and size of each streamed file.
+        conversionJobList (list[dict]): conversion jobs submitted by earlier uploads.
+        uploadTrigger (int): current value of the upload trigger.
+        sessionID (str): ID of the browser session the recordings are stored under.
 
     Returns:
-        outputMessage (str) : message confirming file upload and parsing.
-        uploadTrigger (int) : triggers tab generation upon uploading of a file.
+        outputMessage (str) : message confirming the files are being converted.
+        conversionJobList (list[dict]) : job ID, filename and recording index of every submitted conversion job.
+        uploadTrigger (int) : triggers tab generation for the recordings readable while they convert.
     '''
     
-    try:
-        fileNameIsolated, fileExtension = os.path.splitext(filename)
-
-    except Exception as e:
-        logger.error(f"Couldn't extract filename and extension using os.path.splitext: {str(e)}")
-        return "Error extracting filename and extension, please check the logs for more information", uploadTrigger
-    
-    logging.info(f"Uploading file {filename}")
-    
-    if contents is None:
+    if not uploadHandles:
         logging.error("No file uploaded/no contents detected.")
-        return "No contents detected in uploaded file."
+        return "No contents detected in uploaded file.", no_update, no_update
+
+    conversionJobList = list(conversionJobList or [])
+    submittedJobCount: int = 0
+    addedRecordings: bool = False
+    for uploadHandle in uploadHandles:
+        filename: str = uploadHandle['filename']
+        logging.info(f"Uploading file {filename}")
     
+        try:
+            EDFfilePath: Path = uploadPath(Path.cwd() / 'temp', uploadHandle['uploadID'])
+            if not EDFfilePath.exists() or EDFfilePath.stat().st_size != uploadHandle['size']:
+                raise IOError(f"expected {uploadHandle['size']} bytes")
+            logging.info(f"File {filename} received at {str(EDFfilePath)}")
+
+        except Exception as e:
+            logging.error(f"Error receiving file {filename}: {str(e)}")
+            return f"Error receiving file {filename}, please check the logs for more information.", no_update, no_update
+
+        jobID: str = conversionJobs.submit(EDFfilePath, CONVERSION_OPTIONS)
+        recordingIndex: int | None = addLazyRecording(sessionID, filename, EDFfilePath)
+        conversionJobList.append({'jobID': jobID, 'filename': filename, 'recordingIndex': recordingIndex})
+        submittedJobCount += 1
+        addedRecordings = addedRecordings or recordingIndex is not None
+
+    uploadTrigger = (uploadTrigger or 0) + 1 if addedRecordings else no_update
+    return f"Converting {submittedJobCount} file(s)...", conversionJobList, uploadTrigger
+
+
+def addLazyRecording(sessionID:str, filename:str, EDFfilePath:Path) -> int | None:
+    '''
+    Adds an uploaded file to the session as a recording whose trials are decoded from the EDF file on demand,
+    until its conversion finishes.
+
+    Parameters:
+        sessionID (str): ID of the browser session the recording is stored under.
+        filename (str): name of the uploaded file.
+        EDFfilePath (Path): path of the uploaded EDF file.
+
+    Returns:
+        int | None: index of the recording, None if the file cannot be read a trial at a time,
+        in which case the recording is added once converted.
+    '''
+    fileNameIsolated, fileExtension = os.path.splitext(filename)
     try:
-        contentType, contentString = contents.split(",")
-        decoded = base64.b64decode(contentString)
-        logging.info(f"File {filename} decoded")
+        return globals.recordingStore.addLazyRecording(sessionID, fileNameIsolated, EDFfilePath, CONVERSION_OPTIONS)
 
     except Exception as e:
-        logging.error(f"Error decoding file: {str(e)}")
-        return "Error decoding file, please check the logs for more information.", uploadTrigger
+        logging.warning(f"Trials of {filename} cannot be read before its conversion finishes: {str(e)}")
+        return None
 
-    EDFfileData, tempFilePath = applyNumpyConversion(decoded, fileExtension)
 
+@app.callback(Output('upload-output', 'children', allow_duplicate=True),
+          Output('conversion-progress', 'value'),
+          Output('conversion-progress', 'label'),
+          Output('conversion-progress', 'style'),
+          Output('conversion-interval', 'disabled'),
+          Output('conversion-collected', 'data'),
+          Output('upload-trigger', 'data'),
+          Output('calibrate-trigger', 'data', allow_duplicate=True),
+        Input('conversion-interval', 'n_intervals'),
+        Input('conversion-job', 'data'),
+        State('conversion-collected', 'data'),
+        State('upload-trigger', 'data'),
+        State('calibrate-trigger', 'data'),
+        State('session-id', 'data'),
+        prevent_initial_call=True)
+def pollConversion(nIntervals:int, conversionJobList:list[dict], collectedJobIDs:list[str], uploadTrigger:int, calibrateTrigger:int,
+                   sessionID:str) -> tuple:
+    '''
+    Reports the combined progress of the running conversion jobs. Each finished recording is parsed into trials
+    and stored in the recording list, and the upload trigger is incremented so tabs are created as files complete.
+    Runs on every polling interval and whenever uploadFile submits jobs. Finished jobs are collected once and their
+    IDs added to conversion-collected, which only this callback writes.
+    A recording read a trial at a time while it converted numbers its trials by trial identifier messages, the converted
+    recording by recording blocks. If the two trial counts differ its tab is rebuilt, and a calibrated recording made from
+    it is recalibrated from the converted trials.
 
-    recordingParser = parseRecordingData(EDFfileData)
-    recordingTrials = recordingParser.trials
-    filenameAndTrials = [fileNameIsolated, recordingTrials]
-    globals.recordingList.append(filenameAndTrials)
-    outputMessage = f"File {filename} uploaded and parsed into {len(recordingTrials)} trials."
-    uploadTrigger += 1
+    Parameters:
+        nIntervals (int): number of times the polling interval has fired.
+        conversionJobList (list[dict]): job ID, filename and recording index of every submitted conversion job.
+        collectedJobIDs (list[str]): IDs of the jobs already collected.
+        uploadTrigger (int): current value of the upload trigger.
+        calibrateTrigger (int): current value of the calibrate trigger.
+        sessionID (str): ID of the browser session the recordings are stored under.
 
-    return outputMessage, uploadTrigger
+    Returns:
+        outputMessage (str) : progress or completion message.
+        progressValue (float) : percentage of EDF elements decoded over all jobs.
+        progressLabel (str) : label shown on the progress bar.
+        progressStyle (dict) : shows the progress bar while jobs run.
+        intervalDisabled (bool) : True once every job has finished.
+        collectedJobIDs (list[str]) : IDs of the jobs collected so far.
+        uploadTrigger (int) : triggers tab generation once recordings are parsed.
+        calibrateTrigger (int) : triggers rebuilding the calibrated tabs that were recalibrated.
+    '''
+    hiddenStyle = {'display': 'none'}
+    collectedJobIDs = list(collectedJobIDs or [])
+    pendingJobs: list[dict] = [job for job in conversionJobList or [] if job['jobID'] not in collectedJobIDs]
+    if not pendingJobs:
+        return no_update, 0, '', hiddenStyle, True, no_update, no_update, no_update
+
+    runningJobs: list[dict] = []
+    messages: list[str] = []
+    addedRecordings: bool = False
+    recalibratedRecordings: bool = False
+    elementsDecoded, elementCount = 0, 0
+    for conversionJob in pendingJobs:
+        filename: str = conversionJob['filename']
+        status: dict = conversionJobs.status(conversionJob['jobID'])
+
+        if status['state'] in ('queued', 'running'):
+            runningJobs.append(conversionJob)
+            elementsDecoded += status['elementsDecoded']
+            elementCount += status['elementCount']
+            continue
+
+        collectedJobIDs.append(conversionJob['jobID'])
+        try:
+            EDFfileData = conversionJobs.result(conversionJob['jobID'])
+            logging.info(f"EDF file {filename} converted to numpy")
+
+        except Exception as e:
+            logging.error(f"Error converting EDF file {filename} to numpy: {str(e)}")
+            messages.append(f"Error converting file {filename}, please check the logs for more information.")
+            continue
+
+        fileNameIsolated, fileExtension = os.path.splitext(filename)
+        recordingIndex = conversionJob.get('recordingIndex')
+        lazyTrialCount = None
+        if recordingIndex is None:
+            recordingIndex = globals.recordingStore.addRecording(sessionID, fileNameIsolated, EDFfileData)
+            addedRecordings = True
+        else:
+            #the recording's tab is already open, its trials are switched over to the converted arrays
+            lazyTrialCount = globals.recordingStore.trialCount(sessionID, recordingIndex)
+            globals.recordingStore.completeRecording(sessionID, recordingIndex, EDFfileData)
+        #counted from the stored recording, its trials are built once when its tab reads them
+        trialCount = globals.recordingStore.trialCount(sessionID, recordingIndex)
+        logging.info(f"EDF file {filename} parsed into {trialCount} trials")
+        messages.append(f"File {filename} uploaded and parsed into {trialCount} trials.")
+
+        if lazyTrialCount is not None and lazyTrialCount != trialCount:
+            logging.warning(f"EDF file {filename} had {lazyTrialCount} trials while converting and {trialCount} once converted, renumbering its trials")
+            addedRecordings = True
+            recalibratedRecordings = recalibrateConvertedRecording(sessionID, recordingIndex) or recalibratedRecordings
+
+    if addedRecordings:
+        uploadTrigger += 1
+    else:
+        uploadTrigger = no_update
+    calibrateTrigger = (calibrateTrigger or 0) + 1 if recalibratedRecordings else no_update
+
+    if runningJobs:
+        percentDone = 100 * elementsDecoded / elementCount if elementCount else 0
+        label = f"{elementsDecoded:,} / {elementCount:,} elements" if elementCount else 'Queued'
+        messages.append(f"Converting {len(runningJobs)} file(s)...")
+        return ' '.join(messages), percentDone, label, {"margin-top": "10px"}, False, collectedJobIDs, uploadTrigger, calibrateTrigger
+
+    return ' '.join(messages), 100, '', hiddenStyle, True, collectedJobIDs, uploadTrigger, calibrateTrigger
+
+
+def recalibrateConvertedRecording(sessionID:str, recordingIndex:int) -> bool:
+    '''
+    Recalibrates the calibrated recording made from a recording whose trials were renumbered once converted,
+    with the calibration it was made with, so its trials and rows match the converted trials again.
+
+    Parameters:
+        sessionID (str): ID of the browser session the recordings are stored under.
+        recordingIndex (int): index of the converted recording.
+
+    Returns:
+        bool: True if the recording had a calibrated recording, which was replaced.
+    '''
+    calibratedIndex = globals.recordingStore.calibratedIndexOf(sessionID, recordingIndex)
+    if calibratedIndex is None:
+        return False
+
+    recordingName, recordingTrials = globals.recordingStore.recording(sessionID, recordingIndex)
+    calibrationData = globals.recordingStore.calibratedArrays(sessionID, calibratedIndex)[3]
+    columns, positionData, trialOffsets = calibrateRecording(recordingTrials, calibrationData)
+    samplingRates = [trial.trialData[0]['samplingRate'][0] for trial in recordingTrials]
+    globals.recordingStore.replaceCalibratedRecording(sessionID, calibratedIndex, f'{recordingName} - Calibrated', columns, positionData,
+                                                      trialOffsets, calibrationData, samplingRates, recordingIndex)
+    logging.info(f"Recalibrated calibrated recording {calibratedIndex} from the converted trials of recording {recordingIndex}")
+    return True
 
 
 #------- TAB CREATION --------#
@@ -220,86 +391,148 @@ def uploadFile(contents, filename:str, uploadTrigger:int) -> str:
           Output('tabs', 'active_tab', allow_duplicate=True),
           Input('upload-trigger', 'data'),
           State('tabs', 'children'),
+          State('session-id', 'data'),
           prevent_initial_call=True)    
-def createNewTab(uploadCount, currentTabs) -> dbc.Tabs:
+def createNewTab(uploadCount, currentTabs, sessionID) -> dbc.Tabs:
     '''
     Creates a new tab for each edf file uploaded.
-    Triggers upon upload and processing of a file. 
-    upload_trigger is incremented after each completion of the uploadFile function.
-    Returns the tab list with the new tab appended.
+    Triggers upon upload and processing of a file, or of a batch of files. 
+    upload_trigger is incremented after each batch of recordings is parsed.
+    Returns the tab list with a tab appended for every recording that does not have one yet,
+    and the tab of a recording whose trial count changed once converted rebuilt in place.
 
     Parameters:
         uploadCount (int) : Upload trigger, incremented after each file upload.
                             Used to trigger tab generation callback.
         currentTabs (list) : list of current tab components.
+        sessionID (str) : ID of the browser session the recordings are stored under.
 
     Returns:
         (str) : active tab to be updated to ensure correct tab is shown.
         (list) : Updated list of tabs with new tab appended.
     '''
         
-    recordingCount:int = len(globals.recordingList)
+    recordingCount:int = globals.recordingStore.recordingCount(sessionID)
     if recordingCount == 0:
         return currentTabs, "empty-tab"
     
-    newTabs = copy.copy(currentTabs)
-    newRecordingIndex:int = recordingCount - 1
-    trialCount:int = len(globals.recordingList[newRecordingIndex][1])
-    newGraphControls = createGraphControls(newRecordingIndex, trialCount)
-    newTabID = f"recording-{newRecordingIndex}"
+    shownTrialCounts: dict = {tab['props'].get('tab_id'): shownRecordingTrialCount(tab) for tab in currentTabs if isinstance(tab, dict)}
+    newTabs = [tab for tab in copy.copy(currentTabs) if not (isinstance(tab, dict) and tab['props'].get('tab_id') == "empty-tab")]
+    newTabID = no_update
+
+    for newRecordingIndex in range(recordingCount):
+        tabID = f"recording-{newRecordingIndex}"
+        if tabID not in shownTrialCounts:
+            newTab, newTabID = makeRecordingTab(sessionID, newRecordingIndex)
+            newTabs.append(newTab)
+        elif shownTrialCounts[tabID] not in (None, globals.recordingStore.trialCount(sessionID, newRecordingIndex)):
+            tabPosition = next(position for position, tab in enumerate(newTabs)
+                               if isinstance(tab, dict) and tab['props'].get('tab_id') == tabID)
+            newTabs[tabPosition] = makeRecordingTab(sessionID, newRecordingIndex)[0]
+
+    return newTabs, newTabID
+
+
+def makeRecordingTab(sessionID:str, recordingIndex:int) -> tuple:
+    '''
+    Builds the tab, graph controls and graph for one recording of the session.
 
-    newTab = dbc.Tab(label=globals.recordingList[newRecordingIndex][0], tab_id=f"recording-{newRecordingIndex}",
+    Parameters:
+        sessionID (str) : ID of the browser session the recording is stored under.
+        recordingIndex (int) : index of the recording in the session's recordings.
+
+    Returns:
+        (dbc.Tab) : tab of the recording.
+        (str) : ID of the tab.
+    '''
+    recordingName, recordingTrials = globals.recordingStore.recording(sessionID, recordingIndex)
+    trialCount:int = len(recordingTrials)
+    #a tab rebuilt after its recording was calibrated keeps counting as calibrated
+    calibrateTrigger:int = 0 if globals.recordingStore.calibratedIndexOf(sessionID, recordingIndex) is None else 1
+    newGraphControls = createGraphControls(recordingIndex, trialCount, calibrateTrigger)
+    newTabID = f"recording-{recordingIndex}"
+
+    newTab = dbc.Tab(label=recordingName, tab_id=newTabID,
                     children=[dbc.Row(
                             [
                             dbc.Col(newGraphControls, width=3, style={"height": "100%"}), 
-                            dbc.Col(dcc.Graph(id ={'type': 'nystagmus-plot', 'index':newRecordingIndex}, style={'width':'140vh', 'height': '80vh'},
+                            dbc.Col(dcc.Graph(id ={'type': 'nystagmus-plot', 'index':recordingIndex}, style={'width':'140vh', 'height': '80vh'},
                                               config={'edits': {'shapePosition': True}, 'displaylogo': False}),
                                     width=9, style={"height": "100%"}),
                             ],
                             align='center',
                             class_name='h-100'),
+                            #trial count shown in the trial dropdown, the tab is rebuilt if the converted recording has a different count
+                            dcc.Store(id={'type': 'recording-trial-count', 'index': recordingIndex}, data=trialCount),
                         ]
                     )
-    
-    if recordingCount ==1:
-        return [newTab], newTabID
-    else:
-        newTabs.append(newTab)
-        return newTabs, newTabID
+    return newTab, newTabID
     
 @app.callback(Output('tabs', 'children'),
           Output('tabs', 'active_tab'),
           Input('calibrate-trigger', 'data'),
           State('tabs', 'children'),
           State('tabs', 'active_tab'),
+          State('session-id', 'data'),
           prevent_initial_call=True)
-def addNewCalibratedTab(calibrateTrigger, currentTabs, activeTab) -> tuple:
+def addNewCalibratedTab(calibrateTrigger, currentTabs, activeTab, sessionID) -> tuple:
     '''
-    Creates a new tab for each calibration.
+    Creates a new tab for each calibrated recording, or rebuilds its tab when the recording was recalibrated in place.
     Triggers upon regression calculations of a file. 
-    Returns the tab list with the new tab appended.
+    Returns the tab list with the new tab appended, or the recalibrated tab replaced.
 
     Parameters:
         calibrateTrigger (int) : triggers the callback function. Incremented after each calibration.
         currentTabs (list) : list of current tab components.
         activeTab (str) : active tab to be returned if an improper callback is executed.
+        sessionID (str) : ID of the browser session the calibrated recordings are stored under.
 
     Returns:
         (list) : Updated list of tabs with new tab appended.
         (str) : active tab to be updated to ensure correct tab is shown.
     '''
 
-    calibratedRecordingCount = len(globals.calibratedRecordingList)
+    calibratedRecordingCount = globals.recordingStore.calibratedRecordingCount(sessionID)
 
     if calibratedRecordingCount == 0 or calibrateTrigger == 0:
         return currentTabs, activeTab
     
     newTabs = copy.copy(currentTabs)
-    newCalibratedIndex = calibratedRecordingCount - 1
-    relevantRecording = globals.calibratedRecordingList[newCalibratedIndex]
-    trialCount = len(relevantRecording[1])
-
-    newTab, newTabID = makeNewCalibratedTab(relevantRecording, newCalibratedIndex, trialCount)
-    newTabs.append(newTab)
+    shownRevisions: dict = {tab['props'].get('tab_id'): shownCalibratedRevision(tab) for tab in currentTabs if isinstance(tab, dict)}
+    newTabID = activeTab
+
+    for calibratedIndex in range(calibratedRecordingCount):
+        tabID = f"calibrated-{calibratedIndex}"
+        revision = globals.recordingStore.calibratedRevision(sessionID, calibratedIndex)
+        if tabID in shownRevisions and shownRevisions[tabID] == revision:
+            continue
+
+        relevantRecording = globals.recordingStore.calibratedRecording(sessionID, calibratedIndex)
+        trialCount = len(relevantRecording[1])
+        newTab, newTabID = makeNewCalibratedTab(relevantRecording, calibratedIndex, trialCount, revision)
+        if tabID in shownRevisions:
+            tabPosition = next(position for position, tab in enumerate(newTabs)
+                               if isinstance(tab, dict) and tab['props'].get('tab_id') == tabID)
+            newTabs[tabPosition] = newTab
+        else:
+            newTabs.append(newTab)
 
     return newTabs, newTabID
+
+
+def shownRecordingTrialCount(tab: dict) -> int | None:
+    #trial count held in a recording tab's trial count store, None for other tabs
+    for child in tab['props'].get('children') or []:
+        childID = child.get('props', {}).get('id') if isinstance(child, dict) else None
+        if isinstance(childID, dict) and childID.get('type') == 'recording-trial-count':
+            return child['props'].get('data')
+    return None
+
+
+def shownCalibratedRevision(tab: dict) -> str | None:
+    #revision held in a calibrated tab's revision store, None for other tabs
+    for child in tab['props'].get('children') or []:
+        childID = child.get('props', {}).get('id') if isinstance(child, dict) else None
+        if isinstance(childID, dict) and childID.get('type') == 'calibrated-revision':
+            return child['props'].get('data')
+    return None
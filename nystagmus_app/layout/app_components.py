@@ -5,8 +5,14 @@ dcc.Store(id='upload-trigger', data=0),
 dcc.Store(id='calibrate-trigger', data=0),
 
 upload_button = html.Div([
-    dcc.Upload([dbc.Button("Upload EDF", id="upload-edf-button", color="primary", className="mr-2",)], id = 'upload-edf',  accept=".edf"),
+    dcc.Upload([dbc.Button("Upload EDF", id="upload-edf-button", color="primary", className="mr-2",)], id = 'upload-edf',  accept=".edf", multiple=True),
+    dcc.Store(id='upload-handle', data=None),
+    #jobs submitted by uploadFile, and the IDs of those pollConversion has collected, each written by one callback only
+    dcc.Store(id='conversion-job', data=[]),
+    dcc.Store(id='conversion-collected', data=[]),
+    dcc.Interval(id='conversion-interval', interval=500, disabled=True),
     html.Div(id='upload-output', style={"margin-top": "10px" }, ),
+    dbc.Progress(id='conversion-progress', value=0, striped=True, animated=True, style={"display": "none"}),
 ])
 
 tabs = dbc.Tabs(
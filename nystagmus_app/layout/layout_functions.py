@@ -1,11 +1,11 @@
 from dash import dcc, html
 import dash_bootstrap_components as dbc
 
-def createGraphControls(recordingIndex, trialCount):
+def createGraphControls(recordingIndex, trialCount, calibrateTrigger=0):
 
     new_graph_controls = dbc.Card(
         [   
-            dcc.Store(id={'type':'calibrate-trigger-indexed', 'index':recordingIndex}, data=0),
+            dcc.Store(id={'type':'calibrate-trigger-indexed', 'index':recordingIndex}, data=calibrateTrigger),
             html.Div([
                 html.Label('Trial:'),
                 dcc.Dropdown(id={'type':'trial-dropdown', 'index': recordingIndex}, options=["Trial " + str(i + 1) for i in range(trialCount)], value="Trial 1",
@@ -217,7 +217,7 @@ def createCalibratedGraphControls(calibratedIndex, trialCount):
 
     return controls
 
-def makeNewCalibratedTab(relevantRecording, calibratedIndex, trialCount):
+def makeNewCalibratedTab(relevantRecording, calibratedIndex, trialCount, revision=None):
     recordingName = f'{relevantRecording[0]}'
     newGraphControls = createCalibratedGraphControls(calibratedIndex, trialCount)
     newTabID = f"calibrated-{calibratedIndex}"
@@ -235,6 +235,8 @@ def makeNewCalibratedTab(relevantRecording, calibratedIndex, trialCount):
                             align='center',
                             class_name='h-100'),
                               dcc.Store(id={'type': 'calibrated-x-range', 'index': calibratedIndex}, data=(None, None)),
+                              #revision of the calibrated recording shown, the tab is rebuilt when the recording is recalibrated
+                              dcc.Store(id={'type': 'calibrated-revision', 'index': calibratedIndex}, data=revision),
                         ]
                     )
     return newTab, newTabID
\ No newline at end of file
@@ -0,0 +1,326 @@
+from __future__ import annotations
+import argparse
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+
+import numpy as np
+
+from nystagmus_app.utils.regression import calibrateTrials
+from nystagmus_app.utils.trial_stream import streamTrials
+
+#setup logging
+logging.basicConfig(filename='std.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filemode='w')
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+#this module is the headless pipeline, it must never import Dash or Plotly
+CALIBRATION_DIRECTIONS = ['XLeft', 'YLeft', 'XRight', 'YRight']
+OUTPUT_FORMATS = ['npz', 'parquet']
+CONVERSION_OPTIONS = 'gaze_data_type = 0, sample_fields = position, compact_schema = 1'
+
+
+def findEDFFiles(inputPaths: list[str]) -> list[Path]:
+    '''
+    Expands directories and glob patterns into a sorted list of EDF files.
+
+    Parameters:
+        inputPaths (list[str]): EDF files, directories holding EDF files, or glob patterns (** is recursive)
+
+    Returns:
+        list[Path]: EDF files found, without duplicates
+    '''
+    EDFfilePaths: set = set()
+    for inputPath in inputPaths:
+        if os.path.isdir(inputPath):
+            matches = [str(path) for path in Path(inputPath).iterdir()]
+        else:
+            matches = glob.glob(inputPath, recursive=True)
+        EDFfilePaths.update(Path(match).resolve() for match in matches
+                            if match.lower().endswith('.edf') and os.path.isfile(match))
+    return sorted(EDFfilePaths)
+
+
+def loadCalibrationSpec(calibrationSpec: str) -> dict:
+    '''
+    Reads a calibration spec in the makeCalibrationDict format, e.g. {"XLeft": {"plus10Degs": 120, "minus10Degs": -130}}.
+
+    Parameters:
+        calibrationSpec (str): path of a JSON file, or the JSON text itself
+
+    Returns:
+        dict: calibration data for applyRecordingLinearRegression
+    '''
+    if os.path.isfile(calibrationSpec):
+        with open(calibrationSpec, 'r', encoding='utf-8') as file:
+            calibrationData = json.load(file)
+    else:
+        calibrationData = json.loads(calibrationSpec)
+
+    if not isinstance(calibrationData, dict) or not calibrationData:
+        raise ValueError("Calibration spec must be a non-empty JSON object")
+
+    for direction, lines in calibrationData.items():
+        if direction not in CALIBRATION_DIRECTIONS:
+            raise ValueError(f"Unknown calibration direction {direction!r}, expected one of {CALIBRATION_DIRECTIONS}")
+        if not isinstance(lines, dict) or 'plus10Degs' not in lines or 'minus10Degs' not in lines:
+            raise ValueError(f"Calibration for {direction} needs plus10Degs and minus10Degs")
+        if lines['plus10Degs'] == lines['minus10Degs']:
+            raise ValueError(f"Calibration for {direction} has the same value for plus10Degs and minus10Degs")
+
+    return calibrationData
+
+
+def trialMetrics(recordingName: str, trial, columns: list[str], positionData: np.ndarray) -> dict:
+    #summary of one calibrated trial, missing is the fraction of samples without data
+    metrics = {'recording': recordingName, 'trial': trial.trialNumber, 'eyeTracked': trial.eyeTracked,
+               'startTime': int(trial.startTime), 'endTime': int(trial.endTime), 'samples': len(positionData)}
+
+    with warnings.catch_warnings():
+        #channels of an eye that was not tracked are all NaN
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        missing = np.isnan(positionData).mean(axis=0) if len(positionData) else np.ones(len(columns))
+        means = np.nanmean(positionData, axis=0)
+        ranges = np.nanmax(positionData, axis=0) - np.nanmin(positionData, axis=0)
+
+    for columnIndex, column in enumerate(columns):
+        metrics[f'{column}Missing'] = float(missing[columnIndex])
+        metrics[f'{column}Mean'] = float(means[columnIndex])
+        metrics[f'{column}Range'] = float(ranges[columnIndex])
+    return metrics
+
+
+#class writing a recording's calibrated trials to its output file as they are produced
+class CalibratedOutputWriter:
+    '''
+    Writes calibrated trials one at a time, so a recording is never held in memory as a whole.
+    npz: each trial's time and positionData rows are appended to temporary raw files, which are memory-mapped into
+    the .npz by close (np.savez copies them across in buffered chunks).
+    parquet: each trial is written as a row group.
+    The output is written under a partial name and only moved into place by close, discard removes it.
+    '''
+    def __init__(self, outputPath: Path, columns: list[str], outputFormat: str = 'npz'):
+        self.outputPath: Path = Path(outputPath)
+        self.partialPath: Path = self.outputPath.with_name(f'.{self.outputPath.name}.partial')
+        self.columns: list[str] = columns
+        self.outputFormat: str = outputFormat
+        self.trialLengths: list[int] = [0]
+        self.timeDtype = np.dtype(np.int64)
+        self.parquetWriter = None
+        self.temporaryPaths: list[Path] = []
+        if outputFormat != 'parquet':
+            self.temporaryPaths = [self.outputPath.with_name(f'.{self.outputPath.name}.{name}') for name in ('time', 'positionData')]
+            self.timeFile = open(self.temporaryPaths[0], 'wb')
+            self.positionFile = open(self.temporaryPaths[1], 'wb')
+
+    def write(self, timeData: np.ndarray, positionData: np.ndarray) -> None:
+        #append the rows of the next trial
+        if self.outputFormat == 'parquet':
+            self._writeRowGroup(timeData, positionData)
+        else:
+            if len(self.trialLengths) == 1:
+                self.timeDtype = timeData.dtype
+            np.ascontiguousarray(timeData, dtype=self.timeDtype).tofile(self.timeFile)
+            np.ascontiguousarray(positionData, dtype=np.float32).tofile(self.positionFile)
+        self.trialLengths.append(len(timeData))
+
+    def close(self) -> None:
+        #finish the output file and move it into place
+        if self.outputFormat == 'parquet':
+            if self.parquetWriter is None:
+                #no trials, write the empty table with the same columns
+                self._writeRowGroup(np.empty(0, dtype=np.int64), np.empty((0, len(self.columns)), dtype=np.float32))
+            self.parquetWriter.close()
+        else:
+            self._closeTemporaryFiles()
+            trialOffsets = np.cumsum(self.trialLengths, dtype=np.int64)
+            rowCount = int(trialOffsets[-1])
+            if rowCount:
+                timeData = np.memmap(self.temporaryPaths[0], dtype=self.timeDtype, mode='r', shape=(rowCount,))
+                positionData = np.memmap(self.temporaryPaths[1], dtype=np.float32, mode='r', shape=(rowCount, len(self.columns)))
+            else:
+                timeData = np.empty(0, dtype=self.timeDtype)
+                positionData = np.empty((0, len(self.columns)), dtype=np.float32)
+            with open(self.partialPath, 'wb') as file:
+                np.savez(file, time=timeData, positionData=positionData, columns=np.array(self.columns), trialOffsets=trialOffsets)
+            #the maps must be released before their files are removed
+            del timeData, positionData
+            self._removeTemporaryFiles()
+        os.replace(self.partialPath, self.outputPath)
+
+    def discard(self) -> None:
+        #remove everything written so far, after a failure part way through the recording
+        if self.parquetWriter is not None:
+            self.parquetWriter.close()
+        self._closeTemporaryFiles()
+        self._removeTemporaryFiles()
+        self.partialPath.unlink(missing_ok=True)
+
+    def _writeRowGroup(self, timeData: np.ndarray, positionData: np.ndarray) -> None:
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        calibratedData = pd.DataFrame(positionData, columns=self.columns, copy=False)
+        calibratedData.insert(0, 'time', timeData)
+        calibratedData.insert(0, 'trial', np.full(len(timeData), len(self.trialLengths) - 1, dtype=np.int64))
+        table = pa.Table.from_pandas(calibratedData, preserve_index=False)
+        if self.parquetWriter is None:
+            self.parquetWriter = pq.ParquetWriter(self.partialPath, table.schema)
+        self.parquetWriter.write_table(table)
+
+    def _closeTemporaryFiles(self) -> None:
+        if self.temporaryPaths:
+            self.timeFile.close()
+            self.positionFile.close()
+
+    def _removeTemporaryFiles(self) -> None:
+        for temporaryPath in self.temporaryPaths:
+            temporaryPath.unlink(missing_ok=True)
+
+
+def processRecording(EDFfilePath: str, recordingName: str, calibrationData: dict, outputDirectory: str,
+                     outputFormat: str = 'npz', backendFactory: Callable | None = None) -> list[dict]:
+    '''
+    Imports, parses and calibrates one recording and writes its calibrated arrays. Runs in a worker process.
+    Trials are streamed from the EDF file and written as they are calibrated, so memory is bounded by the largest trial.
+
+    npz output holds time, the calibrated (rows, channels) positionData, the channel names in columns,
+    and trialOffsets, where rows trialOffsets[i]:trialOffsets[i+1] belong to trial i.
+    parquet output is one table with a trial column, time and one column per calibrated channel.
+
+    Parameters:
+        EDFfilePath (str): path of the EDF file
+        recordingName (str): name the output file is written under
+        calibrationData (dict): calibration data in the makeCalibrationDict format
+        outputDirectory (str): directory the output is written to
+        outputFormat (str): 'npz' or 'parquet'
+        backendFactory (Callable | None): returns the reader backend to use instead of the EDFAccess API
+
+    Returns:
+        list[dict]: metrics of each trial
+    '''
+    columns = ['pos' + key for key in calibrationData.keys()]
+    writer = CalibratedOutputWriter(Path(outputDirectory) / f'{recordingName}.{outputFormat}', columns, outputFormat)
+    metrics: list[dict] = []
+    try:
+        for trial, positionData in calibrateTrials(streamTrials(EDFfilePath, CONVERSION_OPTIONS, backendFactory), calibrationData):
+            writer.write(trial.sampleTimes(), positionData)
+            metrics.append(trialMetrics(recordingName, trial, columns, positionData))
+        writer.close()
+    except Exception:
+        writer.discard()
+        raise
+
+    logger.info(f"Processed {EDFfilePath} into {len(metrics)} calibrated trials")
+    return metrics
+
+
+def outputNames(EDFfilePaths: list[Path]) -> list[str]:
+    #file stem of each recording, numbered when two recordings share a stem
+    names: list[str] = []
+    stemCounts: dict = {}
+    for EDFfilePath in EDFfilePaths:
+        stem = EDFfilePath.stem
+        stemCounts[stem] = stemCounts.get(stem, 0) + 1
+        names.append(stem if stemCounts[stem] == 1 else f'{stem}_{stemCounts[stem] - 1}')
+    return names
+
+
+def runBatch(EDFfilePaths: list[Path], calibrationData: dict, outputDirectory: Path, outputFormat: str = 'npz',
+             maxWorkers: int | None = None, backendFactory: Callable | None = None) -> tuple[pd.DataFrame, list]:
+    '''
+    Runs processRecording for every EDF file across a pool of worker processes and writes the metrics table.
+
+    Parameters:
+        EDFfilePaths (list[Path]): EDF files to process
+        calibrationData (dict): calibration data in the makeCalibrationDict format
+        outputDirectory (Path): directory the outputs and metrics are written to
+        outputFormat (str): 'npz' or 'parquet'
+        maxWorkers (int | None): worker processes, defaults to the number of CPUs
+        backendFactory (Callable | None): returns the reader backend to use instead of the EDFAccess API
+
+    Returns:
+        tuple[pd.DataFrame, list]: metrics of every trial processed, and (EDF file, error) of every file that failed
+    '''
+    import pandas as pd
+    outputDirectory = Path(outputDirectory)
+    outputDirectory.mkdir(parents=True, exist_ok=True)
+    maxWorkers = maxWorkers or os.cpu_count() or 1
+
+    allMetrics: list[dict] = []
+    failures: list = []
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=maxWorkers, mp_context=context) as executor:
+        jobs = {executor.submit(processRecording, str(EDFfilePath), recordingName, calibrationData, str(outputDirectory),
+                                outputFormat, backendFactory): EDFfilePath
+                for EDFfilePath, recordingName in zip(EDFfilePaths, outputNames(EDFfilePaths))}
+
+        for fileNumber, job in enumerate(as_completed(jobs), start=1):
+            EDFfilePath = jobs[job]
+            try:
+                allMetrics.extend(job.result())
+                print(f"[{fileNumber}/{len(jobs)}] {EDFfilePath.name}")
+            except Exception as e:
+                logger.error(f"Error processing {EDFfilePath}: {str(e)}")
+                failures.append((EDFfilePath, str(e)))
+                print(f"[{fileNumber}/{len(jobs)}] {EDFfilePath.name} failed: {str(e)}")
+
+    metrics = pd.DataFrame(allMetrics)
+    if not metrics.empty:
+        metrics.sort_values(['recording', 'trial'], inplace=True, ignore_index=True)
+    if outputFormat == 'parquet':
+        metrics.to_parquet(outputDirectory / 'metrics.parquet', index=False)
+    else:
+        metrics.to_csv(outputDirectory / 'metrics.csv', index=False)
+
+    return metrics, failures
+
+
+def batchMain(argv: list[str] | None = None) -> int:
+    '''
+    Entry point of `nystagmus batch`.
+
+    Parameters:
+        argv (list[str] | None): arguments after the subcommand, defaults to sys.argv
+
+    Returns:
+        int: exit status, 1 if any recording failed
+    '''
+    parser = argparse.ArgumentParser(prog='nystagmus batch',
+                                     description='Import, parse and calibrate EDF recordings without the browser UI.')
+    parser.add_argument('inputs', nargs='+', help='EDF files, directories of EDF files, or glob patterns')
+    parser.add_argument('-c', '--calibration', required=True,
+                        help='calibration JSON file or text, e.g. \'{"XLeft": {"plus10Degs": 120, "minus10Degs": -130}}\'')
+    parser.add_argument('-o', '--output', required=True, help='directory to write the outputs to')
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='npz',
+                        help='npz (default) or parquet, which needs pyarrow installed')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='worker processes, defaults to the number of CPUs')
+    args = parser.parse_args(argv)
+
+    try:
+        calibrationData = loadCalibrationSpec(args.calibration)
+    except (ValueError, OSError) as e:
+        parser.error(f"invalid calibration spec: {str(e)}")
+
+    if args.format == 'parquet':
+        try:
+            import pyarrow
+        except ImportError:
+            parser.error("parquet output needs pyarrow, install it with `pip install pyarrow` or use --format npz")
+
+    EDFfilePaths = findEDFFiles(args.inputs)
+    if not EDFfilePaths:
+        parser.error("no EDF files found")
+
+    print(f"Processing {len(EDFfilePaths)} recording(s) into {args.output}")
+    metrics, failures = runBatch(EDFfilePaths, calibrationData, Path(args.output), args.format, args.workers)
+    print(f"Wrote {len(metrics)} trial(s) from {len(EDFfilePaths) - len(failures)} recording(s), {len(failures)} failed")
+    return 1 if failures else 0
@@ -0,0 +1,128 @@
+import logging
+import re
+import threading
+from pathlib import Path
+
+from flask import Flask, abort, jsonify, request
+
+#setup logging
+logging.basicConfig(filename='std.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filemode='w')
+logger = logging.getLogger(__name__)
+
+#relative to the app's routes_pathname_prefix
+UPLOAD_ROUTE = 'upload/<uploadID>'
+#EDFToNumpy only accepts paths ending in .edf
+UPLOAD_SUFFIX = '.edf'
+STREAM_BLOCK_SIZE = 1024 * 1024
+UPLOAD_ID_PATTERN = re.compile(r'^[A-Za-z0-9-]{8,64}$')
+#defaults of the server.config keys read on every chunk, so `nystagmus serve` can change them after the routes are registered
+MAX_UPLOAD_BYTES = 2 * 1024**3
+MAX_ACTIVE_UPLOADS = 8
+#seconds a browser turned away by MAX_ACTIVE_UPLOADS waits before sending the chunk again
+UPLOAD_RETRY_AFTER = 1
+
+
+def uploadPath(uploadDirectory: Path, uploadID: str) -> Path:
+    '''
+    Path an upload is streamed to.
+
+    Parameters:
+        uploadDirectory (Path): directory uploads are written to
+        uploadID (str): ID chosen by the browser for the upload
+
+    Returns:
+        Path: path of the uploaded file
+    '''
+    if not isinstance(uploadID, str) or not UPLOAD_ID_PATTERN.match(uploadID):
+        raise ValueError(f"Invalid upload ID: {uploadID!r}")
+    return Path(uploadDirectory) / f'{uploadID}{UPLOAD_SUFFIX}'
+
+
+def registerUploadRoutes(server: Flask, uploadDirectory: Path, routePrefix: str = '/') -> None:
+    '''
+    Registers the chunked upload endpoint on the Flask server behind the Dash app.
+
+    GET  <routePrefix>upload/<uploadID>               returns {"received": bytes stored so far}, used to resume an upload
+    POST <routePrefix>upload/<uploadID>?offset=<n>    appends the request body, which must start at byte n of the file
+
+    A chunk whose offset does not match the bytes already stored is rejected with 409 and the stored size,
+    so the browser can resume from there. The body is copied to disk in STREAM_BLOCK_SIZE blocks, so server
+    memory does not grow with the file size.
+
+    An upload that would grow past server.config['MAX_UPLOAD_BYTES'] is deleted and rejected with 413.
+    At most server.config['MAX_ACTIVE_UPLOADS'] chunks are written at once per process, further chunks are
+    rejected with 429 and a Retry-After header.
+
+    Parameters:
+        server (Flask): server of the Dash app
+        uploadDirectory (Path): directory uploads are written to
+        routePrefix (str): the app's routes_pathname_prefix, the endpoint is registered under it
+    '''
+    uploadDirectory = Path(uploadDirectory)
+    server.config.setdefault('MAX_UPLOAD_BYTES', MAX_UPLOAD_BYTES)
+    server.config.setdefault('MAX_ACTIVE_UPLOADS', MAX_ACTIVE_UPLOADS)
+    activeUploads = [0]
+    activeUploadsLock = threading.Lock()
+
+    def receivedBytes(filePath: Path) -> int:
+        return filePath.stat().st_size if filePath.exists() else 0
+
+    def getUploadPath(uploadID: str) -> Path:
+        try:
+            return uploadPath(uploadDirectory, uploadID)
+        except ValueError:
+            abort(400)
+
+    def uploadStatus(uploadID: str):
+        return jsonify(received=receivedBytes(getUploadPath(uploadID)))
+
+    def rejectTooLarge(uploadID: str, filePath: Path, maxUploadBytes: int):
+        logger.warning(f"Upload {uploadID} rejected, larger than the {maxUploadBytes} byte upload limit")
+        filePath.unlink(missing_ok=True)
+        return jsonify(error='upload too large', maxBytes=maxUploadBytes), 413
+
+    def writeChunk(uploadID: str, filePath: Path, received: int):
+        maxUploadBytes = server.config['MAX_UPLOAD_BYTES']
+        if request.content_length is not None and received + request.content_length > maxUploadBytes:
+            return rejectTooLarge(uploadID, filePath, maxUploadBytes)
+
+        uploadDirectory.mkdir(exist_ok=True)
+        #never read past the declared length, the stream may not be limited to it (e.g. wsgi.input_terminated),
+        #and never past one byte over the limit when no length is declared
+        remaining = request.content_length if request.content_length is not None else maxUploadBytes - received + 1
+        with open(filePath, 'ab') as file:
+            while remaining > 0:
+                block = request.stream.read(min(STREAM_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                file.write(block)
+                remaining -= len(block)
+            received = file.tell()
+
+        if received > maxUploadBytes:
+            return rejectTooLarge(uploadID, filePath, maxUploadBytes)
+        logger.debug(f"Upload {uploadID} received {received} bytes")
+        return jsonify(received=received)
+
+    def uploadChunk(uploadID: str):
+        filePath = getUploadPath(uploadID)
+        received = receivedBytes(filePath)
+        offset = request.args.get('offset', type=int)
+
+        if offset != received:
+            logger.warning(f"Upload {uploadID} chunk at offset {offset} rejected, {received} bytes already received")
+            return jsonify(received=received), 409
+
+        with activeUploadsLock:
+            if activeUploads[0] >= server.config['MAX_ACTIVE_UPLOADS']:
+                logger.warning(f"Upload {uploadID} chunk rejected, {activeUploads[0]} chunks already being written")
+                return jsonify(received=received), 429, {'Retry-After': str(UPLOAD_RETRY_AFTER)}
+            activeUploads[0] += 1
+        try:
+            return writeChunk(uploadID, filePath, received)
+        finally:
+            with activeUploadsLock:
+                activeUploads[0] -= 1
+
+    server.add_url_rule(routePrefix + UPLOAD_ROUTE, 'upload_status', uploadStatus, methods=['GET'])
+    server.add_url_rule(routePrefix + UPLOAD_ROUTE, 'upload_chunk', uploadChunk, methods=['POST'])
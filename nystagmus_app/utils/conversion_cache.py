@@ -0,0 +1,249 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from nystagmus_app.EDF_file_importer.StringPool import MessageArray
+
+#setup logging
+logging.basicConfig(filename='std.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filemode='w')
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT_VERSION = 2
+ARRAY_NAMES = ['RECORDINGdata', 'MESSAGEdata', 'SAMPLEdata', 'EVENTdata', 'IOEVENTdata']
+HASH_CHUNK_SIZE = 1024 * 1024
+MAX_CACHE_BYTES = 2 * 1024**3
+PIN_DIRECTORY = '.pins'
+MAX_PIN_AGE = 24 * 60 * 60      # seconds after which a pin that was never removed (e.g. a job nobody collected) is ignored
+
+
+def mappedFilename(array: np.ndarray) -> str | None:
+    #file array is memory-mapped from as a whole, through any views of the np.memmap
+    base = array
+    while isinstance(base, np.ndarray):
+        if isinstance(base, np.memmap) and base.filename and base.nbytes == array.nbytes and base.ctypes.data == array.ctypes.data:
+            return base.filename
+        base = base.base
+    return None
+
+
+def saveArray(arrayPath: Path, array: np.ndarray) -> None:
+    #arrays memory-mapped from the same file name in another entry are hard linked, others are written out
+    filename = mappedFilename(array)
+    if filename and Path(filename).name == arrayPath.name:
+        try:
+            os.link(filename, arrayPath)
+            return
+        except OSError:
+            pass
+    np.save(arrayPath, np.asarray(array), allow_pickle=False)
+
+
+def writeEntry(entryPath: Path, EDFfileData: np.ndarray) -> None:
+    '''
+    Writes EDF file data to an existing directory as one .npy file per data array plus header.json.
+    The message text pool is written next to MESSAGEdata as MESSAGEdata-text.npy and MESSAGEdata-offsets.npy.
+    Arrays memory-mapped from another entry are hard linked instead of copied when the filesystem allows it.
+
+    Parameters:
+        entryPath (Path): directory to write to
+        EDFfileData (np.ndarray): output of EDFToNumpy
+    '''
+    header = EDFfileData[0]['Header'][0]
+    entryInfo = {'header': header if isinstance(header, str) else None, 'disabled': []}
+    for arrayIndex, arrayName in enumerate(ARRAY_NAMES, start=1):
+        array = EDFfileData[arrayIndex]
+        if array is None:
+            entryInfo['disabled'].append(arrayName)
+            continue
+
+        saveArray(entryPath / f'{arrayName}.npy', array)
+        if isinstance(array, MessageArray):
+            saveArray(entryPath / f'{arrayName}-text.npy', array.textBuffer)
+            saveArray(entryPath / f'{arrayName}-offsets.npy', array.textOffsets)
+
+    with open(entryPath / 'header.json', 'w', encoding='utf-8') as file:
+        json.dump(entryInfo, file)
+
+
+def readEntry(entryPath: Path) -> np.ndarray:
+    '''
+    Reads a directory written by writeEntry as read-only memory-mapped arrays.
+
+    Parameters:
+        entryPath (Path): directory to read
+
+    Returns:
+        np.ndarray: EDF file data in the same layout as EDFToNumpy
+    '''
+    with open(entryPath / 'header.json', 'r', encoding='utf-8') as file:
+        entryInfo = json.load(file)
+
+    EDFfileData = np.empty(6, dtype=object)
+    headerData = np.empty(1, dtype=[('Header', 'O')])
+    headerData['Header'] = entryInfo['header']
+    EDFfileData[0] = headerData
+    for arrayIndex, arrayName in enumerate(ARRAY_NAMES, start=1):
+        if arrayName in entryInfo['disabled']:
+            EDFfileData[arrayIndex] = None
+        else:
+            EDFfileData[arrayIndex] = np.load(entryPath / f'{arrayName}.npy', mmap_mode='r')
+            if (entryPath / f'{arrayName}-text.npy').exists():
+                EDFfileData[arrayIndex] = MessageArray(EDFfileData[arrayIndex], np.load(entryPath / f'{arrayName}-text.npy', mmap_mode='r'),
+                                                       np.load(entryPath / f'{arrayName}-offsets.npy'))
+    return EDFfileData
+
+
+#class to cache converted EDF files on disk
+class ConversionCache:
+    '''
+    On-disk cache of EDFToNumpy output, keyed by a hash of the EDF file bytes and the conversion options.
+    Each entry is a directory holding one .npy file per data array and the header text, so a hit is loaded
+    with np.load(mmap_mode='r') without touching the EDF API. Entries are evicted least recently used first
+    once the cache grows past maxSizeBytes, except those pinned by a reader that has not collected them yet.
+    '''
+    def __init__(self, cacheDirectory: Path, maxSizeBytes: int = MAX_CACHE_BYTES):
+        self.cacheDirectory: Path = Path(cacheDirectory)
+        self.maxSizeBytes: int = maxSizeBytes
+        self.cacheDirectory.mkdir(parents=True, exist_ok=True)
+
+    def makeKey(self, EDFfile: bytes | Path, optionString: str) -> str:
+        '''
+        Hash the EDF file contents (bytes, or a path read in chunks) together with the conversion options.
+
+        Parameters:
+            EDFfile (bytes | Path): EDF file contents or path to the EDF file
+            optionString (str): option string passed to EDFToNumpy
+
+        Returns:
+            str: cache key
+        '''
+        fileHash = hashlib.sha256()
+        if isinstance(EDFfile, (bytes, bytearray, memoryview)):
+            fileHash.update(EDFfile)
+        else:
+            with open(EDFfile, 'rb') as file:
+                while chunk := file.read(HASH_CHUNK_SIZE):
+                    fileHash.update(chunk)
+
+        normalisedOptions = optionString.replace(' ', '')
+        fileHash.update(f'|{normalisedOptions}|{CACHE_FORMAT_VERSION}'.encode('utf-8'))
+        return fileHash.hexdigest()
+
+    def load(self, key: str) -> np.ndarray | None:
+        '''
+        Load a cached conversion as read-only memory-mapped arrays.
+
+        Parameters:
+            key (str): cache key from makeKey
+
+        Returns:
+            np.ndarray | None: EDF file data in the same layout as EDFToNumpy, or None on a miss
+        '''
+        entryPath = self.cacheDirectory / key
+        try:
+            EDFfileData = readEntry(entryPath)
+
+        except FileNotFoundError:
+            logger.info(f"Conversion cache miss for {key[:12]}")
+            return None
+
+        except Exception as e:
+            logger.warning(f"Discarding unreadable conversion cache entry {key[:12]}: {str(e)}")
+            shutil.rmtree(entryPath, ignore_errors=True)
+            return None
+
+        #touch the entry so eviction sees it as recently used
+        os.utime(entryPath)
+        logger.info(f"Conversion cache hit for {key[:12]}")
+        return EDFfileData
+
+    def store(self, key: str, EDFfileData: np.ndarray) -> None:
+        '''
+        Write a conversion to the cache, then evict old entries if the cache is over its size cap.
+        The entry is written to a temporary directory and renamed, so readers never see a partial entry.
+
+        Parameters:
+            key (str): cache key from makeKey
+            EDFfileData (np.ndarray): output of EDFToNumpy
+        '''
+        entryPath = self.cacheDirectory / key
+        if entryPath.exists():
+            return
+
+        stagingPath = Path(tempfile.mkdtemp(dir=self.cacheDirectory, prefix='.staging-'))
+        try:
+            writeEntry(stagingPath, EDFfileData)
+            os.replace(stagingPath, entryPath)
+            logger.info(f"Stored conversion {key[:12]} in cache")
+
+        except Exception as e:
+            shutil.rmtree(stagingPath, ignore_errors=True)
+            #another process storing the same conversion first is not an error
+            if not entryPath.exists():
+                logger.error(f"Error storing conversion in cache: {str(e)}")
+                raise
+
+        self._evict()
+
+    def pin(self, key: str, owner: str) -> None:
+        '''
+        Keep an entry from being evicted until unpin is called with the same owner, e.g. until a conversion job's
+        result has been collected. The entry does not need to exist yet.
+
+        Parameters:
+            key (str): cache key from makeKey
+            owner (str): name of the pin, letters, digits and - only
+        '''
+        pinDirectory = self.cacheDirectory / PIN_DIRECTORY
+        pinDirectory.mkdir(exist_ok=True)
+        (pinDirectory / f'{key}.{owner}').touch()
+
+    def unpin(self, key: str, owner: str) -> None:
+        (self.cacheDirectory / PIN_DIRECTORY / f'{key}.{owner}').unlink(missing_ok=True)
+
+    def _pinnedKeys(self) -> set:
+        #keys with at least one live pin, pins older than MAX_PIN_AGE are removed
+        pinnedKeys = set()
+        pinDirectory = self.cacheDirectory / PIN_DIRECTORY
+        if not pinDirectory.is_dir():
+            return pinnedKeys
+        now = time.time()
+        for pinPath in pinDirectory.iterdir():
+            try:
+                if now - pinPath.stat().st_mtime > MAX_PIN_AGE:
+                    pinPath.unlink(missing_ok=True)
+                else:
+                    pinnedKeys.add(pinPath.name.split('.')[0])
+            except FileNotFoundError:
+                pass
+        return pinnedKeys
+
+    def _entrySize(self, entryPath: Path) -> int:
+        return sum(file.stat().st_size for file in entryPath.iterdir() if file.is_file())
+
+    def _evict(self) -> None:
+        #remove least recently used entries until the cache fits in its size cap
+        try:
+            entries = [entry for entry in self.cacheDirectory.iterdir() if entry.is_dir() and not entry.name.startswith('.')]
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            entrySizes = {entry: self._entrySize(entry) for entry in entries}
+            totalSize = sum(entrySizes.values())
+
+            #the newest entry and pinned entries are kept even if the cache stays over its cap
+            pinnedKeys = self._pinnedKeys()
+            evictableEntries = [entry for entry in entries[:-1] if entry.name not in pinnedKeys]
+            while totalSize > self.maxSizeBytes and evictableEntries:
+                oldestEntry = evictableEntries.pop(0)
+                shutil.rmtree(oldestEntry, ignore_errors=True)
+                totalSize -= entrySizes[oldestEntry]
+                logger.info(f"Evicted conversion {oldestEntry.name[:12]} from cache")
+
+        except Exception as e:
+            logger.error(f"Error evicting conversion cache entries: {str(e)}")
@@ -0,0 +1,235 @@
+import json
+import logging
+import multiprocessing
+import os
+import re
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from nystagmus_app.utils.conversion_cache import MAX_CACHE_BYTES, ConversionCache
+
+#setup logging
+logging.basicConfig(filename='std.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filemode='w')
+logger = logging.getLogger(__name__)
+
+JOB_DIRECTORY = '.jobs'
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def jobStatusPath(cacheDirectory: Path, jobID: str) -> Path:
+    #status file of a job, in the cache directory so every server process can read it
+    if not isinstance(jobID, str) or not JOB_ID_PATTERN.match(jobID):
+        raise ValueError(f"Invalid conversion job ID: {jobID!r}")
+    return Path(cacheDirectory) / JOB_DIRECTORY / f'{jobID}.json'
+
+
+def writeJobStatus(cacheDirectory: Path, jobID: str, **status) -> None:
+    #replace the status file in one rename so readers never see a partial file
+    statusPath = jobStatusPath(cacheDirectory, jobID)
+    stagingPath = statusPath.with_name(f'.{statusPath.name}.{os.getpid()}')
+    with open(stagingPath, 'w', encoding='utf-8') as file:
+        json.dump(status, file)
+    os.replace(stagingPath, statusPath)
+
+
+def readJobStatus(cacheDirectory: Path, jobID: str) -> dict | None:
+    try:
+        with open(jobStatusPath(cacheDirectory, jobID), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def readEDFFile(EDFfilePath: str, optionString: str, progressCallback: Callable | None = None,
+                backendFactory: Callable | None = None) -> np.ndarray:
+    '''
+    Reads one EDF file into the EDFToNumpy layout.
+
+    Parameters:
+        EDFfilePath (str): path of the EDF file
+        optionString (str): option string passed to EDFToNumpy
+        progressCallback (Callable | None): called with (elementsDecoded, elementCount) as the file is read
+        backendFactory (Callable | None): returns the reader backend to use instead of the EDFAccess API
+
+    Returns:
+        np.ndarray: EDF file data
+    '''
+    #imported here so the parent process does not load the importer until it needs it
+    from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+    from nystagmus_app.EDF_file_importer.EyeLinkDataImporter import EDFToNumpy
+
+    if backendFactory is None:
+        return EDFToNumpy(EDFfilePath, optionString, progressCallback=progressCallback)
+
+    importer = EDF2numpy(backend=backendFactory())
+    importer.consumeInputArgs(optionString.replace('=', ':').replace(' ', ''))
+    importer.progressCallback = progressCallback
+    return importer.readEDF(EDFfilePath)
+
+
+def convertEDFFile(EDFfilePath: str, optionString: str, cacheDirectory: str, jobID: str,
+                   backendFactory: Callable | None = None, maxCacheBytes: int = MAX_CACHE_BYTES) -> str:
+    '''
+    Converts one EDF file in a worker process and writes the arrays to the conversion cache.
+    Progress, and the cache key once done, are written to the job's status file, from which any
+    server process can follow the job and memory-map the arrays from the cache.
+    The cache entry is pinned under the job ID so other jobs cannot evict it before ConversionJobs.result collects it.
+
+    Parameters:
+        EDFfilePath (str): path of the EDF file
+        optionString (str): option string passed to EDFToNumpy
+        cacheDirectory (str): directory of the conversion cache
+        jobID (str): ID progress is reported under
+        backendFactory (Callable | None): returns the reader backend to use instead of the EDFAccess API
+        maxCacheBytes (int): size cap of the conversion cache
+
+    Returns:
+        str: conversion cache key of the converted file
+    '''
+    cache = ConversionCache(Path(cacheDirectory), maxCacheBytes)
+    cacheKey = None
+    try:
+        cacheKey = cache.makeKey(Path(EDFfilePath), optionString)
+        cache.pin(cacheKey, jobID)
+        if cache.load(cacheKey) is None:
+            def reportProgress(elementsDecoded: int, elementCount: int) -> None:
+                writeJobStatus(cacheDirectory, jobID, state='running', elementsDecoded=elementsDecoded, elementCount=elementCount)
+
+            EDFfileData = readEDFFile(EDFfilePath, optionString, reportProgress, backendFactory)
+            cache.store(cacheKey, EDFfileData)
+
+    except Exception as e:
+        if cacheKey is not None:
+            cache.unpin(cacheKey, jobID)
+        writeJobStatus(cacheDirectory, jobID, state='failed', elementsDecoded=0, elementCount=0, error=str(e))
+        raise
+
+    writeJobStatus(cacheDirectory, jobID, state='done', elementsDecoded=1, elementCount=1, cacheKey=cacheKey)
+    return cacheKey
+
+
+#class running EDF conversions in a pool of worker processes
+class ConversionJobs:
+    '''
+    Runs EDF conversions in worker processes so the ctypes decode loop does not hold the web server's GIL.
+    Each job reports the elements decoded so far, and its result is read back from the conversion cache.
+    Job status is kept in files in the cache directory, so a job submitted by one server process can be
+    followed from any other. The pool is only started when the first job is submitted.
+    '''
+    def __init__(self, cacheDirectory: Path, maxWorkers: int | None = None, backendFactory: Callable | None = None,
+                 maxCacheBytes: int = MAX_CACHE_BYTES):
+        self.cacheDirectory: Path = Path(cacheDirectory)
+        self.maxCacheBytes: int = maxCacheBytes
+        self.maxWorkers: int = maxWorkers or max((os.cpu_count() or 2) - 1, 1)
+        self.backendFactory: Callable | None = backendFactory
+        self.executor: ProcessPoolExecutor | None = None
+        self.jobs: dict[str, Future] = {}
+
+    def _startPool(self) -> None:
+        #spawn rather than fork, the web server process has threads running
+        context = multiprocessing.get_context('spawn')
+        (self.cacheDirectory / JOB_DIRECTORY).mkdir(parents=True, exist_ok=True)
+        self.executor = ProcessPoolExecutor(max_workers=self.maxWorkers, mp_context=context)
+        logger.info(f"Started conversion pool with {self.maxWorkers} workers")
+
+    def submit(self, EDFfilePath: Path, optionString: str) -> str:
+        '''
+        Queues an EDF file for conversion.
+
+        Parameters:
+            EDFfilePath (Path): path of the EDF file
+            optionString (str): option string passed to EDFToNumpy
+
+        Returns:
+            str: job ID
+        '''
+        if self.executor is None:
+            self._startPool()
+
+        jobID = uuid.uuid4().hex
+        writeJobStatus(self.cacheDirectory, jobID, state='queued', elementsDecoded=0, elementCount=0)
+        self.jobs[jobID] = self.executor.submit(convertEDFFile, str(EDFfilePath), optionString, str(self.cacheDirectory),
+                                                jobID, self.backendFactory, self.maxCacheBytes)
+        logger.info(f"Submitted conversion job {jobID} for {EDFfilePath}")
+        return jobID
+
+    def status(self, jobID: str) -> dict:
+        '''
+        Progress of a job.
+
+        Parameters:
+            jobID (str): job ID from submit
+
+        Returns:
+            dict: state ('queued', 'running', 'done' or 'failed'), elementsDecoded, elementCount, and error if failed
+        '''
+        status = readJobStatus(self.cacheDirectory, jobID)
+        if status is None:
+            return {'state': 'failed', 'elementsDecoded': 0, 'elementCount': 0, 'error': 'Unknown conversion job'}
+
+        #a worker that died (e.g. killed by the OS) never writes its final status
+        job = self.jobs.get(jobID)
+        if job is not None and job.done() and job.exception() is not None and status['state'] != 'failed':
+            status = {'state': 'failed', 'elementsDecoded': 0, 'elementCount': 0, 'error': str(job.exception())}
+        status.pop('cacheKey', None)
+        return status
+
+    def result(self, jobID: str) -> np.ndarray:
+        '''
+        Converted data of a finished job, memory-mapped from the conversion cache. The job is forgotten afterwards.
+
+        Parameters:
+            jobID (str): job ID from submit
+
+        Returns:
+            np.ndarray: EDF file data in the same layout as EDFToNumpy
+        '''
+        statusPath = jobStatusPath(self.cacheDirectory, jobID)
+        job = self.jobs.pop(jobID, None)
+        if job is not None:
+            try:
+                job.result()
+            except Exception:
+                statusPath.unlink(missing_ok=True)
+                raise
+
+        status = readJobStatus(self.cacheDirectory, jobID) or {}
+        if status.get('state') not in ('done', 'failed'):
+            raise ValueError(f"Conversion job {jobID} has not finished")
+        statusPath.unlink(missing_ok=True)
+        if status['state'] == 'failed':
+            raise ValueError(status.get('error', f"Conversion job {jobID} failed"))
+        cacheKey = status['cacheKey']
+
+        cache = ConversionCache(self.cacheDirectory, self.maxCacheBytes)
+        try:
+            EDFfileData = cache.load(cacheKey)
+        finally:
+            cache.unpin(cacheKey, jobID)
+        if EDFfileData is None:
+            raise ValueError(f"Converted data for job {jobID} is missing from the conversion cache")
+        return EDFfileData
+
+    def convertBatch(self, EDFfilePaths: list[Path], optionString: str) -> list[np.ndarray]:
+        '''
+        Converts several EDF files at once, one job per file spread across the pool's workers.
+        Waits for every job and returns the results in the order of EDFfilePaths.
+
+        Parameters:
+            EDFfilePaths (list[Path]): paths of the EDF files
+            optionString (str): option string passed to EDFToNumpy
+
+        Returns:
+            list[np.ndarray]: EDF file data of each file, memory-mapped from the conversion cache
+        '''
+        jobIDs = [self.submit(EDFfilePath, optionString) for EDFfilePath in EDFfilePaths]
+        return [self.result(jobID) for jobID in jobIDs]
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,266 @@
+import bisect
+import numpy as np
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+#setup logging
+logging.basicConfig(filename='std.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filemode='w')
+logger = logging.getLogger(__name__)
+
+#roughly two points per horizontal pixel of a full width graph
+DEFAULT_POINT_BUDGET = 4000
+
+
+def minMaxIndices(yData: np.ndarray, pointBudget: int = DEFAULT_POINT_BUDGET) -> np.ndarray:
+    '''
+    Picks the rows to keep when drawing yData with about pointBudget points.
+    The data is split into pointBudget/2 equal buckets and the minimum and maximum of each bucket are kept,
+    so fast-phase peaks survive. The first missing (NaN) sample of a bucket is kept too, so gaps in the data still break the line.
+
+    Parameters:
+        yData (np.ndarray): values of the trace
+        pointBudget (int): number of points to reduce the trace to
+
+    Returns:
+        np.ndarray: sorted row indices into yData
+    '''
+    sampleCount = len(yData)
+    if sampleCount <= pointBudget:
+        return np.arange(sampleCount)
+
+    bucketSize = -(-sampleCount // max(pointBudget // 2, 1))
+    minimumIndices, maximumIndices, missingIndices = bucketExtremes(yData, bucketSize)
+
+    keptIndices = np.concatenate((minimumIndices, maximumIndices, missingIndices[missingIndices >= 0]))
+    return np.unique(keptIndices)
+
+
+def bucketExtremes(yData: np.ndarray, bucketSize: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    #row of the minimum, maximum and first NaN (-1 if none) of each bucketSize block of yData
+    sampleCount = len(yData)
+    bucketCount = -(-sampleCount // bucketSize)
+
+    #pad the last bucket with NaN so the data reshapes into (buckets, bucketSize)
+    paddedData = np.full(bucketCount * bucketSize, np.nan, dtype=np.float64)
+    paddedData[:sampleCount] = yData
+    buckets = paddedData.reshape(bucketCount, bucketSize)
+    missing = np.isnan(buckets)
+    missing[-1, sampleCount - (bucketCount - 1) * bucketSize:] = False
+
+    bucketStarts = np.arange(bucketCount) * bucketSize
+    minimumIndices = bucketStarts + np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1)
+    maximumIndices = bucketStarts + np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1)
+    missingIndices = np.where(missing.any(axis=1), bucketStarts + np.argmax(missing, axis=1), -1)
+
+    #an all-NaN final bucket would otherwise point at the padding
+    np.minimum(minimumIndices, sampleCount - 1, out=minimumIndices)
+    np.minimum(maximumIndices, sampleCount - 1, out=maximumIndices)
+    return minimumIndices, maximumIndices, missingIndices
+
+
+def decimateTrace(xData, yData, pointBudget: int = DEFAULT_POINT_BUDGET) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Min/max decimation of one trace for plotting.
+
+    Parameters:
+        xData (array-like): x values of the trace (time or sample index)
+        yData (array-like): y values of the trace
+        pointBudget (int): number of points to reduce the trace to
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: decimated x and y values
+    '''
+    xData = np.asarray(xData)
+    yData = np.asarray(yData)
+    keptIndices = minMaxIndices(yData, pointBudget)
+    logger.debug(f"Decimated trace from {len(yData)} to {len(keptIndices)} points")
+    return xData[keptIndices], yData[keptIndices]
+
+
+def xRangeRows(xData, xRange: tuple | None) -> tuple[int, int]:
+    '''
+    Rows of the samples inside an x range, found by binary search so the trace is never scanned or copied.
+
+    Parameters:
+        xData (array-like): sorted x values of the trace, a NumPy array or any sorted sequence such as a range or pandas RangeIndex
+        xRange (tuple | None): (xStart, xEnd), or None (or None ends) for the whole trace
+
+    Returns:
+        tuple[int, int]: start and stop (exclusive) rows, xData[start:stop] lies within the range
+    '''
+    if xRange is None or xRange[0] is None or xRange[1] is None:
+        return 0, len(xData)
+
+    if isinstance(xData, np.ndarray):
+        startRow = int(np.searchsorted(xData, xRange[0], side='left'))
+        stopRow = int(np.searchsorted(xData, xRange[1], side='right'))
+    else:
+        #bisect indexes the sequence, a RangeIndex is searched without building its values (np.searchsorted would)
+        startRow = bisect.bisect_left(xData, xRange[0])
+        stopRow = bisect.bisect_right(xData, xRange[1])
+    return startRow, max(stopRow, startRow)
+
+
+#class holding a multi-resolution min/max summary of one trace
+class MinMaxPyramid:
+    '''
+    Level k of the pyramid stores, for every block of BASE_BUCKET_SIZE * 2**k rows, the rows of its minimum,
+    maximum and first NaN. Level 0 is built from the data and every further level by merging pairs of buckets,
+    so building costs O(n) once and a query for any x range reads only about pointBudget entries.
+    '''
+    BASE_BUCKET_SIZE = 8
+
+    def __init__(self, xData: np.ndarray, yData: np.ndarray):
+        self.xData: np.ndarray = np.asarray(xData)
+        self.yData: np.ndarray = np.asarray(yData)
+        self.levels: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+        if len(self.yData) == 0:
+            return
+
+        level = bucketExtremes(self.yData, self.BASE_BUCKET_SIZE)
+        self.levels.append(level)
+        while len(level[0]) > 1:
+            level = self._mergeLevel(*level)
+            self.levels.append(level)
+
+    def _mergeLevel(self, minimumIndices, maximumIndices, missingIndices) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        #combine buckets 2i and 2i+1, an odd last bucket is merged with itself
+        if len(minimumIndices) % 2:
+            minimumIndices = np.append(minimumIndices, minimumIndices[-1])
+            maximumIndices = np.append(maximumIndices, maximumIndices[-1])
+            missingIndices = np.append(missingIndices, missingIndices[-1])
+
+        lowValues = np.nan_to_num(self.yData[minimumIndices], nan=np.inf)
+        highValues = np.nan_to_num(self.yData[maximumIndices], nan=-np.inf)
+        mergedMinimum = np.where(lowValues[0::2] <= lowValues[1::2], minimumIndices[0::2], minimumIndices[1::2])
+        mergedMaximum = np.where(highValues[0::2] >= highValues[1::2], maximumIndices[0::2], maximumIndices[1::2])
+        mergedMissing = np.where(missingIndices[0::2] >= 0, missingIndices[0::2], missingIndices[1::2])
+        return mergedMinimum, mergedMaximum, mergedMissing
+
+    def query(self, xRange: tuple | None = None, pointBudget: int = DEFAULT_POINT_BUDGET) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        Points to draw for the visible x range, at full resolution if they fit in pointBudget.
+
+        Parameters:
+            xRange (tuple | None): (xStart, xEnd) of the visible window, or None for the whole trace
+            pointBudget (int): maximum number of points to return
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: x and y values to plot
+        '''
+        sampleCount = len(self.yData)
+        startRow, stopRow = xRangeRows(self.xData, xRange)
+        if xRange is not None and xRange[0] is not None and xRange[1] is not None:
+            #one extra row either side so the line runs to the edges of the window
+            startRow, stopRow = max(startRow - 1, 0), min(stopRow + 1, sampleCount)
+
+        if stopRow - startRow <= pointBudget:
+            keptIndices = np.arange(startRow, stopRow)
+
+        else:
+            bucketsAllowed = max(pointBudget // 2, 1)
+            levelNumber = 0
+            while levelNumber < len(self.levels) - 1 and \
+                    -(-(stopRow - startRow) // (self.BASE_BUCKET_SIZE << levelNumber)) > bucketsAllowed:
+                levelNumber += 1
+
+            bucketSize = self.BASE_BUCKET_SIZE << levelNumber
+            firstBucket, lastBucket = startRow // bucketSize, -(-stopRow // bucketSize)
+            minimumIndices, maximumIndices, missingIndices = (indices[firstBucket:lastBucket] for indices in self.levels[levelNumber])
+            keptIndices = np.unique(np.concatenate((minimumIndices, maximumIndices, missingIndices[missingIndices >= 0])))
+
+        return self.xData[keptIndices], self.yData[keptIndices]
+
+    def nbytes(self) -> int:
+        #memory held by the pyramid, the trace counts only if the pyramid owns a copy of it
+        levelBytes = sum(indices.nbytes for level in self.levels for indices in level)
+        return levelBytes + sum(data.nbytes for data in (self.xData, self.yData) if data.base is None)
+
+
+#class caching the pyramids of the traces being viewed
+class LevelOfDetail:
+    '''
+    Least recently used cache of MinMaxPyramid objects, one per (data source, column).
+    The trace is only loaded, and its pyramid built, the first time it is drawn, after which overview, zoom and pan
+    requests cost O(points returned). All methods are thread safe.
+    '''
+    def __init__(self, maxPyramids: int = 64):
+        self.maxPyramids: int = maxPyramids
+        self.pyramids: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def visibleTrace(self, source, column: str, loadTrace: Callable[[], tuple], xRange: tuple | None = None,
+                     pointBudget: int = DEFAULT_POINT_BUDGET) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        Points to draw for one trace over the visible x range.
+
+        Parameters:
+            source: object the trace belongs to (a Trial or a calibrated trial DataFrame)
+            column (str): name of the trace within the source
+            loadTrace (Callable[[], tuple]): returns the full (xData, yData) of the trace, only called on a cache miss
+            xRange (tuple | None): (xStart, xEnd) of the visible window, or None for the whole trace
+            pointBudget (int): maximum number of points to return
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: x and y values to plot
+        '''
+        key = (id(source), column)
+        with self.lock:
+            entry = self.pyramids.get(key)
+            if entry is not None:
+                self.pyramids.move_to_end(key)
+
+        if entry is not None:
+            pyramid = entry[1]
+        else:
+            #built outside the lock so other traces are served meanwhile
+            pyramid = MinMaxPyramid(*loadTrace())
+            with self.lock:
+                #keep a reference to the source so its id cannot be reused while the entry exists
+                self.pyramids[key] = (source, pyramid)
+                if len(self.pyramids) > self.maxPyramids:
+                    self.pyramids.popitem(last=False)
+            logger.debug(f"Built level of detail pyramid for {column} with {len(pyramid.levels)} levels")
+
+        return pyramid.query(xRange, pointBudget)
+
+    def discard(self, sources: list) -> None:
+        #drop the pyramids of sources that are no longer kept, e.g. trials evicted from the recording store
+        sourceIDs = {id(source) for source in sources}
+        with self.lock:
+            for key in [key for key in self.pyramids if key[0] in sourceIDs]:
+                del self.pyramids[key]
+
+    def residentBytes(self, sources: list) -> int:
+        #memory of the pyramids built over sources, so the recording store can count it in its budget
+        sourceIDs = {id(source) for source in sources}
+        with self.lock:
+            return sum(pyramid.nbytes() for (sourceID, _), (_, pyramid) in self.pyramids.items() if sourceID in sourceIDs)
+
+
+def relayoutXRange(relayoutData: dict | None):
+    '''
+    Reads the x axis range out of a plotly relayoutData event.
+
+    Parameters:
+        relayoutData (dict | None): data from the relayout event
+
+    Returns:
+        tuple | None | bool: (xStart, xEnd) after a zoom or pan, None when the axis was reset to autorange,
+        and False when the event did not change the x axis
+    '''
+    if not relayoutData:
+        return False
+    if 'xaxis.range[0]' in relayoutData and 'xaxis.range[1]' in relayoutData:
+        return (relayoutData['xaxis.range[0]'], relayoutData['xaxis.range[1]'])
+    if 'xaxis.range' in relayoutData:
+        return tuple(relayoutData['xaxis.range'])
+    if relayoutData.get('xaxis.autorange') or relayoutData.get('autosize'):
+        return None
+    return False
+
+
+levelOfDetail = LevelOfDetail()
@@ -0,0 +1,127 @@
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from nystagmus_app.utils.trial_parsing import EDFTrialParser, Trial
+
+#setup logging
+logging.basicConfig(filename='std.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filemode='w')
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_TRIALS = 8
+
+
+#class reading the trials of an EDF file on demand
+class LazyRecording:
+    '''
+    The trials of an EDF file, decoded one at a time as they are asked for rather than converting the whole file first.
+    Opening reads only the trial headers; recording[trialNumber] jumps to that trial (edf_jump_to_trial) and decodes its
+    samples, events and messages into a Trial. Decoded trials are kept in a least recently used cache of maxTrials trials.
+
+    Behaves as a read-only list of Trial, so it can stand in for the trials of a converted recording.
+    Trial i is the recording block inside the i-th pair of trial identifier messages (TRIALID ... TRIAL_RESULT by default).
+    All methods are thread safe, trials are decoded one at a time through the file's single read position.
+    '''
+    def __init__(self, EDFfilePath: Path, optionString: str, maxTrials: int = DEFAULT_MAX_TRIALS,
+                 backendFactory: Callable | None = None, onEvict: Callable[[list], None] | None = None):
+        '''
+        Parameters:
+            EDFfilePath (Path): path of the EDF file, kept open until close is called
+            optionString (str): option string passed to EDFToNumpy
+            maxTrials (int): decoded trials to keep
+            backendFactory (Callable | None): returns the reader backend to use instead of the EDFAccess API
+            onEvict (Callable[[list], None] | None): called with the trials pushed out of the cache
+        '''
+        #imported here so the importer is only loaded once a file is opened
+        from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+
+        self.maxTrials: int = maxTrials
+        self.onEvict: Callable[[list], None] | None = onEvict
+        self.importer = EDF2numpy(backend=backendFactory() if backendFactory is not None else None)
+        self.importer.consumeInputArgs(optionString.replace('=', ':').replace(' ', ''))
+        self.trialHeaders: np.ndarray = self.importer.openTrials(str(EDFfilePath))
+        self.trials: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        logger.info(f"Opened {EDFfilePath} with {len(self.trialHeaders)} trials for reading on demand")
+
+    def __len__(self) -> int:
+        return len(self.trialHeaders)
+
+    def __getitem__(self, trialNumber: int) -> Trial:
+        '''
+        One trial, decoded from the EDF file if it is not in the cache.
+
+        Parameters:
+            trialNumber (int): index of the trial, negative indices count from the end
+
+        Returns:
+            Trial: the trial's data
+        '''
+        if not isinstance(trialNumber, (int, np.integer)):
+            raise TypeError(f"Trial index must be an integer, not {type(trialNumber).__name__}")
+        if trialNumber < 0:
+            trialNumber += len(self)
+        if not 0 <= trialNumber < len(self):
+            raise IndexError(f"Trial {trialNumber} is not in the recording")
+        trialNumber = int(trialNumber)
+
+        with self.lock:
+            if trialNumber in self.trials:
+                self.trials.move_to_end(trialNumber)
+                return self.trials[trialNumber]
+
+            trial = self._decodeTrial(trialNumber)
+            self.trials[trialNumber] = trial
+            evicted = []
+            while len(self.trials) > self.maxTrials:
+                evicted.append(self.trials.popitem(last=False)[1])
+
+        if evicted and self.onEvict is not None:
+            self.onEvict(evicted)
+        return trial
+
+    def __iter__(self):
+        for trialNumber in range(len(self)):
+            yield self[trialNumber]
+
+    def decodedTrials(self) -> list:
+        #trials currently in the cache, least recently used first
+        with self.lock:
+            return list(self.trials.values())
+
+    def clear(self) -> list:
+        #drop every decoded trial and return them, the file stays open
+        with self.lock:
+            dropped = list(self.trials.values())
+            self.trials.clear()
+        return dropped
+
+    def close(self) -> None:
+        with self.lock:
+            self.importer.closeEDF(self.importer.EDFData)
+            self.trials.clear()
+
+    def __del__(self):
+        #the EDF file is closed once nothing holds the recording any more, e.g. after the store drops it
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def _decodeTrial(self, trialNumber: int) -> Trial:
+        EDFtrialData = self.importer.readTrial(trialNumber)
+        recordingTrials = EDFTrialParser(EDFtrialData).extractAllTrials()
+        if not recordingTrials:
+            logger.error(f"No recording found in trial {trialNumber}")
+            raise ValueError(f"No recording found in trial {trialNumber}")
+        if len(recordingTrials) > 1:
+            logger.warning(f"Trial {trialNumber} holds {len(recordingTrials)} recordings, only the first is used")
+
+        trial = recordingTrials[0]
+        trial.trialNumber = trialNumber
+        logger.debug(f"Decoded trial {trialNumber} with {len(trial.trialData[2])} samples")
+        return trial
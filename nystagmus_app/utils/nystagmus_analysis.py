@@ -0,0 +1,281 @@
+import logging
+import threading
+from collections import OrderedDict
+from math import factorial
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+
+#setup logging
+logging.basicConfig(filename='std.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filemode='w')
+logger = logging.getLogger(__name__)
+
+#this module only needs NumPy, so it can be used by the batch pipeline as well as the app
+DEFAULT_SAMPLING_RATE = 1000            # EyeLink default, used when a recording does not say
+SMOOTHING_WINDOW = 0.02                 # Savitzky-Golay window in seconds
+SMOOTHING_ORDER = 3                     # Savitzky-Golay polynomial order
+VELOCITY_THRESHOLD = 50.0               # degrees per second a fast phase must reach
+ACCELERATION_THRESHOLD = 4000.0         # degrees per second squared extending a fast phase to its onset and offset
+MIN_FAST_PHASE_DURATION = 0.006         # seconds, shorter fast phases are treated as noise
+
+
+def savitzkyGolayCoefficients(windowLength: int, polyOrder: int, derivative: int = 0) -> np.ndarray:
+    '''
+    Convolution weights of a Savitzky-Golay filter, fitting a polyOrder polynomial over windowLength samples.
+
+    Parameters:
+        windowLength (int): odd number of samples in the window
+        polyOrder (int): order of the fitted polynomial, less than windowLength
+        derivative (int): derivative of the fitted polynomial to evaluate at the window centre
+
+    Returns:
+        np.ndarray: weights per sample, applied as sum(weights * window) for a sample interval of 1
+    '''
+    if windowLength % 2 == 0 or polyOrder >= windowLength:
+        raise ValueError("Savitzky-Golay window must be odd and longer than the polynomial order")
+
+    halfWindow = windowLength // 2
+    offsets = np.arange(-halfWindow, halfWindow + 1, dtype=np.float64)
+    vandermonde = offsets[:, np.newaxis] ** np.arange(polyOrder + 1)
+    #row k of the pseudo-inverse gives the k-th polynomial coefficient of the least squares fit
+    return np.linalg.pinv(vandermonde)[derivative] * factorial(derivative)
+
+
+def savitzkyGolayFilter(data: np.ndarray, windowLength: int, polyOrder: int, derivative: int = 0,
+                        sampleInterval: float = 1.0) -> np.ndarray:
+    '''
+    Smooths data, or one of its derivatives, with a Savitzky-Golay filter.
+    The ends are padded with the first and last values so the output has the same length as data.
+    Missing (NaN) samples make the output NaN over the window around them.
+
+    Parameters:
+        data (np.ndarray): evenly sampled values
+        windowLength (int): odd number of samples in the window
+        polyOrder (int): order of the fitted polynomial
+        derivative (int): 0 to smooth, 1 for the first derivative, 2 for the second
+        sampleInterval (float): time between samples, derivatives are per unit of this time
+
+    Returns:
+        np.ndarray: filtered float64 values
+    '''
+    data = np.asarray(data, dtype=np.float64)
+    if len(data) == 0:
+        return data.copy()
+
+    halfWindow = windowLength // 2
+    weights = savitzkyGolayCoefficients(windowLength, polyOrder, derivative)
+    paddedData = np.pad(data, halfWindow, mode='edge')
+    #np.convolve flips the kernel, so pass the weights reversed
+    filtered = np.convolve(paddedData, weights[::-1], mode='valid')
+    return filtered / sampleInterval ** derivative
+
+
+def smoothingWindowLength(samplingRate: float, polyOrder: int = SMOOTHING_ORDER, windowDuration: float = SMOOTHING_WINDOW) -> int:
+    #odd number of samples covering windowDuration, at least enough to fit the polynomial
+    windowLength = int(round(windowDuration * samplingRate)) | 1
+    return max(windowLength, (polyOrder + 2) | 1)
+
+
+def runBounds(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    #start and stop (exclusive) rows of every run of True in mask
+    edges = np.diff(mask.astype(np.int8), prepend=0, append=0)
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def detectFastPhases(velocity: np.ndarray, acceleration: np.ndarray, samplingRate: float,
+                     velocityThreshold: float = VELOCITY_THRESHOLD, accelerationThreshold: float = ACCELERATION_THRESHOLD,
+                     minDuration: float = MIN_FAST_PHASE_DURATION) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    Finds the fast phases of a nystagmus trace.
+    A fast phase is a run of samples above the acceleration or velocity threshold that reaches the velocity threshold,
+    so its onset and offset are where the eye starts and stops accelerating rather than where it crosses the velocity threshold.
+
+    Parameters:
+        velocity (np.ndarray): smoothed velocity in degrees per second
+        acceleration (np.ndarray): smoothed acceleration in degrees per second squared
+        samplingRate (float): samples per second
+        velocityThreshold (float): speed a fast phase must reach
+        accelerationThreshold (float): acceleration extending a fast phase either side of the velocity threshold
+        minDuration (float): shortest fast phase in seconds
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: onset and offset (inclusive) rows of each fast phase
+    '''
+    with np.errstate(invalid='ignore'):
+        fast = np.abs(velocity) > velocityThreshold
+        active = fast | (np.abs(acceleration) > accelerationThreshold)
+
+    starts, stops = runBounds(active)
+    if len(starts) == 0:
+        return starts, stops
+
+    #keep the active runs holding at least one sample over the velocity threshold, every fast sample is in an active run
+    runStarts = np.zeros(len(active), dtype=np.int64)
+    runStarts[starts] = 1
+    runNumbers = np.cumsum(runStarts)
+    reachesThreshold = np.bincount(runNumbers[fast], minlength=len(starts) + 1)[1:] > 0
+    longEnough = (stops - starts) >= max(int(round(minDuration * samplingRate)), 1)
+    kept = reachesThreshold & longEnough
+    return starts[kept], stops[kept] - 1
+
+
+#class holding the beats found in one nystagmus trace
+class NystagmusBeats:
+    '''
+    Per beat arrays of a segmented trace. Beat i is the slow phase leading up to fast phase i, followed by fast phase i,
+    so the slow phase of beat i runs from the offset of fast phase i-1 (or the start of the trace) to onset i.
+
+    onsets, offsets:        rows of the first and last sample of each fast phase
+    slowPhaseVelocity:      mean velocity of the slow phase in degrees per second (NaN if it has no valid samples)
+    fastPhaseAmplitude:     position change over the fast phase in degrees, signed
+    fastPhaseVelocity:      peak velocity of the fast phase in degrees per second, signed
+    frequency:              beats per second from the previous onset (NaN for the first beat)
+    '''
+    def __init__(self, onsets: np.ndarray, offsets: np.ndarray, slowPhaseVelocity: np.ndarray, fastPhaseAmplitude: np.ndarray,
+                 fastPhaseVelocity: np.ndarray, frequency: np.ndarray, samplingRate: float, sampleCount: int):
+        self.onsets: np.ndarray = onsets
+        self.offsets: np.ndarray = offsets
+        self.slowPhaseVelocity: np.ndarray = slowPhaseVelocity
+        self.fastPhaseAmplitude: np.ndarray = fastPhaseAmplitude
+        self.fastPhaseVelocity: np.ndarray = fastPhaseVelocity
+        self.frequency: np.ndarray = frequency
+        self.samplingRate: float = samplingRate
+        self.sampleCount: int = sampleCount
+
+    def __len__(self) -> int:
+        return len(self.onsets)
+
+    def summary(self) -> dict:
+        #mean of each per beat measure, amplitudes and velocities as magnitudes
+        return {'beats': len(self),
+                'slowPhaseVelocity': finiteMean(np.abs(self.slowPhaseVelocity)),
+                'fastPhaseAmplitude': finiteMean(np.abs(self.fastPhaseAmplitude)),
+                'fastPhaseVelocity': finiteMean(np.abs(self.fastPhaseVelocity)),
+                'frequency': finiteMean(self.frequency)}
+
+
+def finiteMean(values: np.ndarray) -> float:
+    #mean of the finite values, NaN rather than a warning when there are none
+    finiteValues = values[np.isfinite(values)]
+    return float(finiteValues.mean()) if len(finiteValues) else np.nan
+
+
+def segmentNystagmus(position: np.ndarray, samplingRate: float = DEFAULT_SAMPLING_RATE,
+                     velocityThreshold: float = VELOCITY_THRESHOLD, accelerationThreshold: float = ACCELERATION_THRESHOLD,
+                     minDuration: float = MIN_FAST_PHASE_DURATION) -> NystagmusBeats:
+    '''
+    Splits a calibrated position trace into nystagmus beats and measures each one, without looping over samples.
+
+    Parameters:
+        position (np.ndarray): calibrated position in degrees, e.g. a posXLeft column of a calibrated trial, NaN where missing
+        samplingRate (float): samples per second
+        velocityThreshold (float): speed in degrees per second a fast phase must reach
+        accelerationThreshold (float): acceleration in degrees per second squared marking fast phase onset and offset
+        minDuration (float): shortest fast phase in seconds
+
+    Returns:
+        NystagmusBeats: per beat slow phase velocity, fast phase amplitude and velocity, and frequency
+    '''
+    position = np.asarray(position, dtype=np.float64)
+    windowLength = smoothingWindowLength(samplingRate)
+    sampleInterval = 1 / samplingRate
+
+    if len(position) < windowLength:
+        empty = np.empty(0, dtype=np.int64)
+        return NystagmusBeats(empty, empty, *(np.empty(0) for _ in range(4)), samplingRate, len(position))
+
+    velocity = savitzkyGolayFilter(position, windowLength, SMOOTHING_ORDER, 1, sampleInterval)
+    acceleration = savitzkyGolayFilter(position, windowLength, SMOOTHING_ORDER, 2, sampleInterval)
+    onsets, offsets = detectFastPhases(velocity, acceleration, samplingRate, velocityThreshold, accelerationThreshold, minDuration)
+
+    #slow phase i covers rows slowStarts[i]:onsets[i], summed for every beat at once with cumulative sums
+    slowStarts = np.concatenate(([0], offsets[:-1] + 1))
+    validVelocity = np.isfinite(velocity)
+    velocitySums = np.concatenate(([0.0], np.cumsum(np.where(validVelocity, velocity, 0.0))))
+    validCounts = np.concatenate(([0], np.cumsum(validVelocity)))
+    slowCounts = validCounts[onsets] - validCounts[slowStarts]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slowPhaseVelocity = np.where(slowCounts > 0, (velocitySums[onsets] - velocitySums[slowStarts]) / slowCounts, np.nan)
+
+    fastPhaseAmplitude = position[offsets] - position[onsets]
+
+    #peak of each fast phase: the fast phase rows are disjoint and ordered, so one reduceat over their bounds covers them all
+    #the sign is the direction the fast phase moves in on average
+    if len(onsets):
+        absoluteVelocity = np.append(np.abs(np.where(validVelocity, velocity, 0.0)), 0.0)
+        bounds = np.column_stack((onsets, offsets + 1)).ravel()
+        peakMagnitude = np.maximum.reduceat(absoluteVelocity, bounds)[::2]
+        fastPhaseVelocity = peakMagnitude * np.sign(velocitySums[offsets + 1] - velocitySums[onsets])
+    else:
+        fastPhaseVelocity = np.empty(0)
+
+    frequency = np.concatenate(([np.nan], samplingRate / np.diff(onsets))) if len(onsets) else np.empty(0)
+
+    logger.debug(f"Segmented {len(position)} samples into {len(onsets)} nystagmus beats")
+    return NystagmusBeats(onsets, offsets, slowPhaseVelocity, fastPhaseAmplitude, fastPhaseVelocity, frequency,
+                          samplingRate, len(position))
+
+
+def trialSamplingRate(trial) -> float:
+    #sampling rate recorded with a trial, DEFAULT_SAMPLING_RATE when the recording does not say
+    samplingRates = trial.trialData[0]['samplingRate']
+    return float(samplingRates[0]) if len(samplingRates) and samplingRates[0] > 0 else DEFAULT_SAMPLING_RATE
+
+
+def analyseTrials(calibratedTrials: Iterable[tuple], columns: list[str]) -> Iterator[tuple]:
+    '''
+    Generator stage segmenting every calibrated channel of a stream of trials, one trial at a time, e.g. on top of
+    calibrateTrials(streamTrials(...), calibrationData) to analyse a recording without holding it in memory.
+
+    Parameters:
+        calibratedTrials (Iterable[tuple]): (trial, positionData) pairs, positionData the trial's calibrated (rows, channels) buffer
+        columns (list[str]): channel name of each positionData column
+
+    Returns:
+        Iterator[tuple]: (trial, positionData, beats) with the NystagmusBeats of each channel, keyed by column
+    '''
+    for trial, positionData in calibratedTrials:
+        samplingRate = trialSamplingRate(trial)
+        beats = {column: segmentNystagmus(positionData[:, columnIndex], samplingRate) for columnIndex, column in enumerate(columns)}
+        yield trial, positionData, beats
+
+
+#class memoizing the segmentation of the windows the analysis buttons are pressed on
+class SegmentationCache:
+    '''
+    Least recently used cache of NystagmusBeats, keyed by what identifies the samples segmented,
+    e.g. (session, calibrated recording, trial, column, channel calibration, start row, stop row).
+    A calibrated channel's data only changes with its calibration, so an entry stays valid until it is pushed out.
+    '''
+    def __init__(self, maxEntries: int = 256):
+        self.maxEntries: int = maxEntries
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def beats(self, key: tuple, loadPosition: Callable[[], np.ndarray], samplingRate: float) -> NystagmusBeats:
+        '''
+        Beats of the samples identified by key, only segmented the first time the key is requested.
+
+        Parameters:
+            key (tuple): hashable identity of the position window
+            loadPosition (Callable[[], np.ndarray]): returns the position window, only called on a cache miss
+            samplingRate (float): samples per second
+
+        Returns:
+            NystagmusBeats: beats of the window, shared between requests so they must not be modified
+        '''
+        key = (*key, samplingRate)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+
+        beats = segmentNystagmus(loadPosition(), samplingRate)
+        with self.lock:
+            self.entries[key] = beats
+            if len(self.entries) > self.maxEntries:
+                self.entries.popitem(last=False)
+        return beats
+
+
+segmentationCache = SegmentationCache()
@@ -0,0 +1,546 @@
+import json
+import logging
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from nystagmus_app.utils.conversion_cache import readEntry, writeEntry
+from nystagmus_app.utils.lazy_recording import DEFAULT_MAX_TRIALS, LazyRecording
+from nystagmus_app.utils.trial_parsing import EDFTrialParser
+
+#setup logging
+logging.basicConfig(filename='std.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filemode='w')
+logger = logging.getLogger(__name__)
+
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9-]{8,64}$')
+SESSION_TIMEOUT = 24 * 60 * 60
+RECORDING = 'recording'
+CALIBRATED = 'calibrated'
+
+
+def inMemoryBytes(array: np.ndarray | None) -> int:
+    #bytes of array held in RAM, arrays backed by a memory-mapped file count as 0 as the OS can page them out
+    base = array
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return 0
+        base = getattr(base, 'base', None)
+    return array.nbytes if array is not None else 0
+
+
+def entryStamp(entryPath: Path) -> tuple | None:
+    #changes whenever entry.json is replaced, None if the entry does not exist
+    try:
+        entryStat = os.stat(entryPath / 'entry.json')
+    except FileNotFoundError:
+        return None
+    return entryStat.st_ino, entryStat.st_mtime_ns, entryStat.st_size
+
+
+def writeCalibratedEntry(entryPath: Path, name: str, columns: list[str], positionData: np.ndarray, trialOffsets: np.ndarray,
+                         calibrationData: dict, samplingRates: list[int] | None, recordingIndex: int | None) -> str:
+    #write the arrays under a new revision, then switch entry.json to it atomically, returns the revision
+    revision = uuid.uuid4().hex[:16]
+    np.save(entryPath / f'positionData-{revision}.npy', positionData, allow_pickle=False)
+    np.save(entryPath / f'trialOffsets-{revision}.npy', trialOffsets, allow_pickle=False)
+
+    entryInfo = {'name': name, 'columns': list(columns), 'calibrationData': calibrationData, 'revision': revision,
+                 'samplingRates': None if samplingRates is None else [int(rate) for rate in samplingRates],
+                 'recordingIndex': None if recordingIndex is None else int(recordingIndex)}
+    temporaryPath = entryPath / f'.entry-{revision}.json'
+    with open(temporaryPath, 'w', encoding='utf-8') as file:
+        json.dump(entryInfo, file)
+    os.replace(temporaryPath, entryPath / 'entry.json')
+    return revision
+
+
+#class holding one recording or calibrated recording of a session
+class StoredRecording:
+    '''
+    The memory-mapped arrays of a recording, and the trials or calibrated trial DataFrames built over them.
+    The built objects are None while the entry is evicted, and are rebuilt from the arrays the next time it is read.
+
+    recording:  arrays = EDF file data in the EDFToNumpy layout, built = list of Trial
+    calibrated: arrays = (columns, positionData, trialOffsets), built = list of calibrated trial DataFrames
+
+    A recording still being converted has no arrays, only the (EDF file path, option string) it is read from,
+    and is built as a LazyRecording decoding its trials from the EDF file as they are viewed.
+
+    stamp identifies the entry.json the entry was read from, a calibrated recording updated in place gets a new one.
+    '''
+    def __init__(self, kind: str, name: str, arrays, calibrationData: dict | None = None, samplingRates: list[int] | None = None,
+                 recordingIndex: int | None = None, revision: str | None = None, stamp: tuple | None = None,
+                 EDFsource: tuple | None = None):
+        self.kind: str = kind
+        self.name: str = name
+        self.arrays = arrays
+        self.calibrationData: dict | None = calibrationData
+        self.samplingRates: list[int] | None = samplingRates
+        self.recordingIndex: int | None = recordingIndex
+        self.revision: str | None = revision
+        self.stamp: tuple | None = stamp
+        self.EDFsource: tuple | None = EDFsource
+        self.built: list | LazyRecording | None = None
+
+    def builtObjects(self) -> list:
+        #trials or DataFrames built over the arrays, for a LazyRecording the trials it has decoded
+        if isinstance(self.built, LazyRecording):
+            return self.built.decodedTrials()
+        return self.built or []
+
+    def residentBytes(self, cachedBytes: Callable[[list], int] | None = None) -> int:
+        if self.kind == RECORDING and self.arrays is None:
+            arrayBytes = 0
+        elif self.kind == RECORDING:
+            arrayBytes = sum(inMemoryBytes(array) for array in self.arrays[1:])
+        else:
+            arrayBytes = inMemoryBytes(self.arrays[1])
+
+        #DataFrames a Trial has built and cached, and the arrays of trials decoded by a LazyRecording
+        builtBytes = 0
+        if self.kind == RECORDING and self.built is not None:
+            lazy = isinstance(self.built, LazyRecording)
+            for trial in self.builtObjects():
+                builtBytes += sum(int(value.memory_usage(index=True).sum()) for value in vars(trial).values()
+                                  if hasattr(value, 'memory_usage'))
+                if lazy:
+                    builtBytes += sum(array.nbytes for array in trial.trialData if array is not None)
+
+        #memory other caches hold for the built objects, e.g. plot pyramids
+        if cachedBytes is not None and self.built is not None:
+            builtBytes += cachedBytes(self.builtObjects())
+        return arrayBytes + builtBytes
+
+    def release(self) -> list:
+        #drop the built trials or DataFrames and return them, a LazyRecording keeps its file open and drops its decoded trials
+        if isinstance(self.built, LazyRecording):
+            return self.built.clear()
+        dropped, self.built = self.built, None
+        return dropped or []
+
+
+#class storing each browser session's recordings in a directory shared by every server process
+class RecordingStore:
+    '''
+    Recordings and calibrated recordings of each browser session, addressed by session ID and their index within the session.
+
+    Entries are written to storeDirectory/<sessionID>/<kind>-<index> when added, in the .npy format, and are read back
+    memory-mapped. Every server process (e.g. each gunicorn worker) sharing storeDirectory sees the same recordings and
+    shares one copy of their arrays through the page cache. An entry's index is claimed by renaming its finished
+    directory into place, so processes adding to the same session at once cannot clash or see partial entries.
+    A calibrated recording can be updated in place: its arrays are written under a new revision and entry.json is
+    replaced atomically, and each process rebuilds its DataFrames when it sees the new entry.json.
+
+    Each process keeps the trials / DataFrames it has built over the arrays. Reads mark an entry as recently used, and
+    once the built objects, and what cachedBytes reports other caches hold for them, go over memoryBudgetBytes the
+    least recently used are dropped, to be rebuilt on the next read.
+    Sessions not used for sessionTimeout seconds are removed. All methods are thread safe.
+    '''
+    def __init__(self, storeDirectory: Path, memoryBudgetBytes: int = 2 * 1024**3, sessionTimeout: float = SESSION_TIMEOUT,
+                 onEvict: Callable[[list], None] | None = None, maxLazyTrials: int = DEFAULT_MAX_TRIALS,
+                 backendFactory: Callable | None = None, cachedBytes: Callable[[list], int] | None = None):
+        '''
+        Parameters:
+            storeDirectory (Path): directory shared by every server process
+            memoryBudgetBytes (int): memory this process may use for built trials and DataFrames
+            sessionTimeout (float): seconds a session is kept without being used
+            onEvict (Callable[[list], None] | None): called with the trials or DataFrames dropped by an eviction,
+                so caches holding them can release them
+            maxLazyTrials (int): decoded trials each recording still being converted keeps, see LazyRecording
+            backendFactory (Callable | None): returns the reader backend recordings still being converted are read with,
+                instead of the EDFAccess API
+            cachedBytes (Callable[[list], int] | None): returns the memory other caches hold for a list of trials or
+                DataFrames, counted in memoryBudgetBytes
+        '''
+        self.storeDirectory: Path = Path(storeDirectory)
+        self.memoryBudgetBytes: int = memoryBudgetBytes
+        self.sessionTimeout: float = sessionTimeout
+        self.onEvict: Callable[[list], None] | None = onEvict
+        self.maxLazyTrials: int = maxLazyTrials
+        self.backendFactory: Callable | None = backendFactory
+        self.cachedBytes: Callable[[list], int] | None = cachedBytes
+        self.lock = threading.RLock()
+        #(sessionID, kind, index) -> entry read by this process, least recently used first
+        self.entries: OrderedDict = OrderedDict()
+
+    def clear(self) -> None:
+        #remove every session, called once when the server starts before any worker serves requests
+        with self.lock:
+            self._dropLocal(lambda key: True)
+            shutil.rmtree(self.storeDirectory, ignore_errors=True)
+
+    def addRecording(self, sessionID: str, name: str, EDFfileData: np.ndarray) -> int:
+        '''
+        Adds a recording to a session.
+
+        Parameters:
+            sessionID (str): ID of the browser session
+            name (str): name of the recording
+            EDFfileData (np.ndarray): EDF file data, arrays memory-mapped from the conversion cache are hard linked
+
+        Returns:
+            int: index of the recording within the session
+        '''
+        def writeRecording(entryPath: Path) -> None:
+            writeEntry(entryPath, EDFfileData)
+            with open(entryPath / 'entry.json', 'w', encoding='utf-8') as file:
+                json.dump({'name': name}, file)
+
+        return self._add(sessionID, RECORDING, writeRecording)
+
+    def addLazyRecording(self, sessionID: str, name: str, EDFfilePath: Path, optionString: str) -> int:
+        '''
+        Adds a recording whose conversion has not finished. Its trials are decoded from the EDF file as they are read,
+        until completeRecording gives it the converted arrays. The file is opened, and its trial headers read,
+        before the recording is added, so a file that cannot be read a trial at a time raises and is not added.
+
+        Parameters:
+            sessionID (str): ID of the browser session
+            name (str): name of the recording
+            EDFfilePath (Path): path of the EDF file, which must be kept until the recording is completed
+            optionString (str): option string the file is being converted with
+
+        Returns:
+            int: index of the recording within the session
+        '''
+        def writeLazyRecording(entryPath: Path) -> None:
+            with open(entryPath / 'entry.json', 'w', encoding='utf-8') as file:
+                json.dump({'name': name, 'EDFfilePath': str(EDFfilePath), 'optionString': optionString}, file)
+
+        lazyRecording = LazyRecording(Path(EDFfilePath), optionString, self.maxLazyTrials, self.backendFactory, self.onEvict)
+        index = self._add(sessionID, RECORDING, writeLazyRecording)
+
+        #this process keeps the file it has opened, others open their own when they first read the recording
+        entry = StoredRecording(RECORDING, name, None, stamp=entryStamp(self._sessionPath(sessionID) / f'{RECORDING}-{index}'),
+                                EDFsource=(str(EDFfilePath), optionString))
+        entry.built = lazyRecording
+        with self.lock:
+            self.entries[(sessionID, RECORDING, index)] = entry
+        return index
+
+    def completeRecording(self, sessionID: str, recordingIndex: int, EDFfileData: np.ndarray) -> None:
+        '''
+        Gives a recording added with addLazyRecording its converted arrays, keeping its index.
+        Processes reading its trials from the EDF file switch to the arrays the next time they read it.
+
+        Parameters:
+            sessionID (str): ID of the browser session
+            recordingIndex (int): index of the recording within the session
+            EDFfileData (np.ndarray): EDF file data, arrays memory-mapped from the conversion cache are hard linked
+        '''
+        entryPath = self._sessionPath(sessionID) / f'{RECORDING}-{recordingIndex}'
+        if not isinstance(recordingIndex, int) or recordingIndex < 0 or not entryPath.is_dir():
+            raise IndexError(f"No {RECORDING} {recordingIndex} in session {sessionID}")
+
+        with open(entryPath / 'entry.json', 'r', encoding='utf-8') as file:
+            name = json.load(file)['name']
+        writeEntry(entryPath, EDFfileData)
+        temporaryPath = entryPath / '.entry-complete.json'
+        with open(temporaryPath, 'w', encoding='utf-8') as file:
+            json.dump({'name': name}, file)
+        os.replace(temporaryPath, entryPath / 'entry.json')
+
+        with self.lock:
+            self._dropLocal(lambda key: key == (sessionID, RECORDING, recordingIndex))
+        self._touchSession(self._sessionPath(sessionID))
+        logger.info(f"Completed {RECORDING} {recordingIndex} of session {sessionID}")
+
+    def addCalibratedRecording(self, sessionID: str, name: str, columns: list[str], positionData: np.ndarray,
+                               trialOffsets: np.ndarray, calibrationData: dict, samplingRates: list[int] | None = None,
+                               recordingIndex: int | None = None) -> int:
+        '''
+        Adds a calibrated recording, as returned by calibrateRecording, to a session.
+
+        Parameters:
+            sessionID (str): ID of the browser session
+            name (str): name of the calibrated recording
+            columns (list[str]): calibrated channels
+            positionData (np.ndarray): calibrated (rows, channels) buffer
+            trialOffsets (np.ndarray): rows trialOffsets[i]:trialOffsets[i+1] belong to trial i
+            calibrationData (dict): calibration the recording was calibrated with
+            samplingRates (list[int] | None): samples per second of each trial, for the nystagmus analysis
+            recordingIndex (int | None): index of the recording it was calibrated from, see calibratedIndexOf
+
+        Returns:
+            int: index of the calibrated recording within the session
+        '''
+        writeCalibratedRecording = lambda entryPath: writeCalibratedEntry(entryPath, name, columns, positionData, trialOffsets,
+                                                                          calibrationData, samplingRates, recordingIndex)
+        return self._add(sessionID, CALIBRATED, writeCalibratedRecording)
+
+    def replaceCalibratedRecording(self, sessionID: str, calibratedIndex: int, name: str, columns: list[str], positionData: np.ndarray,
+                                   trialOffsets: np.ndarray, calibrationData: dict, samplingRates: list[int] | None = None,
+                                   recordingIndex: int | None = None) -> None:
+        '''
+        Updates a calibrated recording in place, keeping its index. Takes the same parameters as addCalibratedRecording.
+        Processes still reading the previous revision keep its arrays until they next read the entry.
+        '''
+        entryPath = self._sessionPath(sessionID) / f'{CALIBRATED}-{calibratedIndex}'
+        if not isinstance(calibratedIndex, int) or calibratedIndex < 0 or not entryPath.is_dir():
+            raise IndexError(f"No {CALIBRATED} {calibratedIndex} in session {sessionID}")
+
+        revision = writeCalibratedEntry(entryPath, name, columns, positionData, trialOffsets, calibrationData, samplingRates, recordingIndex)
+        #files of earlier revisions, a file still mapped on Windows cannot be removed and is left for the next update
+        for revisionPath in entryPath.glob('*-*.npy'):
+            if not revisionPath.stem.endswith(revision):
+                try:
+                    revisionPath.unlink()
+                except OSError:
+                    pass
+
+        with self.lock:
+            self._dropLocal(lambda key: key == (sessionID, CALIBRATED, calibratedIndex))
+        self._touchSession(self._sessionPath(sessionID))
+        logger.info(f"Replaced {CALIBRATED} {calibratedIndex} of session {sessionID} with revision {revision}")
+
+    def calibratedIndexOf(self, sessionID: str, recordingIndex: int) -> int | None:
+        #index of the calibrated recording made from a recording, None if it has not been calibrated
+        sessionPath = self._sessionPath(sessionID)
+        if not sessionPath.is_dir():
+            return None
+
+        calibratedIndices = sorted(int(entryPath.name.split('-')[1]) for entryPath in sessionPath.iterdir()
+                                   if entryPath.name.startswith(f'{CALIBRATED}-'))
+        for calibratedIndex in calibratedIndices:
+            try:
+                with open(sessionPath / f'{CALIBRATED}-{calibratedIndex}' / 'entry.json', 'r', encoding='utf-8') as file:
+                    if json.load(file).get('recordingIndex') == recordingIndex:
+                        return calibratedIndex
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def calibratedArrays(self, sessionID: str, calibratedIndex: int) -> tuple[list[str], np.ndarray, np.ndarray, dict]:
+        '''
+        Reads a calibrated recording's arrays without building its trial DataFrames.
+
+        Returns:
+            tuple[list[str], np.ndarray, np.ndarray, dict]: columns, memory-mapped positionData, trialOffsets and calibration data
+        '''
+        with self.lock:
+            entry = self._entry(sessionID, CALIBRATED, calibratedIndex)
+            return (*entry.arrays, entry.calibrationData)
+
+    def calibratedRevision(self, sessionID: str, calibratedIndex: int) -> str | None:
+        #changes every time the calibrated recording is replaced
+        with self.lock:
+            return self._entry(sessionID, CALIBRATED, calibratedIndex).revision
+
+    def recording(self, sessionID: str, recordingIndex: int) -> tuple[str, list]:
+        '''
+        Reads a recording, building its trials if this process has not got them.
+
+        Returns:
+            tuple[str, list]: name and trials of the recording
+        '''
+        entry = self._read(sessionID, RECORDING, recordingIndex)
+        return entry.name, entry.built
+
+    def calibratedRecording(self, sessionID: str, calibratedIndex: int) -> tuple[str, list, dict]:
+        '''
+        Reads a calibrated recording, building its trial DataFrames if this process has not got them.
+
+        Returns:
+            tuple[str, list, dict]: name, calibrated trial DataFrames and calibration data of the recording
+        '''
+        entry = self._read(sessionID, CALIBRATED, calibratedIndex)
+        return entry.name, entry.built, entry.calibrationData
+
+    def calibratedSamplingRates(self, sessionID: str, calibratedIndex: int) -> list[int] | None:
+        #samples per second of each trial of a calibrated recording, None if they were not given
+        return self._read(sessionID, CALIBRATED, calibratedIndex).samplingRates
+
+    def trialCount(self, sessionID: str, recordingIndex: int) -> int:
+        '''
+        Number of trials in a recording, from its trials if this process has built them, otherwise counted from the
+        recording rows of its arrays without building any trials.
+
+        Returns:
+            int: number of trials in the recording
+        '''
+        with self.lock:
+            entry = self._entry(sessionID, RECORDING, recordingIndex)
+            if entry.built is not None:
+                return len(entry.built)
+            if entry.EDFsource is not None:
+                entry.built = self._build(entry)
+                return len(entry.built)
+            return EDFTrialParser(entry.arrays).trialCount
+
+    def recordingCount(self, sessionID: str) -> int:
+        return self._count(sessionID, RECORDING)
+
+    def calibratedRecordingCount(self, sessionID: str) -> int:
+        return self._count(sessionID, CALIBRATED)
+
+    def residentBytes(self) -> int:
+        with self.lock:
+            return sum(entry.residentBytes(self.cachedBytes) for entry in self.entries.values())
+
+    def removeSession(self, sessionID: str) -> None:
+        with self.lock:
+            self._dropLocal(lambda key: key[0] == sessionID)
+            shutil.rmtree(self._sessionPath(sessionID), ignore_errors=True)
+            logger.info(f"Removed session {sessionID}")
+
+    def _sessionPath(self, sessionID: str) -> Path:
+        #the session ID comes from the browser and names the session directory
+        if not isinstance(sessionID, str) or not SESSION_ID_PATTERN.match(sessionID):
+            raise ValueError(f"Invalid session ID: {sessionID!r}")
+        return self.storeDirectory / sessionID
+
+    def _touchSession(self, sessionPath: Path) -> None:
+        #the directory's modification time is the session's last use, seen by every process
+        try:
+            os.utime(sessionPath)
+        except FileNotFoundError:
+            pass
+
+    def _count(self, sessionID: str, kind: str) -> int:
+        sessionPath = self._sessionPath(sessionID)
+        if not sessionPath.is_dir():
+            return 0
+        self._touchSession(sessionPath)
+        return sum(1 for entryPath in sessionPath.iterdir() if entryPath.name.startswith(f'{kind}-'))
+
+    def _add(self, sessionID: str, kind: str, writeEntryFiles: Callable[[Path], None]) -> int:
+        sessionPath = self._sessionPath(sessionID)
+        if not sessionPath.is_dir():
+            self._expireSessions()
+            sessionPath.mkdir(parents=True, exist_ok=True)
+
+        stagingPath = Path(tempfile.mkdtemp(dir=sessionPath, prefix='.staging-'))
+        try:
+            writeEntryFiles(stagingPath)
+            #claim the next free index, renaming onto an existing entry fails so another process cannot take the same one
+            index = self._count(sessionID, kind)
+            while True:
+                try:
+                    os.rename(stagingPath, sessionPath / f'{kind}-{index}')
+                    break
+                except OSError:
+                    if not (sessionPath / f'{kind}-{index}').exists():
+                        raise
+                    index += 1
+
+        except Exception as e:
+            logger.error(f"Error adding {kind} to session {sessionID}: {str(e)}")
+            shutil.rmtree(stagingPath, ignore_errors=True)
+            raise
+
+        logger.info(f"Added {kind} {index} to session {sessionID}")
+        return index
+
+    def _load(self, sessionID: str, kind: str, index: int) -> StoredRecording:
+        #memory-map an entry written by any process
+        entryPath = self._sessionPath(sessionID) / f'{kind}-{index}'
+        if not isinstance(index, int) or index < 0 or not entryPath.is_dir():
+            raise IndexError(f"No {kind} {index} in session {sessionID}")
+
+        #a replace by another process can remove the revision just read, read entry.json again if so
+        for attempt in range(3):
+            try:
+                stamp = entryStamp(entryPath)
+                with open(entryPath / 'entry.json', 'r', encoding='utf-8') as file:
+                    entryInfo = json.load(file)
+
+                if kind == RECORDING and 'EDFfilePath' in entryInfo:
+                    return StoredRecording(kind, entryInfo['name'], None, stamp=stamp,
+                                           EDFsource=(entryInfo['EDFfilePath'], entryInfo['optionString']))
+                if kind == RECORDING:
+                    return StoredRecording(kind, entryInfo['name'], readEntry(entryPath), stamp=stamp)
+
+                revision = entryInfo['revision']
+                positionData = np.load(entryPath / f'positionData-{revision}.npy', mmap_mode='r')
+                trialOffsets = np.load(entryPath / f'trialOffsets-{revision}.npy')
+                return StoredRecording(kind, entryInfo['name'], (entryInfo['columns'], positionData, trialOffsets), entryInfo['calibrationData'],
+                                       entryInfo.get('samplingRates'), entryInfo.get('recordingIndex'), revision, stamp)
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+
+    def _entry(self, sessionID: str, kind: str, index: int) -> StoredRecording:
+        #the entry as this process has read it, read again if another process has replaced or completed it since
+        key = (sessionID, kind, index)
+        entry = self.entries.get(key)
+        replaceable = kind == CALIBRATED or entry is not None and entry.EDFsource is not None
+        if entry is not None and replaceable and entry.stamp != entryStamp(self._sessionPath(sessionID) / f'{kind}-{index}'):
+            self._dropLocal(lambda droppedKey: droppedKey == key)
+            entry = None
+
+        if entry is None:
+            entry = self._load(sessionID, kind, index)
+            self.entries[key] = entry
+        return entry
+
+    def _read(self, sessionID: str, kind: str, index: int) -> StoredRecording:
+        with self.lock:
+            key = (sessionID, kind, index)
+            entry = self._entry(sessionID, kind, index)
+
+            if entry.built is None:
+                entry.built = self._build(entry)
+                logger.debug(f"Built {kind} {index} of session {sessionID}")
+            self.entries.move_to_end(key)
+            self._touchSession(self._sessionPath(sessionID))
+            self._enforceBudget(key)
+            return entry
+
+    def _build(self, entry: StoredRecording) -> list:
+        #trials, or calibrated trial DataFrames, over the entry's arrays
+        if entry.kind == RECORDING and entry.EDFsource is not None:
+            EDFfilePath, optionString = entry.EDFsource
+            return LazyRecording(Path(EDFfilePath), optionString, self.maxLazyTrials, self.backendFactory, self.onEvict)
+        if entry.kind == RECORDING:
+            recordingParser = EDFTrialParser(entry.arrays)
+            return recordingParser.extractAllTrials()
+
+        import pandas as pd
+        columns, positionData, trialOffsets = entry.arrays
+        return [pd.DataFrame(positionData[trialOffsets[i]:trialOffsets[i+1]], columns=columns, copy=False)
+                for i in range(len(trialOffsets) - 1)]
+
+    def _enforceBudget(self, keepKey: tuple) -> None:
+        #drop the built objects of least recently used entries until they fit in the budget, keeping the entry in use
+        entrySizes = {key: entry.residentBytes(self.cachedBytes) for key, entry in self.entries.items() if entry.built is not None}
+        totalSize = sum(entrySizes.values())
+
+        for key, entrySize in entrySizes.items():
+            if totalSize <= self.memoryBudgetBytes:
+                break
+            if key == keepKey:
+                continue
+            dropped = self.entries[key].release()
+            totalSize -= entrySize
+            logger.info(f"Evicted {key[1]} {key[2]} of session {key[0]}")
+            if self.onEvict is not None:
+                self.onEvict(dropped)
+
+    def _dropLocal(self, isDropped: Callable[[tuple], bool]) -> None:
+        dropped = []
+        for key in [key for key in self.entries if isDropped(key)]:
+            dropped.extend(self.entries.pop(key).release())
+        if self.onEvict is not None and dropped:
+            self.onEvict(dropped)
+
+    def _expireSessions(self) -> None:
+        #remove sessions no process has used for sessionTimeout seconds
+        if not self.storeDirectory.is_dir():
+            return
+        expiryTime = time.time() - self.sessionTimeout
+        for sessionPath in self.storeDirectory.iterdir():
+            try:
+                if sessionPath.is_dir() and sessionPath.stat().st_mtime < expiryTime:
+                    self.removeSession(sessionPath.name)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Error expiring session {sessionPath.name}: {str(e)}")
@@ -1,47 +1,103 @@
-import pandas as pd
-from nystagmus_app.utils.trial_parsing import EDFTrialParser
+from __future__ import annotations
 import numpy as np
-from plotly import graph_objects as go
+from typing import Iterable, Iterator
 
-def linearRegression(data: pd.Series, plus10Degs:int, minus10Degs:int) -> pd.Series:
-    #apply linear regression to the column
+MISSING_DATA = -32768
+
+def calibrationCoefficients(plus10Degs:int, minus10Degs:int) -> tuple[float, float]:
+    #slope and intercept mapping the +10 / -10 degree lines onto -10 / +10
     slope = (-10-10)/(plus10Degs - minus10Degs)
     meanX = (plus10Degs + minus10Degs)/2
     intercept = -(slope * meanX)
+    return slope, intercept
+
+def applyCalibration(positionData: np.ndarray, slopes: np.ndarray, intercepts: np.ndarray, inPlace: bool = False) -> np.ndarray:
+    #apply the affine map of each channel (column) to every row in one numpy operation
+    #with inPlace the positionData buffer is overwritten instead of allocating a new one
+    if not inPlace:
+        positionData = positionData.copy()
+
+    positionData *= slopes
+    positionData += intercepts
+    return positionData
+
+def recordingTrialOffsets(recording:list) -> np.ndarray:
+    #row of the first sample of each trial in a buffer holding every trial, followed by the total row count
+    trialLengths = [len(trial.trialData[2]) for trial in recording]
+    return np.concatenate(([0], np.cumsum(trialLengths))).astype(np.int64)
+
+def gatherPositionData(recording:list, columns:list[str]) -> tuple[np.ndarray, np.ndarray]:
+    #copy the position columns of every trial into one float32 (rows, channels) buffer
+    #trialOffsets[i]:trialOffsets[i+1] are the rows of trial i
+    trialOffsets = recordingTrialOffsets(recording)
+    positionData = np.empty((trialOffsets[-1], len(columns)), dtype=np.float32)
+
+    for trialNumber, trial in enumerate(recording):
+        trialRows = positionData[trialOffsets[trialNumber]:trialOffsets[trialNumber+1]]
+        for columnIndex, column in enumerate(columns):
+            trialRows[:, columnIndex] = trial.trialData[2][column]
+
+    #missing data is NaN in the calibrated output, matching Trial.sampleData
+    positionData[positionData == MISSING_DATA] = np.nan
+    return positionData, trialOffsets
+
+def calibrateRecording(recording:list, calibrationData: dict) -> tuple[list[str], np.ndarray, np.ndarray]:
+    #calibrate every trial with one operation over a buffer holding all trials' position columns
+    #returns the calibrated columns, the (rows, channels) buffer and the trial offsets into it
+    columns = ['pos' + key for key in calibrationData.keys()]
+    slopes, intercepts = np.array([calibrationCoefficients(calibrationData[key]['plus10Degs'], calibrationData[key]['minus10Degs'])
+                                   for key in calibrationData.keys()]).reshape(-1, 2).T
 
-    calibratedData = data.apply(lambda x: x*slope + intercept)
-    return calibratedData
+    positionData, trialOffsets = gatherPositionData(recording, columns)
+    applyCalibration(positionData, slopes.astype(np.float32), intercepts.astype(np.float32), inPlace=True)
+    return columns, positionData, trialOffsets
 
-def applyTrialLinearRegression(trialSampleData: pd.DataFrame, calibrationData: dict) -> pd.DataFrame:
-    #apply linear regression to the trial data
-    newTrialSampleData = pd.DataFrame()
-    for key in calibrationData.keys():
-        eyesDirectionString = 'pos' + key
-        eyesDirectionData = extractRelevantData(trialSampleData, eyesDirectionString)
+def calibrateTrials(trials:Iterable, calibrationData: dict) -> Iterator[tuple]:
+    #generator stage calibrating a stream of trials (e.g. streamTrials) one at a time, so only one trial's buffer is held
+    #yields (trial, positionData) with the (rows, channels) calibrated buffer of the trial, channels in calibrationData order
+    columns = ['pos' + key for key in calibrationData.keys()]
+    slopes, intercepts = np.array([calibrationCoefficients(calibrationData[key]['plus10Degs'], calibrationData[key]['minus10Degs'])
+                                   for key in calibrationData.keys()]).reshape(-1, 2).T
+    slopes, intercepts = slopes.astype(np.float32), intercepts.astype(np.float32)
 
-        plus10Degs = calibrationData[key]['plus10Degs']
-        minus10Degs = calibrationData[key]['minus10Degs']
+    for trial in trials:
+        positionData, _ = gatherPositionData([trial], columns)
+        yield trial, applyCalibration(positionData, slopes, intercepts, inPlace=True)
 
-        calibratedData = linearRegression(eyesDirectionData, plus10Degs, minus10Degs)
-        newTrialSampleData.loc[:, eyesDirectionString] = calibratedData
-        
-    return newTrialSampleData
+def recalibrateRecording(recording:list, calibrationData: dict, previousCalibration: tuple | None = None) -> tuple[list[str], np.ndarray, np.ndarray, list[str]]:
+    #calibrate a recording again, only recomputing the channels whose +10 / -10 degree lines changed
+    #previousCalibration is the (columns, positionData, calibrationData) of an earlier calibration of the same recording
+    #returns the calibrated columns, buffer and trial offsets as calibrateRecording, and the columns that were recomputed
+    columns = ['pos' + key for key in calibrationData.keys()]
+    previousColumns, previousPositionData, previousCalibrationData = previousCalibration or ([], None, {})
+    changedKeys = [key for key in calibrationData.keys() if previousCalibrationData.get(key) != calibrationData[key]]
+    if len(changedKeys) == len(columns):
+        return (*calibrateRecording(recording, calibrationData), columns)
 
-def extractRelevantData(trialData: pd.DataFrame, eyeDirectionString: str) -> pd.DataFrame:
-    #extract relevant columns from the trial data based on eyes / direction 
-    extractedData = pd.DataFrame()
+    trialOffsets = recordingTrialOffsets(recording)
+    if not changedKeys and columns == list(previousColumns):
+        return columns, previousPositionData, trialOffsets, []
 
-    extractedData.loc[:, eyeDirectionString] = trialData.loc[:, eyeDirectionString]
+    changedColumns, changedData = [], None
+    if changedKeys:
+        changedColumns, changedData, trialOffsets = calibrateRecording(recording, {key: calibrationData[key] for key in changedKeys})
 
-    return extractedData
+    #unchanged channels are copied from the previous buffer, the rest from the recomputed one
+    positionData = np.empty((trialOffsets[-1], len(columns)), dtype=np.float32)
+    for columnIndex, column in enumerate(columns):
+        if column in changedColumns:
+            positionData[:, columnIndex] = changedData[:, changedColumns.index(column)]
+        else:
+            positionData[:, columnIndex] = previousPositionData[:, list(previousColumns).index(column)]
+    return columns, positionData, trialOffsets, changedColumns
 
 def applyRecordingLinearRegression(recording:list, calibrationData: dict) -> list:
-    #loop over all trials applying linear regression
-    #return a list of all the calibrated trials data
-    calibratedTrialsSampleData = []
+    #return a list of all the calibrated trials data, each a DataFrame over its rows of the calibrated buffer
+    #pandas is imported here so calibrating arrays needs only NumPy
+    import pandas as pd
+    columns, positionData, trialOffsets = calibrateRecording(recording, calibrationData)
 
-    for trial in recording:
-        calibratedTrial = applyTrialLinearRegression(trial.sampleData, calibrationData)
-        calibratedTrialsSampleData.append(calibratedTrial)
+    calibratedTrialsSampleData = [pd.DataFrame(positionData[trialOffsets[i]:trialOffsets[i+1]], columns=columns, copy=False)
+                                  for i in range(len(recording))]
 
-    return calibratedTrialsSampleData
\ No newline at end of file
+    return calibratedTrialsSampleData
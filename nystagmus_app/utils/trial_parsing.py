@@ -1,11 +1,37 @@
-import pandas as pd
+from __future__ import annotations
 import numpy as np
 import logging
+from functools import cached_property
+from typing import TYPE_CHECKING
+
+#pandas is only imported when a DataFrame is first built, so parsing trials needs only NumPy
+if TYPE_CHECKING:
+    import pandas as pd
 
 #setup logging
 logging.basicConfig(filename='std.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filemode='w')
 logger = logging.getLogger(__name__)
 
+def recordingLabels(values:np.ndarray, field:str) -> np.ndarray:
+    #text columns hold category codes when the file was converted with the compact_schema option
+    if values.dtype.kind not in 'iu':
+        return values
+    #imported here so parsing text columns does not load the importer
+    from nystagmus_app.EDF_file_importer.EDF2numpy import categoryLabels
+    return categoryLabels(values, field)
+
+
+def recordingFrame(data:np.ndarray) -> pd.DataFrame:
+    #DataFrame of one trial array, with compact_schema category codes as pandas categoricals of their labels
+    import pandas as pd
+    from nystagmus_app.EDF_file_importer.EDF2numpy import CATEGORY_LOOKUPS
+    frame = pd.DataFrame(data)
+    for field in data.dtype.names:
+        if field in CATEGORY_LOOKUPS and data.dtype[field].kind in 'iu':
+            frame[field] = pd.Categorical.from_codes(data[field], CATEGORY_LOOKUPS[field])
+    return frame
+
+
 #class to parse EDF file data into trials
 class EDFTrialParser:
     def __init__(self, EDFfileData: np.ndarray):
@@ -20,23 +46,23 @@ class EDFTrialParser:
         self.trialIndices:list[tuple] = []
         self.trialIndices = self._setTrialIndices()
         self.trialCount = self._setTrialCount()
+        self.trialOffsets:np.ndarray = self._setTrialOffsets()
 
         logger.info(f"Trial Parser Initialized with {self.trialCount} trials")  
 
     def _setTrialIndices(self) -> list[tuple]:
         #find start and end index of each recording in the EDF buffer 
         #Indices are stored in a list of tuples
-        trialIndices:list[tuple] = []
-        tempTrialStart:np.int64 = 0
-        tempTrialEnd:np.int64 = 0  
         try:
-            for i in range(len(self.EDFfileData[1])):
-
-                if self.EDFfileData[1][i]['trackerState'] == "START":
-                    tempTrialStart = self.EDFfileData[1][i]['elementIndex']
-                if self.EDFfileData[1][i]['trackerState'] == "END":
-                    tempTrialEnd = self.EDFfileData[1][i]['elementIndex']
-                    trialIndices.append((tempTrialStart, tempTrialEnd))
+            trackerState:np.ndarray = recordingLabels(self.EDFfileData[1]['trackerState'], 'trackerState')
+            elementIndex:np.ndarray = self.EDFfileData[1]['elementIndex']
+            startRows:np.ndarray = np.flatnonzero(trackerState == "START")
+            endRows:np.ndarray = np.flatnonzero(trackerState == "END")
+
+            #each END closes the most recent START before it (element 0 if there is none)
+            startElements:np.ndarray = np.concatenate(([0], elementIndex[startRows]))
+            trialStarts:np.ndarray = startElements[np.searchsorted(startRows, endRows)]
+            trialIndices:list[tuple] = list(zip(trialStarts, elementIndex[endRows]))
             logger.info(f"Trial Start and end Indices set. Found {len(trialIndices)} trials")
             return trialIndices
         
@@ -48,23 +74,30 @@ class EDFTrialParser:
         trialCount:int = len(self.trialIndices)
         return trialCount
     
-    def _indexFilter(self, EDFindex, startBufferIndex:np.int64, endBufferIndex:np.int64) -> np.ndarray:
+    def _setTrialOffsets(self) -> np.ndarray:
+        #elementIndex is increasing within each array, so each trial is a contiguous row range
+        #offsets[trial, array] holds the (start, stop) rows of every trial, found for all trials at once by binary search
         try:
-            indexFilter = (self.EDFfileData[EDFindex]['elementIndex'] >= startBufferIndex) & (self.EDFfileData[EDFindex]['elementIndex'] <= endBufferIndex)
-            return indexFilter
+            trialBounds:np.ndarray = np.array(self.trialIndices, dtype=np.int64).reshape(-1, 2)
+            trialOffsets:np.ndarray = np.zeros((len(trialBounds), 5, 2), dtype=np.int64)
+            for EDFindex in range(1, 6):
+                elementIndex = self.EDFfileData[EDFindex]['elementIndex']
+                trialOffsets[:, EDFindex-1, 0] = np.searchsorted(elementIndex, trialBounds[:, 0], side='left')
+                trialOffsets[:, EDFindex-1, 1] = np.searchsorted(elementIndex, trialBounds[:, 1], side='right')
+            return trialOffsets
         
         except Exception as e:
-            logger.error(f"Error in setting index filter: {str(e)}")
-            raise ValueError("Error setting index filter")
+            logger.error(f"Error in setting trial offsets: {str(e)}")
+            raise ValueError("Error setting trial offsets")
 
-    def _extractTrialData(self, startBufferIndex:np.int64, endBufferIndex:np.int64) -> list:
+    def _extractTrialData(self, trialNumber:int) -> list:
+        #slices are views into the parent arrays (memory-mapped when loaded from the conversion cache), nothing is copied
         trialData:list = []
         try:
             for EDFindex in range(1, 6):
-                newIndexFilter = self._indexFilter(EDFindex, startBufferIndex, endBufferIndex)
-                newHeaderData = self.EDFfileData[EDFindex][newIndexFilter]
-                trialData.append(newHeaderData)
-            logger.debug(f"Extracted Data from EDF Buffer Indexes: {startBufferIndex} to {endBufferIndex}")
+                startOffset, stopOffset = self.trialOffsets[trialNumber, EDFindex-1]
+                trialData.append(self.EDFfileData[EDFindex][startOffset:stopOffset])
+            logger.debug(f"Extracted Data from EDF Buffer Indexes: {self.trialIndices[trialNumber][0]} to {self.trialIndices[trialNumber][1]}")
             return trialData
         
         except Exception as e:
@@ -73,10 +106,8 @@ class EDFTrialParser:
 
     def extractAllTrials(self) -> list:
         try:
-            for trialNumber, trialIndex in enumerate(self.trialIndices):
-                newTrialStart = trialIndex[0]
-                newTrialEnd = trialIndex[1]
-                newExtractedTrialData = self._extractTrialData(newTrialStart, newTrialEnd)
+            for trialNumber in range(self.trialCount):
+                newExtractedTrialData = self._extractTrialData(trialNumber)
 
                 logger.info(f"Extracted Data for Trial: {trialNumber}")
 
@@ -92,33 +123,70 @@ class EDFTrialParser:
 
 #class to store trial data
 class Trial:
+    '''
+    Trial data held as views into the parsed EDF arrays.
+    The pandas DataFrames are only built the first time each one is accessed, and are then kept.
+    '''
     def __init__ (self, trialNumber: int, trialData: list):
         if not isinstance(trialData, list) or len(trialData) != 5:
             logger.error("TrialData must be a list with 5 elements")
             raise ValueError("Invalid Trial Data input into Trial Object")
         
-        #convert np.array to pandas dataframe
         self.trialNumber: int = trialNumber
         self.trialData: list = trialData
-        self.recordingData: pd.DataFrame = pd.DataFrame(trialData[0])
-        self.messageData: pd.DataFrame = pd.DataFrame(trialData[1])
-        self.sampleData: pd.DataFrame = pd.DataFrame(trialData[2])
-        self.eventData: pd.DataFrame = pd.DataFrame(trialData[3])
-        self.ioEventData: pd.DataFrame = pd.DataFrame(trialData[4])
-        self.startTime: np.int64 = self.sampleData['time'].iloc[0]
-        self.endTime: np.int64 = self.sampleData['time'].iloc[-1]
-        
-        #remove -32768 values from sample data (missing data)
-        self.sampleData.replace(-32768, np.nan, inplace=True)
+        #compact_schema sample times are counted from the sampleTimeBase of the trial's recording block
+        self.sampleTimeBase: int = int(trialData[0]['sampleTimeBase'][0]) if 'sampleTimeBase' in trialData[0].dtype.names else 0
+        self.startTime: np.int64
+        self.endTime: np.int64
+        self.startTime, self.endTime = self._timesOf(trialData[2]['time'][[0, -1]])
 
         try:
-            self.eyeTracked: str = self.recordingData['eyeTracked'][0]
+            self.eyeTracked: str = str(recordingLabels(trialData[0]['eyeTracked'][:1], 'eyeTracked')[0])
             logger.info(f"Trial {self.trialNumber} attributes set with eyeTracked: {self.eyeTracked} and startTime: {self.startTime}")
 
         except Exception as e:
             logger.error(f"Error finding eyeTracked: {str(e)}")
             raise ValueError("Error setting trial attributes")
 
+    def sampleTimes(self) -> np.ndarray:
+        #timestamp of every sample in milliseconds, the time column itself unless it is counted from a sampleTimeBase
+        return self._timesOf(self.trialData[2]['time'])
+
+    def _timesOf(self, times: np.ndarray) -> np.ndarray:
+        if 'sampleTimeBase' not in self.trialData[0].dtype.names:
+            return times
+        return times.astype(np.int64) + self.sampleTimeBase
+
+    @cached_property
+    def recordingData(self) -> pd.DataFrame:
+        return recordingFrame(self.trialData[0])
+
+    @cached_property
+    def messageData(self) -> pd.DataFrame:
+        import pandas as pd
+        messageData = pd.DataFrame(self.trialData[1])
+        #message texts are held once in the recording's text pool, decoded here for this trial's rows
+        if hasattr(self.trialData[1], 'texts'):
+            messageData.insert(1, 'message', self.trialData[1].texts())
+        return messageData
+
+    @cached_property
+    def sampleData(self) -> pd.DataFrame:
+        import pandas as pd
+        sampleData = pd.DataFrame(self.trialData[2])
+        sampleData['time'] = self.sampleTimes()
+        #remove -32768 values from sample data (missing data)
+        sampleData.replace(-32768, np.nan, inplace=True)
+        return sampleData
+
+    @cached_property
+    def eventData(self) -> pd.DataFrame:
+        return recordingFrame(self.trialData[3])
+
+    @cached_property
+    def ioEventData(self) -> pd.DataFrame:
+        return recordingFrame(self.trialData[4])
+
     def __str__(self):
         return (f'''Recording Data: {self.recordingData[0]}\nMessage Data: {self.messageData[0]}
         \nSample Data: {self.sampleData[0]}\nEvent Data: {self.eventData[0]}
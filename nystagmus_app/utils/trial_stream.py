@@ -0,0 +1,46 @@
+import logging
+from pathlib import Path
+from typing import Callable, Iterator
+
+from nystagmus_app.utils.trial_parsing import EDFTrialParser, Trial
+
+#setup logging
+logging.basicConfig(filename='std.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s', filemode='w')
+logger = logging.getLogger(__name__)
+
+
+def streamTrials(EDFfilePath: Path, optionString: str, backendFactory: Callable | None = None) -> Iterator[Trial]:
+    '''
+    Yields the trials of an EDF file one at a time from a single forward pass over the file, so only the trial
+    being processed is held in memory rather than the whole recording.
+    Trials are numbered and hold the same data as EDFTrialParser(EDFToNumpy(...)).extractAllTrials(), except the
+    row index fields (recordingIndex, sampleIndex, eventIndex, ...): as in EDF2numpy.iterTrials these count the rows
+    of each block, so they restart for every trial and differ from the full parse for every trial after the first.
+    Closing the generator, or leaving a for loop over it early, closes the file.
+
+    Parameters:
+        EDFfilePath (Path): path of the EDF file
+        optionString (str): option string passed to EDFToNumpy
+        backendFactory (Callable | None): returns the reader backend to use instead of the EDFAccess API
+
+    Returns:
+        Iterator[Trial]: the recording's trials in order
+    '''
+    #imported here so the importer is only loaded once a file is read
+    from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+
+    importer = EDF2numpy(backend=backendFactory() if backendFactory is not None else None)
+    importer.consumeInputArgs(optionString.replace('=', ':').replace(' ', ''))
+
+    trialNumber = 0
+    for EDFtrialData in importer.iterTrials(str(EDFfilePath)):
+        #each block ends at the END of one recording, so it holds at most one trial
+        for trial in EDFTrialParser(EDFtrialData).extractAllTrials():
+            trial.trialNumber = trialNumber
+            trialNumber += 1
+            yield trial
+
+    if trialNumber == 0:
+        logger.error(f"No trials found in {EDFfilePath}")
+        raise ValueError(f"No trials found in {EDFfilePath}")
+    logger.info(f"Streamed {trialNumber} trials from {EDFfilePath}")
@@ -0,0 +1,15 @@
+'''
+WSGI entry point for running the app under a multi-process server, e.g.
+
+    gunicorn --workers 4 --bind 0.0.0.0:8050 nystagmus_app.wsgi:server
+
+Every worker shares the recordings in temp/sessions and the conversion cache in cache/, so all workers
+must be started from the same working directory. `nystagmus serve` does this and clears the temp uploads and
+sessions once at start; the conversion cache in cache/ is kept so files converted before a restart are not
+converted again.
+'''
+from nystagmus_app.app import app
+#importing the callback modules registers their callbacks with the app
+from nystagmus_app.callback_functions import upload_tabs, calibration_remapping, base_graph, calibrated_graph
+
+server = app.server
@@ -0,0 +1,41 @@
+'''
+The importer and analysis layers are used by the batch command line and conversion workers without the UI, so they
+must import with NumPy only. Each module is imported in a fresh interpreter and checked for Dash, Plotly and pandas.
+'''
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPOSITORY_ROOT = Path(__file__).resolve().parents[1]
+NUMPY_ONLY_MODULES = [
+    'nystagmus_app.EDF_file_importer.EyeLinkDataImporter',
+    'nystagmus_app.EDF_file_importer.SyntheticEDFbackend',
+    'nystagmus_app.utils.trial_parsing',
+    'nystagmus_app.utils.regression',
+    'nystagmus_app.utils.nystagmus_analysis',
+    'nystagmus_app.utils.lazy_recording',
+    'nystagmus_app.utils.trial_stream',
+    'nystagmus_app.utils.decimation',
+    'nystagmus_app.utils.conversion_jobs',
+    'nystagmus_app.utils.batch_pipeline',
+]
+HEAVY_MODULES = ['dash', 'plotly', 'pandas']
+
+
+def loadedHeavyModules(module: str, workDirectory: Path) -> list[str]:
+    #the heavy modules a fresh interpreter has loaded after importing module
+    script = f'import sys, {module}; print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(REPOSITORY_ROOT), os.environ.get('PYTHONPATH')])))
+    #modules write std.log to the working directory on import
+    process = subprocess.run([sys.executable, '-c', script], cwd=workDirectory, env=environment,
+                             capture_output=True, text=True)
+    assert process.returncode == 0, process.stderr
+    return [name for name in process.stdout.strip().split(',') if name]
+
+
+@pytest.mark.parametrize('module', NUMPY_ONLY_MODULES)
+def test_imports_without_ui_or_pandas(module, tmp_path):
+    assert loadedHeavyModules(module, tmp_path) == []
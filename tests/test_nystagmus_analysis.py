@@ -0,0 +1,57 @@
+'''
+segmentNystagmus is checked against the ground truth of SyntheticEDFbackend: a sawtooth of nystagmusAmplitude degrees
+whose fast phases lie at fastPhaseBounds(). The smoothing window widens each detected fast phase by about half its
+length on either side, so bounds are compared within that many samples.
+'''
+import numpy as np
+import pytest
+
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import (FAST_PHASE_FRACTION, RAW_CENTRE_X,
+                                                                 RAW_UNITS_PER_DEGREE, SyntheticEDFbackend)
+from nystagmus_app.utils.nystagmus_analysis import SMOOTHING_WINDOW, detectFastPhases, segmentNystagmus
+
+
+def syntheticTrace(backend: SyntheticEDFbackend) -> np.ndarray:
+    #horizontal position of the left eye in degrees over the first trial
+    samples = backend.makeTrialSamples(0)
+    return (samples['px']['left'].astype(np.float64) - RAW_CENTRE_X) / RAW_UNITS_PER_DEGREE
+
+
+@pytest.mark.parametrize('samplingRate, nystagmusFrequency, nystagmusAmplitude', [
+    (1000, 3.0, 5.0),
+    (500, 2.0, 8.0),
+    (2000, 4.0, 4.0),
+])
+def test_beats_match_synthetic_ground_truth(samplingRate, nystagmusFrequency, nystagmusAmplitude):
+    backend = SyntheticEDFbackend(trialCount=1, trialDuration=5, samplingRate=samplingRate,
+                                  nystagmusFrequency=nystagmusFrequency, nystagmusAmplitude=nystagmusAmplitude)
+    beats = segmentNystagmus(syntheticTrace(backend), samplingRate)
+    fastStarts, fastEnds = backend.fastPhaseBounds()
+    tolerance = int(SMOOTHING_WINDOW * samplingRate) // 2
+
+    assert len(beats) == backend.fastPhasesPerTrial
+    assert np.all(np.abs(beats.onsets - fastStarts) <= tolerance)
+    assert np.all(np.abs(beats.offsets - fastEnds) <= tolerance)
+
+    #the slow phase drifts up by the amplitude over most of the beat, the fast phase returns it
+    expectedSlowPhaseVelocity = nystagmusAmplitude * nystagmusFrequency / (1 - FAST_PHASE_FRACTION)
+    assert beats.slowPhaseVelocity == pytest.approx(expectedSlowPhaseVelocity, rel=0.1)
+    assert beats.fastPhaseAmplitude == pytest.approx(-nystagmusAmplitude, rel=0.15)
+    assert np.all(beats.fastPhaseVelocity < 0)
+    assert np.isnan(beats.frequency[0])
+    assert beats.frequency[1:] == pytest.approx(nystagmusFrequency, rel=0.01)
+    assert beats.summary()['beats'] == backend.fastPhasesPerTrial
+
+
+@pytest.mark.parametrize('position', [np.array([]), np.zeros(5), np.full(3000, np.nan)], ids=['empty', 'short', 'all-nan'])
+def test_traces_without_beats(position):
+    beats = segmentNystagmus(position, 1000)
+    assert len(beats) == 0
+    assert beats.sampleCount == len(position)
+    assert beats.summary()['beats'] == 0
+    assert np.isnan(beats.summary()['slowPhaseVelocity'])
+
+
+def test_detect_fast_phases_on_empty_velocity():
+    fastStarts, fastEnds = detectFastPhases(np.array([]), np.array([]), 1000)
+    assert len(fastStarts) == len(fastEnds) == 0
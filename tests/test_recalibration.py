@@ -0,0 +1,77 @@
+'''
+recalibrateRecording recomputes only the channels whose +10 / -10 degree lines changed and copies the rest from the
+previous calibration. Whatever it reuses, the result must equal a full calibrateRecording of the new calibration.
+'''
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+from nystagmus_app.utils.regression import calibrateRecording, recalibrateRecording
+from nystagmus_app.utils.trial_parsing import EDFTrialParser
+
+XLEFT = {'plus10Degs': -6000, 'minus10Degs': -2000}
+XLEFT_MOVED = {'plus10Degs': -5800, 'minus10Degs': -2100}
+XRIGHT = {'plus10Degs': -6100, 'minus10Degs': -1900}
+YLEFT = {'plus10Degs': -8000, 'minus10Degs': -4000}
+
+
+@pytest.fixture(scope='module')
+def recording() -> list:
+    importer = EDF2numpy(backend=SyntheticEDFbackend(trialCount=3, trialDuration=2, eyeTracked='Left'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        importer.consumeInputArgs('gaze_data_type:0,sample_fields:position')
+        EDFfileData = importer.readEDF('synthetic.edf')
+    return EDFTrialParser(EDFfileData).extractAllTrials()
+
+
+def previousCalibrationOf(recording: list, calibrationData: dict) -> tuple:
+    columns, positionData, _ = calibrateRecording(recording, calibrationData)
+    return columns, positionData, calibrationData
+
+
+def assertMatchesFullCalibration(result: tuple, recording: list, calibrationData: dict) -> None:
+    columns, positionData, trialOffsets, _ = result
+    expectedColumns, expectedPositionData, expectedTrialOffsets = calibrateRecording(recording, calibrationData)
+    assert columns == expectedColumns
+    assert positionData.dtype == expectedPositionData.dtype
+    assert np.array_equal(positionData, expectedPositionData, equal_nan=True)
+    assert np.array_equal(trialOffsets, expectedTrialOffsets)
+
+
+@pytest.mark.parametrize('previousCalibrationData, calibrationData, recomputedColumns', [
+    #one of two channels moved
+    ({'XLeft': XLEFT, 'XRight': XRIGHT}, {'XLeft': XLEFT_MOVED, 'XRight': XRIGHT}, ['posXLeft']),
+    #a channel added, the existing one unchanged
+    ({'XLeft': XLEFT}, {'XLeft': XLEFT, 'YLeft': YLEFT}, ['posYLeft']),
+    #a channel removed, nothing recomputed
+    ({'XLeft': XLEFT, 'XRight': XRIGHT, 'YLeft': YLEFT}, {'XLeft': XLEFT, 'YLeft': YLEFT}, []),
+    #the previous buffer holds the channels in another order
+    ({'YLeft': YLEFT, 'XRight': XRIGHT, 'XLeft': XLEFT}, {'XLeft': XLEFT, 'XRight': XRIGHT, 'YLeft': YLEFT}, []),
+    ({'YLeft': YLEFT, 'XLeft': XLEFT}, {'XLeft': XLEFT_MOVED, 'YLeft': YLEFT}, ['posXLeft']),
+    #every channel moved
+    ({'XLeft': XLEFT}, {'XLeft': XLEFT_MOVED}, ['posXLeft']),
+])
+def test_recalibration_matches_full_calibration(recording, previousCalibrationData, calibrationData, recomputedColumns):
+    result = recalibrateRecording(recording, calibrationData, previousCalibrationOf(recording, previousCalibrationData))
+    assert result[3] == recomputedColumns
+    assertMatchesFullCalibration(result, recording, calibrationData)
+
+
+def test_first_calibration_computes_every_channel(recording):
+    calibrationData = {'XLeft': XLEFT, 'XRight': XRIGHT}
+    result = recalibrateRecording(recording, calibrationData)
+    assert result[3] == ['posXLeft', 'posXRight']
+    assertMatchesFullCalibration(result, recording, calibrationData)
+
+
+def test_unchanged_calibration_reuses_previous_buffer(recording):
+    calibrationData = {'XLeft': XLEFT, 'XRight': XRIGHT}
+    previousCalibration = previousCalibrationOf(recording, calibrationData)
+    result = recalibrateRecording(recording, dict(calibrationData), previousCalibration)
+    assert result[3] == []
+    assert result[1] is previousCalibration[1]
+    assertMatchesFullCalibration(result, recording, calibrationData)
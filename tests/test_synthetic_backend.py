@@ -0,0 +1,44 @@
+'''
+SyntheticEDFbackend streams samples with a saccade pair per fast phase. Trials too short, or nystagmus too slow,
+for a single beat have no fast phases, and must still stream every sample.
+'''
+import contextlib
+import io
+
+import pytest
+
+from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+from nystagmus_app.utils.trial_parsing import EDFTrialParser
+
+
+def convert(backend: SyntheticEDFbackend):
+    importer = EDF2numpy(backend=backend)
+    with contextlib.redirect_stdout(io.StringIO()):
+        importer.consumeInputArgs('gaze_data_type:0')
+        return importer.readEDF('synthetic.edf')
+
+
+@pytest.mark.parametrize('backendOptions', [
+    {'trialCount': 2, 'trialDuration': 0.2},
+    {'trialCount': 2, 'trialDuration': 2, 'nystagmusFrequency': 0.25},
+])
+def test_trials_without_fast_phases_keep_their_samples(backendOptions):
+    backend = SyntheticEDFbackend(**backendOptions)
+    assert backend.fastPhasesPerTrial == 0
+
+    EDFfileData = convert(backend)
+    assert len(EDFfileData[3]) == backend.trialCount * backend.samplesPerTrial
+    assert len(EDFfileData[4]) == 0
+
+    trials = EDFTrialParser(EDFfileData).extractAllTrials()
+    assert len(trials) == backend.trialCount
+    assert all(len(trial.trialData[2]) == backend.samplesPerTrial for trial in trials)
+
+
+def test_trials_with_fast_phases_stream_samples_and_saccades():
+    backend = SyntheticEDFbackend(trialCount=2, trialDuration=2)
+    EDFfileData = convert(backend)
+    eyes = 2
+    assert len(EDFfileData[3]) == backend.trialCount * backend.samplesPerTrial
+    assert len(EDFfileData[4]) == backend.trialCount * backend.fastPhasesPerTrial * 2 * eyes
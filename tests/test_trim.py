@@ -0,0 +1,66 @@
+'''
+EDF2numpy.trimArray slices each array back to its record count instead of filtering rows on elementIndex.
+These tests convert a synthetic recording and check the trimmed arrays are byte-identical to the previous row filter.
+'''
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from nystagmus_app.EDF_file_importer.EDF2numpy import EDF2numpy
+from nystagmus_app.EDF_file_importer.SyntheticEDFbackend import SyntheticEDFbackend
+
+ARRAY_NAMES = ('RECORDINGdata', 'MESSAGEdata', 'EVENTdata', 'SAMPLEdata', 'IOEVENTdata')
+
+
+def previousTrim(importer) -> list:
+    #the row-by-row filter trimArray replaced
+    return [np.array([i for i in getattr(importer, name) if i['elementIndex']>0]) for name in ARRAY_NAMES]
+
+
+def convertComparingTrims(optionString: str, monkeypatch) -> list:
+    #convert a synthetic recording, recording the previous trim of the same arrays each time trimArray runs
+    comparisons = []
+    originalTrim = EDF2numpy.trimArray
+
+    def comparingTrim(importer):
+        expected = previousTrim(importer)
+        result = originalTrim(importer)
+        comparisons.append((expected, [getattr(importer, name) for name in ARRAY_NAMES]))
+        return result
+
+    monkeypatch.setattr(EDF2numpy, 'trimArray', comparingTrim)
+    importer = EDF2numpy(backend=SyntheticEDFbackend(trialCount=4, trialDuration=3))
+    with contextlib.redirect_stdout(io.StringIO()):
+        importer.consumeInputArgs(optionString)
+        importer.readEDF('synthetic.edf')
+    return comparisons
+
+
+@pytest.mark.parametrize('optionString', [
+    'single_pass_import:1,bulk_sample_import:1',
+    'single_pass_import:0,bulk_sample_import:1',
+    'single_pass_import:1,bulk_sample_import:0',
+    'single_pass_import:1,compact_schema:1',
+])
+def test_trim_matches_row_filter(optionString, monkeypatch):
+    comparisons = convertComparingTrims(optionString, monkeypatch)
+    assert len(comparisons) == 1
+    for expected, trimmed in comparisons:
+        for name, previous, current in zip(ARRAY_NAMES, expected, trimmed):
+            assert current is not None, name
+            if len(previous) == 0:
+                #the row filter lost the dtype of an empty array, the slice keeps it
+                assert len(current) == 0 and current.dtype.names is not None, name
+                continue
+            assert current.dtype == previous.dtype, name
+            assert current.tobytes() == previous.tobytes(), name
+
+
+def test_trim_drops_unused_rows(monkeypatch):
+    #the arrays are allocated larger than the recording, so the trim has rows to remove
+    comparisons = convertComparingTrims('single_pass_import:1', monkeypatch)
+    expected, trimmed = comparisons[0]
+    for name, current in zip(ARRAY_NAMES, trimmed):
+        assert np.all(current['elementIndex'] > 0), name